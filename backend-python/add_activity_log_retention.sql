@@ -0,0 +1,25 @@
+-- Index and archive table for activity log retention
+-- Run this on databases created before they were added to models.py
+
+CREATE INDEX ix_activity_logs_timestamp ON activity_logs (timestamp);
+
+CREATE TABLE IF NOT EXISTS activity_logs_archive (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    source_id INT,
+    activity_type VARCHAR(100) NOT NULL,
+    asset_type VARCHAR(100),
+    brand_name VARCHAR(100),
+    asset_name VARCHAR(100),
+    employee_name VARCHAR(100),
+    department_name VARCHAR(100),
+    timestamp DATETIME NOT NULL,
+    remarks TEXT,
+    archive_month VARCHAR(7),
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_activity_logs_archive_timestamp (timestamp),
+    INDEX ix_activity_logs_archive_archive_month (archive_month)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Verify
+SHOW INDEX FROM activity_logs;
+DESCRIBE activity_logs_archive;
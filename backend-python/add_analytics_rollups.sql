@@ -0,0 +1,16 @@
+-- Rollup table for the analytics time-series endpoint
+-- Run this on databases created before it was added to models.py,
+-- then POST /api/analytics/rollups/backfill (the app also backfills an empty table at startup)
+
+CREATE TABLE IF NOT EXISTS analytics_rollups (
+    metric VARCHAR(50) NOT NULL,
+    granularity VARCHAR(10) NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    dimension VARCHAR(100) NOT NULL DEFAULT '',
+    count INT DEFAULT 0,
+    total FLOAT DEFAULT 0,
+    PRIMARY KEY (metric, granularity, bucket_start, dimension)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Verify
+DESCRIBE analytics_rollups;
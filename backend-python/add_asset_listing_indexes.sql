@@ -0,0 +1,9 @@
+-- Indexes backing keyset pagination and sorting of GET /api/assets
+-- Run this on databases created before these indexes were added to models.py
+
+CREATE INDEX ix_assets_device_type ON assets (device_type);
+CREATE INDEX ix_assets_created_at ON assets (created_at);
+CREATE INDEX ix_assets_updated_at ON assets (updated_at);
+
+-- Verify indexes were created
+SHOW INDEX FROM assets;
@@ -0,0 +1,8 @@
+-- Version column for optimistic concurrency on asset state transitions
+-- (assign, return, repair, auction); every UPDATE of an asset bumps it
+-- Run this on databases created before the column was added to models.py
+
+ALTER TABLE assets ADD COLUMN version INT NOT NULL DEFAULT 1;
+
+-- Verify the column was added
+DESCRIBE assets;
@@ -0,0 +1,13 @@
+-- Per-assignment reminder stamps for the overdue-return scanner
+-- Run this on databases created before they were added to models.py
+
+ALTER TABLE assignments
+    ADD COLUMN overdue_reminded_at DATETIME NULL,
+    ADD COLUMN due_soon_reminded_at DATETIME NULL;
+
+CREATE INDEX ix_assignments_status_overdue_reminded_at
+    ON assignments (status, overdue_reminded_at, expected_return_date);
+
+-- Verify columns and index were created
+DESCRIBE assignments;
+SHOW INDEX FROM assignments;
@@ -0,0 +1,7 @@
+-- Index backing GET /api/employees/holdings
+-- Run this on databases created before it was added to models.py
+
+CREATE INDEX ix_assignments_employee_name_status ON assignments (employee_name, status);
+
+-- Verify index was created
+SHOW INDEX FROM assignments;
@@ -0,0 +1,30 @@
+-- NOT NULL sort keys for the keyset pages of the list endpoints
+-- Run this on databases created before they were added to models.py
+
+-- Rows written before the columns had defaults
+UPDATE assets SET created_at = COALESCE(updated_at, '1970-01-01 00:00:00') WHERE created_at IS NULL;
+UPDATE assets SET updated_at = created_at WHERE updated_at IS NULL;
+ALTER TABLE assets
+    MODIFY created_at DATETIME NOT NULL,
+    MODIFY updated_at DATETIME NOT NULL;
+
+UPDATE activity_logs SET timestamp = '1970-01-01 00:00:00' WHERE timestamp IS NULL;
+ALTER TABLE activity_logs MODIFY timestamp DATETIME NOT NULL;
+
+UPDATE auctions SET created_at = auction_date WHERE created_at IS NULL;
+ALTER TABLE auctions MODIFY created_at DATETIME NOT NULL;
+CREATE INDEX ix_auctions_created_at ON auctions (created_at);
+
+-- Assignments without an expected return date sort after every real date
+ALTER TABLE assignments
+    ADD COLUMN expected_return_key DATETIME
+        GENERATED ALWAYS AS (COALESCE(expected_return_date, '9999-12-31 23:59:59')) VIRTUAL NOT NULL;
+CREATE INDEX ix_assignments_status_expected_return_key ON assignments (status, expected_return_key);
+-- Active assignments in id order (default listing, streamed export)
+CREATE INDEX ix_assignments_status ON assignments (status);
+
+-- Verify columns and index
+DESCRIBE assets;
+DESCRIBE activity_logs;
+SHOW INDEX FROM assignments;
+SHOW INDEX FROM auctions;
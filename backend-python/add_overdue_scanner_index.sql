@@ -0,0 +1,7 @@
+-- Index backing the overdue-return scanner and GET /api/assignments/overdue
+-- Run this on databases created before it was added to models.py
+
+CREATE INDEX ix_assignments_status_expected_return_date ON assignments (status, expected_return_date);
+
+-- Verify index was created
+SHOW INDEX FROM assignments;
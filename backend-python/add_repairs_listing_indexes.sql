@@ -0,0 +1,17 @@
+-- Indexes backing keyset pages and vendor/department/date filters of GET /api/repairs
+-- Run this on databases created before these indexes were added to models.py
+
+-- Pages walk the start_date indexes, so every repair needs a start_date
+UPDATE repair_request_form SET start_date = '1970-01-01 00:00:00' WHERE start_date IS NULL;
+UPDATE completion_repair SET start_date = COALESCE(completion_date, '1970-01-01 00:00:00') WHERE start_date IS NULL;
+ALTER TABLE repair_request_form MODIFY start_date DATETIME NOT NULL;
+ALTER TABLE completion_repair MODIFY start_date DATETIME NOT NULL;
+
+CREATE INDEX ix_repair_request_form_start_date ON repair_request_form (start_date);
+CREATE INDEX ix_completion_repair_start_date ON completion_repair (start_date);
+CREATE INDEX ix_completion_repair_vendor_name_start_date ON completion_repair (vendor_name, start_date);
+CREATE INDEX ix_completion_repair_department_start_date ON completion_repair (department, start_date);
+
+-- Verify indexes were created
+SHOW INDEX FROM repair_request_form;
+SHOW INDEX FROM completion_repair;
@@ -0,0 +1,8 @@
+-- Indexes backing date-range, return-type filters and keyset pages of GET /api/returns
+-- Run this on databases created before these indexes were added to models.py
+
+CREATE INDEX ix_returns_return_date ON returns (return_date);
+CREATE INDEX ix_returns_return_type_return_date ON returns (return_type, return_date);
+
+-- Verify indexes were created
+SHOW INDEX FROM returns;
@@ -0,0 +1,7 @@
+-- Index backing the serial number duplicate checks
+-- Run this on databases created before the index was added to models.py
+
+CREATE INDEX ix_assets_serial_number ON assets (serial_number);
+
+-- Verify index was created
+SHOW INDEX FROM assets;
@@ -0,0 +1,16 @@
+-- Composite (oracle_number, date) indexes backing GET /api/assets/<oracle_number>/timeline
+-- and the per-asset history endpoints
+-- Run this on databases created before these indexes were added to models.py
+
+CREATE INDEX ix_assignments_oracle_number_assignment_date ON assignments (oracle_number, assignment_date);
+CREATE INDEX ix_repair_request_form_oracle_number_start_date ON repair_request_form (oracle_number, start_date);
+CREATE INDEX ix_completion_repair_oracle_number_completion_date ON completion_repair (oracle_number, completion_date);
+CREATE INDEX ix_returns_oracle_number_return_date ON returns (oracle_number, return_date);
+CREATE INDEX ix_auctions_oracle_number_auction_date ON auctions (oracle_number, auction_date);
+
+-- Verify indexes were created
+SHOW INDEX FROM assignments;
+SHOW INDEX FROM repair_request_form;
+SHOW INDEX FROM completion_repair;
+SHOW INDEX FROM returns;
+SHOW INDEX FROM auctions;
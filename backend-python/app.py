@@ -1,6 +1,7 @@
 from flask import Flask, Blueprint, request, jsonify
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import StaleDataError
 import os
 from dotenv import load_dotenv
 from flask_cors import CORS
@@ -8,7 +9,21 @@ from flask_mail import Mail, Message
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 import secrets
-from models import Base, User, PasswordResetToken
+from models import (Base, User, PasswordResetToken, Asset, ActivityLog, ActivityLogArchive, AnalyticsRollup, Assignment,
+                    RepairRequestForm, CompletionRepair)
+from utils.events import init_commit_hooks
+from utils.cache import init_generation_hooks
+from utils.search_index import asset_search_index
+from utils.existence_index import existence_index
+from utils.employee_index import employee_index
+from utils.activity_writer import activity_writer
+from utils.counters import init_counters, reconcile_counters
+from utils.scheduler import run_periodically
+from utils.live_updates import live_updates
+from utils.retention import archive_activity_logs
+from utils.rollups import init_rollups, backfill_rollups
+from utils.overdue import scan_overdue
+import threading
 
 # Load environment variables from .env file
 load_dotenv()
@@ -29,6 +44,22 @@ def create_app(test_config=None):
     
     mail = Mail(app)
 
+    # Seconds a dashboard snapshot may be served before it is recomputed
+    app.config['DASHBOARD_CACHE_TTL'] = float(os.getenv('DASHBOARD_CACHE_TTL', 30))
+    # Seconds between counter reconciliation runs (0 disables the job)
+    app.config['COUNTER_RECONCILE_INTERVAL'] = float(os.getenv('COUNTER_RECONCILE_INTERVAL', 3600))
+    # Activity logs older than this many days move to activity_logs_archive
+    app.config['ACTIVITY_RETENTION_DAYS'] = float(os.getenv('ACTIVITY_RETENTION_DAYS', 90))
+    app.config['ACTIVITY_ARCHIVE_INTERVAL'] = float(os.getenv('ACTIVITY_ARCHIVE_INTERVAL', 86400))
+    # Activity logs the database rejected are kept here and written back later
+    app.config['ACTIVITY_SPILL_PATH'] = os.getenv('ACTIVITY_SPILL_PATH') or \
+        os.path.join(os.path.dirname(__file__), 'activity_spill.jsonl')
+    # Overdue-return reminders: digest recipients (comma separated), days ahead
+    # counted as due soon, and seconds between scans (0 disables the job)
+    app.config['OVERDUE_NOTIFY_RECIPIENTS'] = os.getenv('OVERDUE_NOTIFY_RECIPIENTS', '')
+    app.config['OVERDUE_REMINDER_DAYS'] = float(os.getenv('OVERDUE_REMINDER_DAYS', 3))
+    app.config['OVERDUE_SCAN_INTERVAL'] = float(os.getenv('OVERDUE_SCAN_INTERVAL', 3600))
+
     if test_config:
         app.config.update(test_config)
 
@@ -49,6 +80,81 @@ def create_app(test_config=None):
     # Create all tables
     Base.metadata.create_all(bind=engine)
 
+    # Track committed writes for the in-process indexes and caches
+    init_commit_hooks(SessionLocal)
+    init_generation_hooks(SessionLocal)
+    init_counters(SessionLocal)
+    init_rollups()
+    try:
+        asset_search_index.warm(SessionLocal, Asset)
+        existence_index.warm(SessionLocal, Asset)
+    except Exception as e:
+        print(f"Error warming asset indexes: {e}")
+    try:
+        employee_index.warm(SessionLocal, Assignment, RepairRequestForm, CompletionRepair)
+    except Exception as e:
+        print(f"Error warming employee index: {e}")
+
+    def reconcile_job():
+        db = SessionLocal()
+        try:
+            drift = reconcile_counters(db)
+            if drift:
+                print(f"Repaired {len(drift)} drifted counters: {drift}")
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # Counters start from a full recount, then are checked periodically
+    try:
+        reconcile_job()
+    except Exception as e:
+        print(f"Error reconciling counters: {e}")
+    run_periodically('reconcile-counters', app.config['COUNTER_RECONCILE_INTERVAL'], reconcile_job)
+
+    def archive_job():
+        moved = archive_activity_logs(SessionLocal, ActivityLog, ActivityLogArchive,
+                                      app.config['ACTIVITY_RETENTION_DAYS'])
+        if moved:
+            print(f"Archived {moved} activity logs")
+
+    run_periodically('archive-activity-logs', app.config['ACTIVITY_ARCHIVE_INTERVAL'], archive_job)
+
+    def overdue_job():
+        with app.app_context():
+            result = scan_overdue(SessionLocal, mail, app.config)
+        if result['overdue']['assignments'] or result['due_soon']['assignments']:
+            print(f"Overdue reminders: {result}")
+
+    run_periodically('overdue-reminders', app.config['OVERDUE_SCAN_INTERVAL'], overdue_job)
+
+    # First start: build the analytics buckets in the background. Every
+    # process that sees them empty tries; the backfill lease lets one run.
+    def backfill_job():
+        try:
+            processed = backfill_rollups(SessionLocal)
+            if processed is None:
+                print("Analytics rollup backfill already running in another process")
+            else:
+                print(f"Backfilled analytics rollups: {processed}")
+        except Exception as e:
+            print(f"Error backfilling analytics rollups: {e}")
+
+    db = SessionLocal()
+    try:
+        rollups_empty = db.query(AnalyticsRollup.metric).first() is None
+    finally:
+        db.close()
+    if rollups_empty:
+        threading.Thread(target=backfill_job, name='rollup-backfill', daemon=True).start()
+
+    # Activity logs are written in batches off the request path
+    activity_writer.start(SessionLocal, ActivityLog, Assignment, app.config['ACTIVITY_SPILL_PATH'])
+    # One producer feeds every /api/live subscriber
+    live_updates.start(SessionLocal)
+
     # Import and register blueprints after app is configured
     from routes.dashboard import dashboard_bp
     from routes.assets import assets_bp
@@ -56,6 +162,8 @@ def create_app(test_config=None):
     from routes.repairs import repairs_bp
     from routes.returns import returns_bp
     from routes.auction import auction_bp
+    from routes.analytics import analytics_bp
+    from routes.employees import employees_bp
     from flask import send_from_directory, abort
     from flask_login import login_required, current_user
 
@@ -65,6 +173,14 @@ def create_app(test_config=None):
     app.register_blueprint(repairs_bp, url_prefix='/api')
     app.register_blueprint(returns_bp, url_prefix='/api')
     app.register_blueprint(auction_bp, url_prefix='/api')
+    app.register_blueprint(analytics_bp, url_prefix='/api')
+    app.register_blueprint(employees_bp, url_prefix='/api')
+
+    # Asset updates are checked against assets.version: one that lost a race
+    # with a concurrent write is a conflict for the client, not a server error
+    @app.errorhandler(StaleDataError)
+    def stale_data(error):
+        return jsonify({'error': 'Record was changed by a concurrent request, reload and try again'}), 409
 
     # Registration endpoint
     @app.route('/api/auth/register', methods=['POST'])
@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Benchmark Script for Inventory Management System
+Seeds a scratch database and reports query counts and latency for the
+heavy list endpoints at different inventory sizes.
+
+Usage:
+    python benchmark.py                      # 1k, 10k and 100k assets on SQLite
+    python benchmark.py --sizes 1000 5000
+    BENCHMARK_DB_URI=mysql+mysqlconnector://root:@localhost/inventory_bench python benchmark.py
+"""
+
+import argparse
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, insert, and_, or_
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, Asset, Assignment, ReturnRecord, RepairRequestForm, CompletionRepair
+import json
+from utils.queries import (
+    enriched_asset_query, serialize_enriched_assets, department_breakdown,
+    enriched_assignment_query, serialize_enriched_assignments, serialize_returns,
+    repair_listing_query, serialize_repairs
+)
+from utils.pagination import keyset_page
+from utils.repair_analytics import repair_analytics
+from utils.serializers import asset_serializer, assignment_serializer, return_serializer, ASSET_ROW, orjson
+from utils.search_index import AssetSearchIndex
+from utils import cache
+from utils.counters import dashboard_counters, reconcile_counters
+from utils.rollups import backfill_rollups, query_rollups, bucket_start
+
+DEVICE_TYPES = ['Laptop', 'Desktop', 'Printer', 'Scanner', 'Screen', 'UPS']
+BRANDS = ['Dell', 'HP', 'Lenovo', 'Samsung', 'APC']
+
+class QueryCounter:
+    """Counts statements executed on an engine, optionally by one thread only"""
+
+    def __init__(self, engine, thread=None):
+        self.count = 0
+        self.engine = engine
+        self.thread = thread
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.thread is None or threading.get_ident() == self.thread:
+            self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+    def close(self):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+def seed(engine, size, departments=40, employees=500):
+    """Create a fresh schema with `size` assets, a third of them assigned"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    now = datetime.utcnow()
+    assets, assignments, returns, repairs, completed_repairs = [], [], [], [], []
+    for i in range(size):
+        oracle_number = f'OR-{i:07d}'
+        assigned = i % 3 == 0
+        assets.append({
+            'oracle_number': oracle_number,
+            'device_type': DEVICE_TYPES[i % len(DEVICE_TYPES)],
+            'brand_name': BRANDS[i % len(BRANDS)],
+            'model_name': f'Model {i % 50}',
+            'serial_number': f'SN{i:09d}',
+            'unit_price': float(100 + i % 900),
+            'status': 'assigned' if assigned else 'new',
+            'assigned_to': f'Employee {i % employees}' if assigned else '',
+            'created_at': now,
+            'updated_at': now - timedelta(minutes=i)
+        })
+        if assigned:
+            assignments.append({
+                'oracle_number': oracle_number,
+                'employee_name': f'Employee {i % employees}',
+                'designation': 'Officer',
+                'department': f'Department {i % employees % departments}',
+                'assignment_date': now - timedelta(days=i % 365),
+                'expected_return_date': now + timedelta(days=30 - i % 60),
+                'status': 'assigned',
+                'timestamp': now
+            })
+        if i % 17 == 0:
+            returns.append({
+                'oracle_number': oracle_number,
+                'return_type': 'buyback' if i % 2 else 'returned_to_inventory',
+                'return_date': now - timedelta(days=i % 200),
+                'timestamp': now
+            })
+        if i % 23 == 0:
+            repairs.append({
+                'oracle_number': oracle_number,
+                'asset_type': DEVICE_TYPES[i % len(DEVICE_TYPES)],
+                'repair_description': 'Benchmark repair',
+                'start_date': now - timedelta(days=i % 90),
+                'department': f'Department {i % departments}',
+                'cost': float(50 + i % 400)
+            })
+        if i % 5 == 0:
+            started = now - timedelta(days=i % 720, minutes=i % 1440)
+            completed_repairs.append({
+                'oracle_number': oracle_number,
+                'asset_type': DEVICE_TYPES[i % len(DEVICE_TYPES)],
+                'asset_model': f'Model {i % 50}',
+                'repair_description': 'Benchmark repair',
+                'start_date': started,
+                'completion_date': started + timedelta(days=1 + i % 20),
+                'vendor_name': f'Vendor {i % 12}',
+                'department': f'Department {i % departments}',
+                'cost': float(50 + i % 400),
+                'is_fixed': 'not_fixed' if i % 7 == 0 else 'fixed'
+            })
+
+    with engine.begin() as conn:
+        for model, rows in ((Asset, assets), (Assignment, assignments), (ReturnRecord, returns),
+                            (RepairRequestForm, repairs), (CompletionRepair, completed_repairs)):
+            if rows:
+                conn.execute(insert(model), rows)
+
+def legacy_asset_listing(db):
+    """GET /api/assets as it used to be: three enrichment queries per asset"""
+    result = []
+    for asset in db.query(Asset).all():
+        asset_data = asset_serializer(asset)
+        assignment = db.query(Assignment).filter(
+            and_(Assignment.oracle_number == asset.oracle_number, Assignment.status == 'assigned')
+        ).first()
+        asset_data['current_holder'] = assignment.employee_name if assignment else 'Not Assigned'
+        if db.query(ReturnRecord).filter(
+            and_(ReturnRecord.oracle_number == asset.oracle_number, ReturnRecord.return_type == 'buyback')
+        ).order_by(ReturnRecord.timestamp.desc()).first():
+            asset_data['return_type'] = 'buyback'
+        if db.query(RepairRequestForm).filter(RepairRequestForm.oracle_number == asset.oracle_number).first():
+            asset_data['status'] = 'under repair'
+        result.append(asset_data)
+    return result
+
+def set_based_asset_listing(db):
+    """GET /api/assets with the joined enrichment query"""
+    models = Base.registry._class_registry
+    return serialize_enriched_assets(enriched_asset_query(db, models).all())
+
+def legacy_assignment_listing(db):
+    """GET /api/assignments as it used to be: asset and repair lookups per assignment"""
+    result = []
+    for assignment in db.query(Assignment).filter(Assignment.status == 'assigned').all():
+        asset = db.query(Asset).filter(Asset.oracle_number == assignment.oracle_number).first()
+        asset_status = 'assigned'
+        if asset:
+            repair_request = db.query(RepairRequestForm).filter(
+                RepairRequestForm.oracle_number == assignment.oracle_number
+            ).first()
+            asset_status = 'under repair' if repair_request else asset.status
+        assignment_data = assignment_serializer(assignment, asset_status)
+        if asset:
+            assignment_data['device_name'] = asset.model_name or asset.device_type
+            assignment_data['asset_type'] = asset.device_type
+            assignment_data['model'] = asset.model_name
+            assignment_data['brand'] = asset.brand_name
+            assignment_data['serial_number'] = asset.serial_number
+        result.append(assignment_data)
+    return result
+
+def joined_assignment_listing(db):
+    """GET /api/assignments with the joined enrichment query"""
+    models = Base.registry._class_registry
+    return serialize_enriched_assignments(
+        enriched_assignment_query(db, models).filter(Assignment.status == 'assigned').all()
+    )
+
+def legacy_returns_listing(db):
+    """GET /api/returns as it used to be: asset and assignment lookups per return"""
+    result = []
+    for return_record in db.query(ReturnRecord).order_by(ReturnRecord.return_date.desc()).all():
+        oracle_number = return_record.oracle_number
+        asset = db.query(Asset).filter(Asset.oracle_number == oracle_number).first() if oracle_number else None
+        assignment = db.query(Assignment).filter(
+            Assignment.oracle_number == oracle_number, Assignment.status == 'returned'
+        ).first() if oracle_number else None
+        return_data = return_serializer(return_record)
+        return_data['asset_type'] = (asset.device_type or '') if asset else ''
+        return_data['asset_model'] = (asset.model_name or '') if asset else ''
+        return_data['serial_number'] = (asset.serial_number or '') if asset else ''
+        return_data['asset_status'] = (asset.status or '') if asset else ''
+        return_data['employee_name'] = (assignment.employee_name or '') if assignment else ''
+        return_data['employee_department'] = (assignment.department or '') if assignment else ''
+        return_data['employee_designation'] = (assignment.designation or '') if assignment else ''
+        return_data['allocation_date'] = assignment.assignment_date.isoformat() \
+            if assignment and assignment.assignment_date else ''
+        return_data['expected_return_date'] = assignment.expected_return_date.isoformat() \
+            if assignment and assignment.expected_return_date else ''
+        result.append(return_data)
+    return result
+
+def batched_returns_listing(db, limit=None):
+    """GET /api/returns with the batch lookups (optionally one page)"""
+    models = Base.registry._class_registry
+    query = db.query(ReturnRecord.__table__).order_by(ReturnRecord.return_date.desc(), ReturnRecord.id.desc())
+    if limit:
+        query = query.limit(limit)
+    return serialize_returns(db, models, query.all())
+
+def legacy_repairs_listing(db):
+    """GET /api/repairs as it used to be: both tables loaded and sorted in Python"""
+    repair_list = []
+    for status, model in (('in-progress', RepairRequestForm), ('completed', CompletionRepair)):
+        for repair in db.query(model).order_by(model.start_date.desc()).all():
+            completed = status == 'completed'
+            repair_list.append({
+                'completion_date': repair.completion_date.isoformat() if completed and repair.completion_date else None,
+                'repair_cost': repair.cost,
+                'return_date': repair.return_date.isoformat() if completed and repair.return_date else None,
+                'status': status,
+                'oracle_number': repair.oracle_number,
+                'asset_type': repair.asset_type,
+                'asset_model': repair.asset_model,
+                'employee_name': repair.employee_name,
+                'designation': repair.designation,
+                'department': repair.department,
+                'repair_description': repair.repair_description,
+                'start_date': repair.start_date.isoformat() if repair.start_date else None,
+                'vendor_name': repair.vendor_name,
+                'is_fixed': repair.is_fixed if completed else False
+            })
+    repair_list.sort(key=lambda x: x.get('start_date') or '', reverse=True)
+    return repair_list
+
+def union_repairs_page(db, limit=50, **filters):
+    """One keyset page of GET /api/repairs from the UNION ALL query"""
+    models = Base.registry._class_registry
+    query, start_date, sort_key = repair_listing_query(db, models, limit=limit, **filters)
+    rows, _ = keyset_page(query, start_date, sort_key, True, None, limit,
+                          key=lambda row: (row.start_date, row.sort_key))
+    return serialize_repairs(rows)
+
+def python_repair_analytics(db):
+    """Repair KPIs computed the obvious way: every completed repair loaded into Python"""
+    durations, vendors, models = [], {}, {}
+    for repair in db.query(CompletionRepair).all():
+        failed = repair.is_fixed != 'fixed'
+        if repair.start_date and repair.completion_date and repair.completion_date >= repair.start_date:
+            durations.append((repair.completion_date - repair.start_date).total_seconds())
+        vendor = vendors.setdefault(repair.vendor_name, [0, 0.0, 0])
+        vendor[0] += 1
+        vendor[1] += repair.cost or 0
+        vendor[2] += failed
+        model = models.setdefault((repair.asset_type, repair.asset_model), [0, 0])
+        model[0] += 1
+        model[1] += failed
+    durations.sort()
+    percentiles = [durations[max(math.ceil(p / 100 * len(durations)) - 1, 0)] for p in (50, 75, 90, 95)] if durations else []
+    return [sum(durations) / len(durations) if durations else None, percentiles] + list(vendors.items()) + list(models.items())
+
+def legacy_dashboard_stats(db):
+    """GET /api/dashboard as it used to be: one COUNT query per card"""
+    total_assets = db.query(Asset).count()
+    assigned = db.query(Asset).filter(
+        and_(Asset.assigned_to.isnot(None), Asset.assigned_to != '', Asset.status != 'damaged')
+    ).count()
+    under_repair = max(db.query(Asset).filter(Asset.status == 'under repair').count(),
+                       db.query(RepairRequestForm).count())
+    damaged = db.query(ReturnRecord).join(Asset, ReturnRecord.oracle_number == Asset.oracle_number).filter(
+        and_(ReturnRecord.return_type == 'damaged', Asset.status == 'damaged')
+    ).count()
+    auctioned = db.query(Asset).filter(Asset.status == 'auctioned').count()
+    available = db.query(Asset).filter(
+        and_(or_(Asset.assigned_to.is_(None), Asset.assigned_to == ''),
+             Asset.status.notin_(['under repair', 'damaged', 'auctioned', 'buyback']))
+    ).count()
+    under_repair_not_assigned = db.query(Asset).filter(
+        and_(Asset.status == 'under repair', or_(Asset.assigned_to.is_(None), Asset.assigned_to == ''))
+    ).count()
+    buyback_count = db.query(ReturnRecord).filter(ReturnRecord.return_type == 'buyback').count()
+    return {
+        'total_assets': total_assets,
+        'assigned': assigned,
+        'unassigned': total_assets - assigned,
+        'under_repair': under_repair,
+        'damaged': damaged,
+        'auctioned': auctioned,
+        'available': available,
+        'under_repair_not_assigned': under_repair_not_assigned,
+        'stock_count': available + under_repair_not_assigned,
+        'buyback_count': buyback_count
+    }
+
+def legacy_department_breakdown(db):
+    """Department stats the straightforward way: walk assignments in Python"""
+    now = datetime.utcnow()
+    departments = {}
+    for assignment in db.query(Assignment).filter(Assignment.status == 'assigned').all():
+        item = departments.setdefault(assignment.department or 'Unspecified', {
+            'held_assets': 0, 'asset_value': 0.0, 'overdue': 0, 'repair_spend': 0.0})
+        asset = db.query(Asset).filter(Asset.oracle_number == assignment.oracle_number).first()
+        item['held_assets'] += 1
+        item['asset_value'] += (asset.unit_price or 0) if asset else 0
+        if assignment.expected_return_date and assignment.expected_return_date < now:
+            item['overdue'] += 1
+    for model in (RepairRequestForm, CompletionRepair):
+        for repair in db.query(model).all():
+            item = departments.setdefault(repair.department or 'Unspecified', {
+                'held_assets': 0, 'asset_value': 0.0, 'overdue': 0, 'repair_spend': 0.0})
+            item['repair_spend'] += repair.cost or 0
+    return list(departments.values())
+
+def measure(SessionLocal, counter, fn):
+    """Run fn in a fresh session and return (queries, seconds, rows)"""
+    db = SessionLocal()
+    try:
+        counter.reset()
+        started = time.perf_counter()
+        rows = fn(db)
+        elapsed = time.perf_counter() - started
+        return counter.count, elapsed, len(rows)
+    finally:
+        db.close()
+
+def bench_asset_enrichment(engine, SessionLocal, counter, size, legacy_limit):
+    print(f"\nGET /api/assets enrichment ({size:,} assets)")
+    cases = [('set-based', set_based_asset_listing)]
+    if size <= legacy_limit:
+        cases.insert(0, ('per-row (legacy)', legacy_asset_listing))
+    for label, fn in cases:
+        queries, elapsed, rows = measure(SessionLocal, counter, fn)
+        print(f"  {label:<20} {queries:>8,} queries  {elapsed * 1000:>10.1f} ms  {rows:,} rows")
+
+def bench_assignment_listing(engine, SessionLocal, counter, size, legacy_limit):
+    print(f"\nGET /api/assignments ({size:,} assets)")
+    models = Base.registry._class_registry
+    cases = [
+        ('joined', joined_assignment_listing),
+        ('joined, 50 per page', lambda db: enriched_assignment_query(db, models).filter(
+            Assignment.status == 'assigned').order_by(Assignment.id).limit(50).all())
+    ]
+    if size <= legacy_limit:
+        cases.insert(0, ('per-row (legacy)', legacy_assignment_listing))
+    for label, fn in cases:
+        queries, elapsed, rows = measure(SessionLocal, counter, fn)
+        print(f"  {label:<20} {queries:>8,} queries  {elapsed * 1000:>10.1f} ms  {rows:,} rows")
+
+def bench_returns_listing(engine, SessionLocal, counter, size, legacy_limit):
+    print(f"\nGET /api/returns ({size:,} assets)")
+    cases = [('batched', batched_returns_listing),
+             ('batched, 50 per page', lambda db: batched_returns_listing(db, 50))]
+    if size <= legacy_limit:
+        cases.insert(0, ('per-row (legacy)', legacy_returns_listing))
+    for label, fn in cases:
+        queries, elapsed, rows = measure(SessionLocal, counter, fn)
+        print(f"  {label:<20} {queries:>8,} queries  {elapsed * 1000:>10.1f} ms  {rows:,} rows")
+
+def bench_repairs_listing(engine, SessionLocal, counter, size, legacy_limit):
+    print(f"\nGET /api/repairs ({size:,} assets)")
+    models = Base.registry._class_registry
+
+    def union_all_rows(db):
+        query, start_date, sort_key = repair_listing_query(db, models)
+        return serialize_repairs(query.order_by(start_date.desc(), sort_key.desc()).all())
+
+    cases = [('union, all rows', union_all_rows),
+             ('union, 50 per page', union_repairs_page),
+             ('union, vendor page', lambda db: union_repairs_page(db, vendor='Vendor 3'))]
+    if size <= legacy_limit:
+        cases.insert(0, ('python merge (legacy)', legacy_repairs_listing))
+    for label, fn in cases:
+        queries, elapsed, rows = measure(SessionLocal, counter, fn)
+        print(f"  {label:<20} {queries:>8,} queries  {elapsed * 1000:>10.1f} ms  {rows:,} rows")
+
+def bench_repair_analytics(engine, SessionLocal, counter, size):
+    print(f"\nGET /api/analytics/repairs ({size:,} assets)")
+    cache.bump('repair_analytics')
+
+    def grouped_sql(db):
+        result = repair_analytics(db)
+        return result['vendors'] + result['models']
+
+    def cached_read(db):
+        return cache.cached('repair_analytics', lambda: grouped_sql(db))
+
+    for label, fn in (('python loops', python_repair_analytics), ('grouped sql', grouped_sql),
+                      ('cached (cold)', cached_read), ('cached (warm)', cached_read)):
+        queries, elapsed, rows = measure(SessionLocal, counter, fn)
+        print(f"  {label:<20} {queries:>8,} queries  {elapsed * 1000:>10.1f} ms  {rows:,} rows")
+
+def bench_asset_search(engine, SessionLocal, counter, size):
+    print(f"\nGET /api/assets?search= ({size:,} assets)")
+    index = AssetSearchIndex()
+    started = time.perf_counter()
+    index.warm(SessionLocal, Asset)
+    print(f"  index warm-up        {(time.perf_counter() - started) * 1000:>27.1f} ms")
+
+    db = SessionLocal()
+    try:
+        # Oracle numbers are OR-{i:07d} and serials SN{i:09d} in the seed
+        for term in ('OR-0000042', 'sn000000123', 'lenovo', 'model 4', 'xyz'):
+            started = time.perf_counter()
+            like = db.query(Asset.id).filter(or_(
+                Asset.oracle_number.ilike(f'%{term}%'),
+                Asset.device_type.ilike(f'%{term}%'),
+                Asset.brand_name.ilike(f'%{term}%'),
+                Asset.model_name.ilike(f'%{term}%'),
+                Asset.serial_number.ilike(f'%{term}%')
+            )).all()
+            like_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            ranked = index.search(term)
+            index_ms = (time.perf_counter() - started) * 1000
+            print(f"  {term!r:<20} ILIKE {like_ms:>8.1f} ms  index {index_ms:>8.1f} ms  {len(ranked):,} matches")
+    finally:
+        db.close()
+
+def bench_serializers(engine, SessionLocal, counter, size):
+    print(f"\nAsset serialization ({size:,} assets)")
+
+    def orm_objects(db):
+        return [asset_serializer(asset) for asset in db.query(Asset).all()]
+
+    def projected_rows(db):
+        return ASSET_ROW.many(db.query(*ASSET_ROW.columns(Asset)).all())
+
+    for label, fn in (('ORM + per-object', orm_objects), ('column projection', projected_rows)):
+        queries, elapsed, rows = measure(SessionLocal, counter, fn)
+        print(f"  {label:<20} {queries:>8,} queries  {elapsed * 1000:>10.1f} ms  {rows:,} rows")
+
+    db = SessionLocal()
+    try:
+        payload = projected_rows(db)
+    finally:
+        db.close()
+    encoders = [('json.dumps', lambda data: json.dumps(data))]
+    if orjson is not None:
+        encoders.append(('orjson.dumps', orjson.dumps))
+    for label, encode in encoders:
+        started = time.perf_counter()
+        encode(payload)
+        print(f"  {label:<20} {'':>16}  {(time.perf_counter() - started) * 1000:>10.1f} ms")
+
+def bench_dashboard(engine, SessionLocal, counter, size):
+    print(f"\nGET /api/dashboard ({size:,} assets)")
+    # seed() bypasses the ORM, so the counters start out empty
+    db = SessionLocal()
+    try:
+        reconcile_counters(db)
+    finally:
+        db.close()
+    results = {}
+    for label, fn in (('per-card COUNTs', legacy_dashboard_stats), ('counters table', dashboard_counters)):
+        db = SessionLocal()
+        try:
+            counter.reset()
+            started = time.perf_counter()
+            results[label] = fn(db)
+            elapsed = time.perf_counter() - started
+        finally:
+            db.close()
+        print(f"  {label:<20} {counter.count:>8,} queries  {elapsed * 1000:>10.1f} ms")
+    if len(set(map(str, results.values()))) != 1:
+        print("  WARNING: the two implementations disagree")
+
+    def load_snapshot():
+        db = SessionLocal()
+        try:
+            return dashboard_counters(db)
+        finally:
+            db.close()
+
+    cache.bump('benchmark-dashboard')
+    cache.cached('benchmark-dashboard', load_snapshot, ttl=30)
+    counter.reset()
+    started = time.perf_counter()
+    cache.cached('benchmark-dashboard', load_snapshot, ttl=30)
+    elapsed = time.perf_counter() - started
+    print(f"  {'cached snapshot':<20} {counter.count:>8,} queries  {elapsed * 1000:>10.3f} ms")
+
+def bench_departments(engine, SessionLocal, counter, size, legacy_limit, departments, employees):
+    print(f"\nDashboard department breakdown ({size:,} assets, {departments:,} departments, {employees:,} employees)")
+    models = Base.registry._class_registry
+    cases = [('grouped SQL', lambda db: department_breakdown(db, models, datetime.utcnow()))]
+    if size <= legacy_limit:
+        cases.insert(0, ('per-row (legacy)', legacy_department_breakdown))
+    for label, fn in cases:
+        queries, elapsed, rows = measure(SessionLocal, counter, fn)
+        print(f"  {label:<20} {queries:>8,} queries  {elapsed * 1000:>10.1f} ms  {rows:,} departments")
+
+def bench_rollups(engine, SessionLocal, counter, size):
+    print(f"\nAnalytics rollups: assignments per month by department ({size:,} assets)")
+    started = time.perf_counter()
+    processed = backfill_rollups(SessionLocal)
+    print(f"  {'backfill (all)':<20} {'':>16}  {(time.perf_counter() - started) * 1000:>10.1f} ms  "
+          f"{sum(processed.values()):,} rows")
+
+    def raw_scan(db):
+        series = {}
+        for when, department in db.query(Assignment.assignment_date, Assignment.department):
+            key = (bucket_start(when, 'month'), department)
+            series[key] = series.get(key, 0) + 1
+        return list(series)
+
+    def from_rollups(db):
+        return query_rollups(db, 'assignments', 'month', by_dimension=True)
+
+    for label, fn in (('raw table scan', raw_scan), ('rollup buckets', from_rollups)):
+        queries, elapsed, rows = measure(SessionLocal, counter, fn)
+        print(f"  {label:<20} {queries:>8,} queries  {elapsed * 1000:>10.1f} ms  {rows:,} points")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark list endpoints against seeded data')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--legacy-limit', type=int, default=10000,
+                        help='skip the per-row legacy runs above this many assets')
+    parser.add_argument('--departments', type=int, default=2000)
+    parser.add_argument('--employees', type=int, default=5000)
+    args = parser.parse_args()
+
+    db_uri = os.getenv('BENCHMARK_DB_URI', 'sqlite:///benchmark.db')
+    engine = create_engine(db_uri, echo=False)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    counter = QueryCounter(engine)
+
+    print(f"Benchmarking against {engine.url.render_as_string(hide_password=True)}")
+    for size in args.sizes:
+        seed(engine, size, args.departments, args.employees)
+        bench_asset_enrichment(engine, SessionLocal, counter, size, args.legacy_limit)
+        bench_assignment_listing(engine, SessionLocal, counter, size, args.legacy_limit)
+        bench_returns_listing(engine, SessionLocal, counter, size, args.legacy_limit)
+        bench_repairs_listing(engine, SessionLocal, counter, size, args.legacy_limit)
+        bench_repair_analytics(engine, SessionLocal, counter, size)
+        bench_asset_search(engine, SessionLocal, counter, size)
+        bench_serializers(engine, SessionLocal, counter, size)
+        bench_dashboard(engine, SessionLocal, counter, size)
+        bench_departments(engine, SessionLocal, counter, size, args.legacy_limit,
+                          args.departments, args.employees)
+        bench_rollups(engine, SessionLocal, counter, size)
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, Index, Computed
 from sqlalchemy.orm import declarative_base
 from datetime import datetime
 
@@ -30,10 +30,10 @@ class Asset(Base):
     __tablename__ = 'assets'
     id = Column(Integer, primary_key=True, autoincrement=True)
     oracle_number = Column(String(50), unique=True, nullable=False)
-    device_type = Column(String(100), nullable=False)
+    device_type = Column(String(100), nullable=False, index=True)
     brand_name = Column(String(100))
     model_name = Column(String(100))
-    serial_number = Column(String(100))
+    serial_number = Column(String(100), index=True)
     unit_price = Column(Float)
     purchase_date = Column(DateTime)
     warranty_expiry = Column(DateTime)
@@ -44,8 +44,14 @@ class Asset(Base):
     assigned_to = Column(String(100))
     assignment_date = Column(DateTime)
     expected_return_date = Column(DateTime)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Bumped on every update; an UPDATE only matches the version it read
+    version = Column(Integer, nullable=False, default=1)
+    __mapper_args__ = {'version_id_col': version}
+
+# Due-date sort key of assignments without an expected return date: after every real date
+NO_RETURN_DATE = datetime(9999, 12, 31, 23, 59, 59)
 
 class Assignment(Base):
     __tablename__ = 'assignments'
@@ -61,6 +67,28 @@ class Assignment(Base):
     notes = Column(Text)
     allocation_voucher_path = Column(String(255))
     timestamp = Column(DateTime, default=datetime.utcnow)
+    # When the reminder scanner reported the assignment, per kind of reminder
+    overdue_reminded_at = Column(DateTime)
+    due_soon_reminded_at = Column(DateTime)
+    # expected_return_date as a NOT NULL key, so due-date pages seek an index;
+    # generated by the database and left unmapped
+    expected_return_key = Column(DateTime, Computed(
+        f"coalesce(expected_return_date, '{NO_RETURN_DATE:%Y-%m-%d %H:%M:%S}')"), nullable=False)
+    __mapper_args__ = {'exclude_properties': ['expected_return_key']}
+    __table_args__ = (
+        # Active assignments by due date (due-soon reminders)
+        Index('ix_assignments_status_expected_return_date', 'status', 'expected_return_date'),
+        # Active assignments in id order (default listing, streamed export)
+        Index('ix_assignments_status', 'status'),
+        # Active assignments listed by due date (sort, overdue listing)
+        Index('ix_assignments_status_expected_return_key', 'status', 'expected_return_key'),
+        # Overdue reminders: only the not-yet-reported rows
+        Index('ix_assignments_status_overdue_reminded_at', 'status', 'overdue_reminded_at', 'expected_return_date'),
+        # Holdings by employee
+        Index('ix_assignments_employee_name_status', 'employee_name', 'status'),
+        # Per-asset history and timeline
+        Index('ix_assignments_oracle_number_assignment_date', 'oracle_number', 'assignment_date'),
+    )
 
 class RepairRequestForm(Base):
     __tablename__ = 'repair_request_form'
@@ -69,7 +97,7 @@ class RepairRequestForm(Base):
     asset_type = Column(String(100))
     asset_model = Column(String(100))
     repair_description = Column(Text)
-    start_date = Column(DateTime, default=datetime.utcnow)
+    start_date = Column(DateTime, nullable=False, default=datetime.utcnow)
     technician = Column(String(100))
     cost = Column(Float)
     notes = Column(Text)
@@ -78,6 +106,12 @@ class RepairRequestForm(Base):
     department = Column(String(100))
     designation = Column(String(100))
     voucher_file = Column(String(255))
+    __table_args__ = (
+        # Per-asset repair history and timeline
+        Index('ix_repair_request_form_oracle_number_start_date', 'oracle_number', 'start_date'),
+        # Repairs listing pages (open repairs are few, filters scan them)
+        Index('ix_repair_request_form_start_date', 'start_date'),
+    )
 
 class CompletionRepair(Base):
     __tablename__ = 'completion_repair'
@@ -86,7 +120,7 @@ class CompletionRepair(Base):
     asset_type = Column(String(100))
     asset_model = Column(String(100))
     repair_description = Column(Text)
-    start_date = Column(DateTime, default=datetime.utcnow)
+    start_date = Column(DateTime, nullable=False, default=datetime.utcnow)
     completion_date = Column(DateTime)
     technician = Column(String(100))
     cost = Column(Float)
@@ -98,6 +132,14 @@ class CompletionRepair(Base):
     designation = Column(String(100))
     return_date = Column(DateTime)
     voucher_file = Column(String(255))
+    __table_args__ = (
+        # Per-asset repair history and timeline
+        Index('ix_completion_repair_oracle_number_completion_date', 'oracle_number', 'completion_date'),
+        # Repairs listing pages, optionally by vendor or department
+        Index('ix_completion_repair_start_date', 'start_date'),
+        Index('ix_completion_repair_vendor_name_start_date', 'vendor_name', 'start_date'),
+        Index('ix_completion_repair_department_start_date', 'department', 'start_date'),
+    )
 
 class ReturnRecord(Base):
     __tablename__ = 'returns'
@@ -109,6 +151,13 @@ class ReturnRecord(Base):
     notes = Column(Text)
     timestamp = Column(DateTime, default=datetime.utcnow)
     voucher_filename = Column(String(255))
+    __table_args__ = (
+        # Per-asset return history and timeline
+        Index('ix_returns_oracle_number_return_date', 'oracle_number', 'return_date'),
+        # Returns listing: newest first, optionally by type
+        Index('ix_returns_return_date', 'return_date'),
+        Index('ix_returns_return_type_return_date', 'return_type', 'return_date'),
+    )
 
 class ActivityLog(Base):
     __tablename__ = 'activity_logs'
@@ -119,14 +168,40 @@ class ActivityLog(Base):
     asset_name = Column(String(100))
     employee_name = Column(String(100))
     department_name = Column(String(100))
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
     remarks = Column(Text)
 
+class ActivityLogArchive(Base):
+    """Activity log rows moved out of activity_logs by the retention job"""
+    __tablename__ = 'activity_logs_archive'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source_id = Column(Integer)  # id the row had in activity_logs
+    activity_type = Column(String(100), nullable=False)
+    asset_type = Column(String(100))
+    brand_name = Column(String(100))
+    asset_name = Column(String(100))
+    employee_name = Column(String(100))
+    department_name = Column(String(100))
+    timestamp = Column(DateTime, nullable=False, index=True)
+    remarks = Column(Text)
+    archive_month = Column(String(7), index=True)  # 'YYYY-MM' of timestamp
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
 class Counter(Base):
     __tablename__ = 'counters'
     id = Column(String(50), primary_key=True)
     seq = Column(Integer, default=0)
 
+class AnalyticsRollup(Base):
+    """Pre-aggregated count/total of one metric per time bucket and dimension value"""
+    __tablename__ = 'analytics_rollups'
+    metric = Column(String(50), primary_key=True)
+    granularity = Column(String(10), primary_key=True)  # 'day', 'week' or 'month'
+    bucket_start = Column(DateTime, primary_key=True)
+    dimension = Column(String(100), primary_key=True, default='')
+    count = Column(Integer, default=0)
+    total = Column(Float, default=0)
+
 class DeviceBrandMapping(Base):
     __tablename__ = 'device_brand_mappings'
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -144,4 +219,10 @@ class Auction(Base):
     serial_number = Column(String(100))
     price = Column(Float, nullable=False)
     auction_date = Column(DateTime, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    __table_args__ = (
+        # Per-asset auction history and timeline
+        Index('ix_auctions_oracle_number_auction_date', 'oracle_number', 'auction_date'),
+        # Listing and streamed export, newest first
+        Index('ix_auctions_created_at', 'created_at'),
+    )
@@ -0,0 +1,94 @@
+from flask import Blueprint, request, jsonify, current_app, g
+import sys
+import os
+
+# Add utils directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.database import get_db_session, close_db_session
+from utils.rollups import METRICS, READ_GRANULARITIES, backfill_rollups, query_rollups
+from utils.repair_analytics import repair_analytics
+from utils.pagination import PaginationError, parse_date_arg
+from utils.cache import cached, conditional
+from datetime import datetime, time
+
+analytics_bp = Blueprint('analytics', __name__)
+
+# Distinct date ranges of repair analytics kept cached at once
+REPAIR_ANALYTICS_CACHE_SIZE = 32
+
+@analytics_bp.route('/analytics/rollups', methods=['GET'])
+@conditional('analytics_rollups', 'assignments', 'completion_repair', 'returns', 'auctions')
+def get_rollups():
+    """Time series of a metric, e.g. ?metric=repairs&granularity=quarter&start=2024-01-01&by=dimension"""
+    metric = request.args.get('metric', 'assignments')
+    granularity = request.args.get('granularity', 'month')
+    if metric not in METRICS:
+        return jsonify({'error': f"metric must be one of: {', '.join(METRICS)}"}), 400
+    if granularity not in READ_GRANULARITIES:
+        return jsonify({'error': f"granularity must be one of: {', '.join(READ_GRANULARITIES)}"}), 400
+    try:
+        start = parse_date_arg(request.args.get('start'), 'start')
+        end = parse_date_arg(request.args.get('end'), 'end')
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    db = get_db_session()
+    try:
+        series = query_rollups(db, metric, granularity, start, end,
+                               by_dimension=request.args.get('by') == 'dimension')
+        model, date_column, dimension_column, amount_column = METRICS[metric]
+        return jsonify({
+            'metric': metric,
+            'granularity': granularity,
+            'date_column': date_column,
+            'dimension': dimension_column,
+            'amount': amount_column,
+            'series': series
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        close_db_session(db)
+
+@analytics_bp.route('/analytics/rollups/backfill', methods=['POST'])
+def backfill():
+    """Rebuild rollup buckets from the raw tables (optionally ?metric=...)"""
+    metric = request.args.get('metric')
+    if metric and metric not in METRICS:
+        return jsonify({'error': f"metric must be one of: {', '.join(METRICS)}"}), 400
+    try:
+        processed = backfill_rollups(current_app.config['SessionLocal'], [metric] if metric else None)
+        if processed is None:
+            return jsonify({'error': 'A rollup backfill is already running'}), 409
+        return jsonify({'processed': processed}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/analytics/repairs', methods=['GET'])
+@conditional('completion_repair', 'assets')
+def get_repair_analytics():
+    """MTTR, duration percentiles, spend per vendor and failure rate per model (?start=&end= on completion date)"""
+    try:
+        start = parse_date_arg(request.args.get('start'), 'start')
+        end = parse_date_arg(request.args.get('end'), 'end', end_of_day=True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # Whole days, so every spelling of a range shares one cache entry
+    if start is not None:
+        start = datetime.combine(start.date(), time.min)
+    if end is not None:
+        end = datetime.combine(end.date(), time.max)
+
+    def load():
+        db = get_db_session()
+        try:
+            return repair_analytics(db, start, end)
+        finally:
+            close_db_session(db)
+
+    try:
+        # Rebuilt once a completed repair or asset change commits
+        return jsonify(cached('repair_analytics', load, key=(start, end), version=g.table_generations,
+                              max_keys=REPAIR_ANALYTICS_CACHE_SIZE)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
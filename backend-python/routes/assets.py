@@ -1,8 +1,11 @@
 # --- Assets Routes with SQLAlchemy ---
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, g
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func
+from sqlalchemy import or_, and_, func, bindparam
+from sqlalchemy.orm.exc import StaleDataError
 from datetime import datetime, timedelta
+import csv
+import io
 import json
 import re
 import sys
@@ -10,11 +13,23 @@ import os
 
 # Add utils directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from utils.database import get_db_session, get_models, handle_db_error, close_db_session
-from utils.serializers import activity_serializer, asset_serializer
+from utils.database import get_db_session, get_models, handle_db_error, close_db_session, insert_returning_ids
+from utils.serializers import activity_serializer, asset_serializer, json_response, ACTIVITY_ROW, ASSET_ROW
+from utils.queries import enriched_asset_query, serialize_enriched_asset, serialize_enriched_assets
+from utils.pagination import PaginationError, parse_sort, parse_limit, keyset_page, keyset_order, encode_cursor, decode_cursor
+from utils.search_index import asset_search_index
+from utils.timeline import asset_timeline
+from utils.existence_index import existence_index, number_key
+from utils.streaming import wants_stream, stream_rows, keyset_chunks
+from utils.events import Change, record_changes
+from utils.activity_writer import activity_writer
+from utils.cache import cached, conditional
 
 assets_bp = Blueprint('assets', __name__)
 
+# Search hits looked up per Asset.id IN (...) list while walking the ranking
+SEARCH_ID_LIMIT = 1000
+
 # Device type to brand mappings
 DEVICE_BRAND_MAPPINGS = {
     'Laptop': ['Dell', 'HP', 'Lenovo'],
@@ -32,8 +47,13 @@ DEVICE_BRAND_MAPPINGS = {
     'Other': []
 }
 
+_mappings_initialized = False
+
 def initialize_device_brand_mappings():
     """Initialize device brand mappings in database if not exists"""
+    global _mappings_initialized
+    if _mappings_initialized:
+        return
     db = get_db_session()
     try:
         # Get the DeviceBrandMapping model
@@ -51,6 +71,7 @@ def initialize_device_brand_mappings():
                     )
                     db.add(mapping)
                 db.commit()
+            _mappings_initialized = True
     except Exception as e:
         db.rollback()
         print(f"Error initializing device brand mappings: {e}")
@@ -60,32 +81,77 @@ def initialize_device_brand_mappings():
 
 
 @assets_bp.route('/recent-activities', methods=['GET'])
+@conditional('activity_logs')
 def get_recent_activities():
     db = get_db_session()
     try:
         models = get_models()
         ActivityLog = models.get('ActivityLog')
 
-        activities = db.query(ActivityLog).order_by(ActivityLog.timestamp.desc()).limit(10).all()
+        activities = db.query(*ACTIVITY_ROW.columns(ActivityLog)).order_by(ActivityLog.timestamp.desc()).limit(10).all()
 
         db.commit()
-        return jsonify([activity_serializer(a) for a in activities]), 200
+        return json_response(ACTIVITY_ROW.many(activities))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
         close_db_session(db)
 
+def _ranked_rows(query, Asset, ranked_ids, start=0, limit=None):
+    """Rows of `query` among ranked_ids[start:], in rank order.
+
+    The ranking is walked SEARCH_ID_LIMIT ids per statement, the remaining
+    filters applying in SQL, and with a limit only until limit + 1 rows
+    passed them. Returns (rows, next_start): the rank position the
+    following page starts at, or None when no more rows match.
+    """
+    rows, positions = [], []
+    for chunk_start in range(start, len(ranked_ids), SEARCH_ID_LIMIT):
+        chunk = ranked_ids[chunk_start:chunk_start + SEARCH_ID_LIMIT]
+        found = {row.id: row for row in query.filter(Asset.id.in_(chunk))}
+        for position, asset_id in enumerate(chunk, start=chunk_start):
+            if asset_id in found:
+                rows.append(found[asset_id])
+                positions.append(position)
+        if limit is not None and len(rows) > limit:
+            return rows[:limit], positions[limit - 1] + 1
+    return rows, None
+
+def _relevance_page(query, Asset, ranked_ids):
+    """Rows of `query` in search-rank order.
+
+    Without limit/cursor arguments every match is returned and next_start is
+    False. Otherwise the page starts at the rank position held in the cursor
+    and next_start is where the following page begins (None on the last
+    page). Returns (rows, next_start, total_matches); the total is only
+    counted (None otherwise) when include_total is asked for.
+    """
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        rows, _ = _ranked_rows(query, Asset, ranked_ids)
+        return rows, False, len(rows)
+
+    cursor = request.args.get('cursor')
+    start = decode_cursor(cursor, 'relevance')[0] if cursor else 0
+    if not isinstance(start, int) or start < 0:
+        raise PaginationError('Invalid cursor')
+    rows, next_start = _ranked_rows(query, Asset, ranked_ids, start, parse_limit(request.args.get('limit')))
+
+    total = None
+    if request.args.get('include_total') == 'true':
+        ids = query.with_entities(Asset.id).order_by(None)
+        total = sum(len({asset_id for (asset_id,) in ids.filter(Asset.id.in_(ranked_ids[i:i + SEARCH_ID_LIMIT]))})
+                    for i in range(0, len(ranked_ids), SEARCH_ID_LIMIT))
+    return rows, next_start, total
+
 @assets_bp.route('/assets', methods=['GET'])
+@conditional('assets', 'assignments', 'returns', 'repair_request_form')
 def get_assets():
     db = get_db_session()
     try:
         models = get_models()
         Asset = models.get('Asset')
-        Assignment = models.get('Assignment')
-        ReturnRecord = models.get('ReturnRecord')
-        RepairRequestForm = models.get('RepairRequestForm')
 
-        query = db.query(Asset)
+        query = enriched_asset_query(db, models)
 
         # Apply filters
         device_type = request.args.get('device_type')
@@ -102,8 +168,18 @@ def get_assets():
         if oracle_number:
             query = query.filter(Asset.oracle_number.ilike(f'%{oracle_number}%'))
 
-        # General search across multiple fields
-        if search:
+        # General search across multiple fields: ranked ids from the trigram
+        # index, or substring matching in SQL while the index isn't warmed
+        ranked_ids = None
+        if search and asset_search_index.ready:
+            # Rebuilt first if another process wrote assets since
+            asset_search_index.refresh(current_app.config['SessionLocal'], Asset, g.table_generations[0])
+            ranked_ids = asset_search_index.search(search)
+            if request.args.get('sort'):
+                # Sorted listings filter on every hit; integer literals don't
+                # count against the driver's bound parameter limit
+                query = query.filter(Asset.id.in_(bindparam('search_ids', ranked_ids, literal_execute=True)))
+        elif search:
             query = query.filter(
                 or_(
                     Asset.oracle_number.ilike(f'%{search}%'),
@@ -148,114 +224,145 @@ def get_assets():
         if request.args.get('unassigned') == 'true':
             query = query.filter(or_(Asset.assigned_to.is_(None), Asset.assigned_to == ''))
 
-        assets = query.all()
-
-        # Enrich assets with return information, repair status, and current holder
-        enriched_assets = []
-        for asset in assets:
-            asset_data = asset_serializer(asset)
-
-            # Get current holder from assignments
-            assignment = db.query(Assignment).filter(
-                and_(
-                    Assignment.oracle_number == asset.oracle_number,
-                    Assignment.status == 'assigned'
-                )
-            ).first()
-
-            # Debug logging
-            print(f"Debug: Asset {asset.oracle_number}, Assignment found: {assignment is not None}")
-            if assignment:
-                print(f"Debug: Assignment employee: {assignment.employee_name}, status: {assignment.status}")
-                asset_data['current_holder'] = assignment.employee_name
-                asset_data['assignment_date'] = assignment.assignment_date.isoformat() if assignment.assignment_date else ''
-                asset_data['return_date'] = assignment.actual_return_date.isoformat() if assignment.actual_return_date else ''
-            else:
-                print(f"Debug: No assignment found for {asset.oracle_number}")
-                asset_data['current_holder'] = 'Not Assigned'
-                asset_data['assignment_date'] = ''
-                asset_data['return_date'] = ''
-
-            # Check if asset has been returned with buyback
-            return_record = db.query(ReturnRecord).filter(
-                and_(
-                    ReturnRecord.oracle_number == asset.oracle_number,
-                    ReturnRecord.return_type == 'buyback'
-                )
-            ).order_by(ReturnRecord.timestamp.desc()).first()
-
-            if return_record:
-                asset_data['return_type'] = 'buyback'
-
-            # Check if asset is under repair
-            repair = db.query(RepairRequestForm).filter(
-                RepairRequestForm.oracle_number == asset.oracle_number
-            ).first()
-
-            if repair:
-                asset_data['status'] = 'under repair'
-
-            enriched_assets.append(asset_data)
-
-        db.commit()
-        return jsonify(enriched_assets), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-    finally:
-        close_db_session(db)
+        # Server-side sorting; 'id' keeps the historical table order
+        sort_columns = {
+            'id': Asset.id,
+            'oracle_number': Asset.oracle_number,
+            'device_type': Asset.device_type,
+            'created_at': Asset.created_at,
+            'updated_at': Asset.updated_at
+        }
+        sort_name, sort_column, descending = parse_sort(request.args.get('sort'), sort_columns, 'id')
+
+        # Search results are ordered by relevance unless a sort was asked for
+        if ranked_ids is not None and not request.args.get('sort'):
+            rows, next_start, total = _relevance_page(query, Asset, ranked_ids)
+            items = serialize_enriched_assets(rows)
+            db.commit()
+            if next_start is False:
+                return json_response(items)
+            page = {
+                'items': items,
+                'next_cursor': encode_cursor('relevance', [next_start]) if next_start else None
+            }
+            if total is not None:
+                page['total'] = total
+            return json_response(page)
+
+        # Full listing order (keyset pages apply their own)
+        listing_query = query
+        if request.args.get('sort'):
+            listing_query = query.order_by(*keyset_order(sort_column, Asset.id, descending))
+
+        sort_field = sort_name.lstrip('-')
+        row_key = lambda row: (getattr(row, sort_field), row.id)
+
+        # Streamed listing: rows are fetched in keyset chunks and written as serialized
+        if wants_stream():
+            response = stream_rows(
+                keyset_chunks(lambda cursor_values, limit: keyset_page(
+                    query, sort_column, Asset.id, descending, cursor_values, limit, key=row_key
+                )),
+                serialize_enriched_asset,
+                [db]
+            )
+            db = None
+            return response
+
+        # Keyset pagination when a limit or cursor is given, otherwise the full list
+        if 'limit' in request.args or 'cursor' in request.args:
+            total = None
+            if request.args.get('include_total') == 'true':
+                total = query.order_by(None).count()
+
+            cursor = request.args.get('cursor')
+            rows, last_key = keyset_page(
+                query, sort_column, Asset.id, descending,
+                decode_cursor(cursor, sort_name) if cursor else None,
+                parse_limit(request.args.get('limit')),
+                key=row_key
+            )
 
-@assets_bp.route('/assets/device-types', methods=['GET'])
-def get_device_types():
-    initialize_device_brand_mappings()
-    db = get_db_session()
-    try:
-        models = get_models()
-        DeviceBrandMapping = models.get('DeviceBrandMapping')
+            page = {
+                'items': serialize_enriched_assets(rows),
+                'next_cursor': encode_cursor(sort_name, last_key) if last_key else None
+            }
+            if total is not None:
+                page['total'] = total
+            db.commit()
+            return json_response(page)
 
-        device_types = db.query(DeviceBrandMapping.device_type).distinct().all()
-        device_types = [dt[0] for dt in device_types]
+        # Asset rows and their enrichment (current holder, buyback, under repair)
+        # come back from one joined query instead of three lookups per asset
+        enriched_assets = serialize_enriched_assets(listing_query.all())
 
         db.commit()
-        return jsonify(device_types), 200
+        return json_response(enriched_assets)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
         close_db_session(db)
 
-@assets_bp.route('/assets/brands/<device_type>', methods=['GET'])
-def get_brands_for_device(device_type):
-    initialize_device_brand_mappings()
+def _load_catalog():
+    """Device types and their brands (predefined plus any used on assets)"""
     db = get_db_session()
     try:
         models = get_models()
         DeviceBrandMapping = models.get('DeviceBrandMapping')
         Asset = models.get('Asset')
 
-        # Get predefined brands
-        mapping = db.query(DeviceBrandMapping).filter(DeviceBrandMapping.device_type == device_type).first()
-        brands = []
-        if mapping:
-            brands = json.loads(mapping.brands) if mapping.brands else []
+        device_types = []
+        brands = {}
+        for device_type, mapping_brands in db.query(DeviceBrandMapping.device_type, DeviceBrandMapping.brands):
+            if device_type not in brands:
+                device_types.append(device_type)
+                brands[device_type] = []
+            for brand in json.loads(mapping_brands) if mapping_brands else []:
+                if brand not in brands[device_type]:
+                    brands[device_type].append(brand)
 
         # Also include any custom brands from assets
-        custom_brands = db.query(Asset.brand_name).filter(
+        custom_brands = db.query(Asset.device_type, Asset.brand_name).filter(
             and_(
-                Asset.device_type == device_type,
                 Asset.brand_name.isnot(None),
                 Asset.brand_name != ''
             )
-        ).distinct().all()
-        custom_brands = [cb[0] for cb in custom_brands]
+        ).distinct().order_by(Asset.brand_name).all()
+        for device_type, brand in custom_brands:
+            device_brands = brands.setdefault(device_type, [])
+            if brand not in device_brands:
+                device_brands.append(brand)
 
-        all_brands = list(set(brands + custom_brands))
-        db.commit()
-        return jsonify(all_brands), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return {'device_types': device_types, 'brands': brands}
     finally:
         close_db_session(db)
 
+@assets_bp.route('/assets/device-types', methods=['GET'])
+@conditional('device_brand_mappings', 'assets')
+def get_device_types():
+    # Seeds once per process; a no-op afterwards
+    initialize_device_brand_mappings()
+    try:
+        # Rebuilt once a write to either table commits, in any process
+        catalog = cached('catalog', _load_catalog, version=g.table_generations)
+        return jsonify(catalog['device_types']), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@assets_bp.route('/assets/brands/<device_type>', methods=['GET'])
+@conditional('device_brand_mappings', 'assets')
+def get_brands_for_device(device_type):
+    initialize_device_brand_mappings()
+    try:
+        catalog = cached('catalog', _load_catalog, version=g.table_generations)
+        return jsonify(catalog['brands'].get(device_type, [])), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @assets_bp.route('/assets/oracle-numbers/<device_type>', methods=['GET'])
+@conditional('assets', 'assignments')
 def get_new_oracle_numbers(device_type):
     """Get new oracle numbers for a specific device type"""
     db = get_db_session()
@@ -297,6 +404,7 @@ def get_new_oracle_numbers(device_type):
         close_db_session(db)
 
 @assets_bp.route('/assets/oracle/<oracle_number>', methods=['GET'])
+@conditional('assets', 'assignments')
 def get_asset_by_oracle_number(oracle_number):
     """Get asset and employee details by oracle number"""
     db = get_db_session()
@@ -347,6 +455,7 @@ def get_asset_by_oracle_number(oracle_number):
         close_db_session(db)
 
 @assets_bp.route('/assets/<oracle_number>', methods=['GET'])
+@conditional('assets', 'assignments')
 def get_asset_details(oracle_number):
     """Get comprehensive asset details by oracle number"""
     db = get_db_session()
@@ -396,6 +505,7 @@ def get_asset_details(oracle_number):
         close_db_session(db)
 
 @assets_bp.route('/assets/<oracle_number>/assignment-history', methods=['GET'])
+@conditional('assets', 'assignments')
 def get_assignment_history(oracle_number):
     """Get all assignment history for a specific asset"""
     db = get_db_session()
@@ -428,40 +538,47 @@ def get_assignment_history(oracle_number):
     finally:
         close_db_session(db)
 
-def log_activity(activity_type, asset):
+@assets_bp.route('/assets/<oracle_number>/timeline', methods=['GET'])
+@conditional('assets', 'assignments', 'repair_request_form', 'completion_repair', 'returns', 'auctions')
+def get_asset_timeline(oracle_number):
+    """Every lifecycle event of an asset in one chronological feed.
+
+    ?order=desc lists newest first; limit/cursor page through the events.
+    """
     db = get_db_session()
     try:
-        models = get_models()
-        ActivityLog = models.get('ActivityLog')
-        Assignment = models.get('Assignment')
-
-        employee_name = asset.assigned_to or ''
-        department_name = ''
-        if employee_name:
-            assignment = db.query(Assignment).filter(
-                and_(Assignment.employee_name == employee_name, Assignment.status == 'assigned')
-            ).first()
-            if assignment:
-                department_name = assignment.department
-
-        activity = ActivityLog(
-            activity_type=activity_type,
-            asset_type=asset.device_type,
-            brand_name=asset.brand_name,
-            asset_name=asset.model_name,
-            employee_name=employee_name,
-            department_name=department_name,
-            timestamp=datetime.utcnow(),
-            remarks=''
+        descending = request.args.get('order') == 'desc'
+        sort_name = 'timeline-desc' if descending else 'timeline'
+        cursor = request.args.get('cursor')
+        events, last_key = asset_timeline(
+            db, get_models(), oracle_number,
+            decode_cursor(cursor, sort_name) if cursor else None,
+            parse_limit(request.args.get('limit')),
+            descending
         )
-        db.add(activity)
         db.commit()
+        return json_response({
+            'oracle_number': oracle_number,
+            'items': events,
+            'next_cursor': encode_cursor(sort_name, last_key) if last_key else None
+        })
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        db.rollback()
-        print(f"Error logging activity: {e}")
+        return jsonify({'error': str(e)}), 500
     finally:
         close_db_session(db)
 
+def log_activity(activity_type, asset):
+    # Written in the background; the department is captured now
+    activity_writer.log(
+        activity_type,
+        asset_type=asset.device_type,
+        brand_name=asset.brand_name,
+        asset_name=asset.model_name,
+        employee_name=asset.assigned_to or ''
+    )
+
 @assets_bp.route('/assets/update-status', methods=['POST'])
 def update_asset_status():
     """Update asset status by oracle number"""
@@ -487,6 +604,10 @@ def update_asset_status():
         db.commit()
 
         return jsonify({'success': True, 'message': 'Asset status updated successfully'}), 200
+    except StaleDataError:
+        # Answered with 409 by the app's StaleDataError handler
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         return jsonify({'error': str(e)}), 500
@@ -494,6 +615,7 @@ def update_asset_status():
         close_db_session(db)
 
 @assets_bp.route('/assets/assigned', methods=['GET'])
+@conditional('assets', 'assignments')
 def get_assigned_oracle_numbers():
     """Get all Oracle numbers that are currently assigned"""
     db = get_db_session()
@@ -521,6 +643,7 @@ def get_assigned_oracle_numbers():
         close_db_session(db)
 
 @assets_bp.route('/assets/<oracle_number>/assignment-details', methods=['GET'])
+@conditional('assets', 'assignments')
 def get_assignment_details(oracle_number):
     """Get assignment details for a specific Oracle number"""
     db = get_db_session()
@@ -602,12 +725,15 @@ def add_brand_to_device_type():
 
 @assets_bp.route('/assets/check-oracle/<oracle_number>', methods=['GET'])
 def check_oracle_number(oracle_number):
+    # Numbers the existence index has never seen need no database round trip
+    if not existence_index.may_have_oracle_number(oracle_number):
+        return jsonify({'exists': False}), 200
+
     db = get_db_session()
     try:
         models = get_models()
         Asset = models.get('Asset')
-        exists = db.query(Asset).filter(Asset.oracle_number == oracle_number).first() is not None
-        db.commit()
+        exists = db.query(Asset.id).filter(Asset.oracle_number == oracle_number).first() is not None
         return jsonify({'exists': exists}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -616,18 +742,60 @@ def check_oracle_number(oracle_number):
 
 @assets_bp.route('/assets/check-serial/<serial_number>', methods=['GET'])
 def check_serial_number(serial_number):
+    if not existence_index.may_have_serial_number(serial_number):
+        return jsonify({'exists': False}), 200
+
     db = get_db_session()
     try:
         models = get_models()
         Asset = models.get('Asset')
-        exists = db.query(Asset).filter(Asset.serial_number == serial_number).first() is not None
-        db.commit()
+        exists = db.query(Asset.id).filter(Asset.serial_number == serial_number).first() is not None
         return jsonify({'exists': exists}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
         close_db_session(db)
 
+@assets_bp.route('/assets/check-batch', methods=['POST'])
+def check_numbers_batch():
+    """Check many oracle and serial numbers in one round trip"""
+    data = request.get_json(silent=True) or {}
+    oracle_numbers = data.get('oracle_numbers') or []
+    serial_numbers = data.get('serial_numbers') or []
+    if not isinstance(oracle_numbers, list) or not isinstance(serial_numbers, list):
+        return jsonify({'error': 'oracle_numbers and serial_numbers must be lists'}), 400
+
+    oracle_numbers = {str(n) for n in oracle_numbers if n}
+    serial_numbers = {str(n) for n in serial_numbers if n}
+
+    # Only index hits need confirming, with one IN query per kind
+    oracle_candidates = [n for n in oracle_numbers if existence_index.may_have_oracle_number(n)]
+    serial_candidates = [n for n in serial_numbers if existence_index.may_have_serial_number(n)]
+
+    db = get_db_session()
+    try:
+        models = get_models()
+        Asset = models.get('Asset')
+
+        existing_oracle = set()
+        if oracle_candidates:
+            existing_oracle = {number_key(n) for (n,) in db.query(Asset.oracle_number).filter(
+                Asset.oracle_number.in_(oracle_candidates))}
+        existing_serial = set()
+        if serial_candidates:
+            existing_serial = {number_key(n) for (n,) in db.query(Asset.serial_number).filter(
+                Asset.serial_number.in_(serial_candidates)).distinct()}
+
+        # The database matched under its collation, so compare the same way
+        return jsonify({
+            'oracle_numbers': {n: number_key(n) in existing_oracle for n in oracle_numbers},
+            'serial_numbers': {n: number_key(n) in existing_serial for n in serial_numbers}
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        close_db_session(db)
+
 def parse_warranty_expiry(expiry_input):
     """
     Parse warranty expiry input string and return a datetime object.
@@ -667,6 +835,36 @@ def parse_warranty_expiry(expiry_input):
     # If all parsing fails, return None
     return None
 
+def build_asset_values(data):
+    """Column values for a new asset from request data (JSON object or CSV row)"""
+    # Parse dates if provided
+    purchase_date = None
+    if data.get('purchase_date'):
+        try:
+            purchase_date = datetime.fromisoformat(data['purchase_date'].replace('Z', '+00:00'))
+        except:
+            purchase_date = None
+
+    # Parse warranty expiry input
+    warranty_expiry = parse_warranty_expiry(data.get('warranty_expiry', ''))
+
+    now = datetime.utcnow()
+    return {
+        'oracle_number': data['oracle_number'],
+        'device_type': data['device_type'],
+        'brand_name': data.get('brand_name', ''),
+        'model_name': data.get('model_name', ''),
+        'serial_number': data.get('serial_number', ''),
+        'unit_price': float(data.get('unit_price', 0)) if data.get('unit_price') else None,
+        'purchase_date': purchase_date,
+        'warranty_expiry': warranty_expiry,
+        'vendor_name': data.get('vendor_name', ''),
+        'tender_no': data.get('tender_no', ''),
+        'notes': data.get('notes', ''),
+        'created_at': now,
+        'updated_at': now
+    }
+
 @assets_bp.route('/assets', methods=['POST'])
 def add_asset():
     data = request.json
@@ -685,32 +883,7 @@ def add_asset():
         if existing_asset:
             return jsonify({'error': 'Oracle Number already exists'}), 400
 
-        # Parse dates if provided
-        purchase_date = None
-        if data.get('purchase_date'):
-            try:
-                purchase_date = datetime.fromisoformat(data['purchase_date'].replace('Z', '+00:00'))
-            except:
-                purchase_date = None
-
-        # Parse warranty expiry input
-        warranty_expiry = parse_warranty_expiry(data.get('warranty_expiry', ''))
-        
-        asset = Asset(
-            oracle_number=data['oracle_number'],
-            device_type=data['device_type'],
-            brand_name=data.get('brand_name', ''),
-            model_name=data.get('model_name', ''),
-            serial_number=data.get('serial_number', ''),
-            unit_price=float(data.get('unit_price', 0)) if data.get('unit_price') else None,
-            purchase_date=purchase_date,
-            warranty_expiry=warranty_expiry,
-            vendor_name=data.get('vendor_name', ''),
-            tender_no=data.get('tender_no', ''),
-            notes=data.get('notes', ''),
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
-        )
+        asset = Asset(**build_asset_values(data))
 
         db.add(asset)
         db.commit()
@@ -722,3 +895,123 @@ def add_asset():
         return jsonify({'error': str(e)}), 500
     finally:
         close_db_session(db)
+
+# Bulk import limits
+BULK_MAX_ROWS = 20000
+BULK_BATCH_SIZE = 1000
+
+def _read_bulk_rows():
+    """Rows from a CSV upload ('file'), a text/csv body or a JSON array"""
+    if 'file' in request.files:
+        text = request.files['file'].read().decode('utf-8-sig')
+        return list(csv.DictReader(io.StringIO(text)))
+    if request.mimetype == 'text/csv':
+        return list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('assets')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of assets or a CSV file')
+    return data
+
+@assets_bp.route('/assets/bulk', methods=['POST'])
+def add_assets_bulk():
+    """Import many assets in one transaction with per-row error reporting"""
+    try:
+        rows = _read_bulk_rows()
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': str(e)}), 400
+    if not rows:
+        return jsonify({'error': 'No assets provided'}), 400
+    if len(rows) > BULK_MAX_ROWS:
+        return jsonify({'error': f'At most {BULK_MAX_ROWS} assets can be imported at once'}), 400
+
+    errors = []
+    candidates = []
+    seen = set()
+    for index, data in enumerate(rows, start=1):
+        if not isinstance(data, dict):
+            errors.append({'row': index, 'error': 'Row must be an object'})
+            continue
+        # CSV cells arrive as strings with stray whitespace
+        data = {(k or '').strip(): v.strip() if isinstance(v, str) else v for k, v in data.items()}
+        missing = [field for field in ('oracle_number', 'device_type') if not data.get(field)]
+        if missing:
+            errors.append({'row': index, 'oracle_number': data.get('oracle_number', ''),
+                           'error': f'{missing[0]} is required'})
+            continue
+        oracle_number = str(data['oracle_number'])
+        # Compared the way the unique key's collation does ('OR-1' == 'or-1 ')
+        if number_key(oracle_number) in seen:
+            errors.append({'row': index, 'oracle_number': oracle_number,
+                           'error': 'Duplicate Oracle Number in upload'})
+            continue
+        try:
+            values = build_asset_values(dict(data, oracle_number=oracle_number))
+        except (ValueError, TypeError) as e:
+            errors.append({'row': index, 'oracle_number': oracle_number, 'error': f'Invalid value: {e}'})
+            continue
+        seen.add(number_key(oracle_number))
+        candidates.append((index, values))
+
+    db = get_db_session()
+    try:
+        models = get_models()
+        Asset = models.get('Asset')
+        ActivityLog = models.get('ActivityLog')
+
+        # Set-based uniqueness check, one IN list per batch of the upload
+        numbers = [values['oracle_number'] for index, values in candidates]
+        existing = set()
+        for start in range(0, len(numbers), BULK_BATCH_SIZE):
+            existing.update(number_key(n) for (n,) in db.query(Asset.oracle_number).filter(
+                Asset.oracle_number.in_(numbers[start:start + BULK_BATCH_SIZE])))
+
+        new_assets = []
+        for index, values in candidates:
+            if number_key(values['oracle_number']) in existing:
+                errors.append({'row': index, 'oracle_number': values['oracle_number'],
+                               'error': 'Oracle Number already exists'})
+            else:
+                new_assets.append(values)
+
+        if new_assets:
+            # Core inserts bypass the unit of work, so each batch is reported to
+            # the commit hooks as stored, ids included
+            connection = db.connection()
+            for start in range(0, len(new_assets), BULK_BATCH_SIZE):
+                asset_ids = insert_returning_ids(connection, Asset.__table__,
+                                                 new_assets[start:start + BULK_BATCH_SIZE])
+                inserted = db.query(*ASSET_ROW.columns(Asset)).filter(Asset.id.in_(asset_ids)).all()
+                record_changes(db, [Change('assets', 'insert', dict(row._mapping), {}) for row in inserted])
+
+            now = datetime.utcnow()
+            activities = [{
+                'activity_type': 'Added',
+                'asset_type': values['device_type'],
+                'brand_name': values['brand_name'],
+                'asset_name': values['model_name'],
+                'employee_name': '',
+                'department_name': '',
+                'timestamp': now,
+                'remarks': ''
+            } for values in new_assets]
+            for start in range(0, len(activities), BULK_BATCH_SIZE):
+                batch = activities[start:start + BULK_BATCH_SIZE]
+                activity_ids = insert_returning_ids(connection, ActivityLog.__table__, batch)
+                record_changes(db, [Change('activity_logs', 'insert', dict(activity, id=activity_id), {})
+                                    for activity, activity_id in zip(batch, activity_ids)])
+
+        db.commit()
+        errors.sort(key=lambda error: error['row'])
+        status_code = 201 if new_assets else 400
+        return jsonify({
+            'inserted': len(new_assets),
+            'failed': len(errors),
+            'errors': errors
+        }), status_code
+    except Exception as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        close_db_session(db)
@@ -1,116 +1,228 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import bindparam, inspect, update
+import csv
+import io
+import json
 import sys
 import os
 
 # Add utils directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from utils.database import get_db_session, get_models, handle_db_error, close_db_session
-from utils.serializers import assignment_serializer
-from datetime import datetime
+from utils.database import get_db_session, get_models, handle_db_error, close_db_session, insert_returning_ids
+from utils.serializers import json_response, ASSET_ROW
+from utils.streaming import wants_stream, stream_rows, keyset_chunks
+from utils.queries import enriched_assignment_query, serialize_enriched_assignment, serialize_enriched_assignments
+from utils.pagination import PaginationError, parse_sort, parse_limit, keyset_page, keyset_order, encode_cursor, decode_cursor
+from utils.cache import conditional
+from utils.counters import read_counters
+from utils.events import Change, record_changes
+from utils.existence_index import number_key
+from utils.overdue import scan_overdue
+from utils import transitions
+from utils.transitions import TransitionError, ALLOWED_FROM
+from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
-from models import Assignment, Asset, RepairRequestForm
+from models import Assignment, Asset, NO_RETURN_DATE
 
 assignments_bp = Blueprint('assignments', __name__)
 
-# Get all assignments
-@assignments_bp.route('/assignments', methods=['GET'])
-def get_assignments():
+def _list_assignments():
+    """Active assignments with asset details, shared by the listing routes.
+
+    Optional filters: department, employee (exact employee name). With a
+    limit or cursor the response is a keyset page {items, next_cursor}.
+    """
     db = get_db_session()
     try:
-        # Only fetch assignments with status 'assigned'
-        assignments = db.query(Assignment).filter(Assignment.status == 'assigned').all()
-        enriched_assignments = []
-        for assignment in assignments:
-            oracle_number = assignment.oracle_number
-            asset = db.query(Asset).filter(Asset.oracle_number == oracle_number).first() if oracle_number else None
-            asset_status = 'assigned'
-            if asset:
-                # Check if asset is under repair
-                repair_request = db.query(RepairRequestForm).filter(
-                    RepairRequestForm.oracle_number == oracle_number
-                ).first()
-                if repair_request:
-                    asset_status = 'under repair'
-                else:
-                    asset_status = asset.status
-
-            assignment_data = assignment_serializer(assignment, asset_status)
-            if asset:
-                assignment_data['device_name'] = asset.model_name or asset.device_type
-                assignment_data['asset_type'] = asset.device_type
-                assignment_data['model'] = asset.model_name
-                assignment_data['brand'] = asset.brand_name
-                assignment_data['serial_number'] = asset.serial_number
-            else:
-                assignment_data['device_name'] = ''
-                assignment_data['asset_type'] = ''
-                assignment_data['model'] = ''
-                assignment_data['brand'] = ''
-                assignment_data['serial_number'] = ''
-            enriched_assignments.append(assignment_data)
+        models = get_models()
+        query = enriched_assignment_query(db, models).filter(Assignment.status == 'assigned')
+
+        department = request.args.get('department')
+        employee = request.args.get('employee')
+        if department and department != 'All':
+            query = query.filter(Assignment.department == department)
+        if employee:
+            query = query.filter(Assignment.employee_name == employee)
+
+        sort_columns = {
+            'id': Assignment.id,
+            'assignment_date': Assignment.assignment_date,
+            # NOT NULL key of the date, so pages seek (status, expected_return_key)
+            'expected_return_date': Assignment.expected_return_key,
+            'employee_name': Assignment.employee_name
+        }
+        sort_name, sort_column, descending = parse_sort(request.args.get('sort'), sort_columns, 'id')
+
+        # Same order as the keyset pages and streamed chunks
+        listing_query = query.order_by(*keyset_order(sort_column, Assignment.id, descending))
+
+        sort_field = sort_name.lstrip('-')
+        if sort_field == 'expected_return_date':
+            row_key = lambda row: (row.expected_return_date or NO_RETURN_DATE, row.id)
+        else:
+            row_key = lambda row: (getattr(row, sort_field), row.id)
+
+        if wants_stream():
+            response = stream_rows(
+                keyset_chunks(lambda cursor_values, limit: keyset_page(
+                    query, sort_column, Assignment.id, descending, cursor_values, limit, key=row_key
+                )),
+                serialize_enriched_assignment,
+                [db]
+            )
+            db = None
+            return response
+
+        if 'limit' in request.args or 'cursor' in request.args:
+            total = None
+            if request.args.get('include_total') == 'true':
+                total = query.order_by(None).count()
+
+            cursor = request.args.get('cursor')
+            rows, last_key = keyset_page(
+                query, sort_column, Assignment.id, descending,
+                decode_cursor(cursor, sort_name) if cursor else None,
+                parse_limit(request.args.get('limit')),
+                key=row_key
+            )
+            page = {
+                'items': serialize_enriched_assignments(rows),
+                'next_cursor': encode_cursor(sort_name, last_key) if last_key else None
+            }
+            if total is not None:
+                page['total'] = total
+            db.commit()
+            return json_response(page)
+
+        # Asset details and the under-repair override come from the same
+        # joined statement instead of two lookups per assignment
+        enriched_assignments = serialize_enriched_assignments(listing_query.all())
         db.commit()
-        return jsonify(enriched_assignments), 200
+        return json_response(enriched_assignments)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
         close_db_session(db)
 
+# Get all assignments
+@assignments_bp.route('/assignments', methods=['GET'])
+@conditional('assignments', 'assets', 'repair_request_form')
+def get_assignments():
+    return _list_assignments()
+
 # Get all assignments with full details
 @assignments_bp.route('/assignments/all', methods=['GET'])
+@conditional('assignments', 'assets', 'repair_request_form')
 def get_all_assignments():
+    return _list_assignments()
+
+# Overdue (and optionally soon-due) active assignments
+@assignments_bp.route('/assignments/overdue', methods=['GET'])
+def get_overdue_assignments():
+    """Active assignments past their expected return date, most overdue first.
+
+    ?within_days=N also includes those due in the next N days. Filters:
+    department. With a limit or cursor the response is a keyset page.
+    """
     db = get_db_session()
     try:
-        # Only fetch assignments with status 'assigned'
-        assignments = db.query(Assignment).filter(Assignment.status == 'assigned').all()
-        enriched_assignments = []
-        for assignment in assignments:
-            oracle_number = assignment.oracle_number
-            asset = db.query(Asset).filter(Asset.oracle_number == oracle_number).first() if oracle_number else None
-            asset_status = 'assigned'
-            if asset:
-                # Check if asset is under repair
-                repair_request = db.query(RepairRequestForm).filter(
-                    RepairRequestForm.oracle_number == oracle_number
-                ).first()
-                if repair_request:
-                    asset_status = 'under repair'
-                else:
-                    asset_status = asset.status
-
-            assignment_data = assignment_serializer(assignment, asset_status)
-            if asset:
-                assignment_data['device_name'] = asset.model_name or asset.device_type
-                assignment_data['asset_type'] = asset.device_type
-                assignment_data['model'] = asset.model_name
-                assignment_data['brand'] = asset.brand_name
-                assignment_data['serial_number'] = asset.serial_number
-            else:
-                assignment_data['device_name'] = ''
-                assignment_data['asset_type'] = ''
-                assignment_data['model'] = ''
-                assignment_data['brand'] = ''
-                assignment_data['serial_number'] = ''
-            enriched_assignments.append(assignment_data)
+        try:
+            within_days = float(request.args.get('within_days') or 0)
+        except ValueError:
+            return jsonify({'error': 'within_days must be a number'}), 400
+        now = datetime.utcnow()
+        # One (status, expected_return_key) index range; the key of an unset
+        # date (NO_RETURN_DATE) lies past any cutoff
+        query = enriched_assignment_query(db, get_models()).filter(
+            Assignment.status == 'assigned',
+            Assignment.expected_return_key <= now + timedelta(days=within_days)
+        )
+        department = request.args.get('department')
+        if department and department != 'All':
+            query = query.filter(Assignment.department == department)
+
+        def serialize(rows):
+            items = serialize_enriched_assignments(rows)
+            for item, row in zip(items, rows):
+                item['days_overdue'] = (now - row.expected_return_date).days
+                item['overdue'] = row.expected_return_date <= now
+            return items
+
+        if 'limit' in request.args or 'cursor' in request.args:
+            cursor = request.args.get('cursor')
+            rows, last_key = keyset_page(
+                query, Assignment.expected_return_key, Assignment.id, False,
+                decode_cursor(cursor, 'expected_return_date') if cursor else None,
+                parse_limit(request.args.get('limit')),
+                key=lambda row: (row.expected_return_date, row.id)
+            )
+            db.commit()
+            return json_response({
+                'items': serialize(rows),
+                'next_cursor': encode_cursor('expected_return_date', last_key) if last_key else None
+            })
+
+        rows = query.order_by(Assignment.expected_return_key, Assignment.id).all()
         db.commit()
-        return jsonify(enriched_assignments), 200
+        return json_response(serialize(rows))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
         close_db_session(db)
 
+# Run the overdue reminder scan now instead of waiting for the scheduled job
+@assignments_bp.route('/assignments/overdue/scan', methods=['POST'])
+def scan_overdue_assignments():
+    try:
+        result = scan_overdue(current_app.config['SessionLocal'], current_app.extensions['mail'], current_app.config)
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Get assigned assets count
 @assignments_bp.route('/assignments/count', methods=['GET'])
 def get_assignments_count():
     db = get_db_session()
     try:
-        count = db.query(Assignment).filter(Assignment.status == 'assigned').count()
-        db.commit()
+        count = read_counters(db, ['assignments:status:assigned'])['assignments:status:assigned']
         return jsonify({'assigned_count': count}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
         close_db_session(db)
 
+def _allocation_voucher_paths(file):
+    """Where an uploaded allocation voucher goes and the relative path stored for it ('' and '' if none)"""
+    if not file or file.filename == '':
+        return '', ''
+    filename = secure_filename(file.filename)
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    if filename.lower().endswith('.pdf'):
+        upload_folder = os.path.join('uploads', 'pdfs')
+    else:
+        upload_folder = 'uploads/vouchers'
+    unique_filename = f"{timestamp}_{filename}"
+    file_path = os.path.join(upload_folder, unique_filename)
+    # Save relative path for database
+    if upload_folder.endswith('pdfs'):
+        return file_path, os.path.join('uploads', 'pdfs', unique_filename)
+    return file_path, file_path
+
+def _write_allocation_voucher(file, file_path):
+    if file_path:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        file.save(file_path)
+
+def _save_allocation_voucher(file):
+    """Store an uploaded allocation voucher and return its relative path ('' if none)"""
+    file_path, stored_path = _allocation_voucher_paths(file)
+    _write_allocation_voucher(file, file_path)
+    return stored_path
+
 # Add a new assignment
 @assignments_bp.route('/assignments', methods=['POST'])
 def add_assignment():
@@ -122,14 +234,6 @@ def add_assignment():
             if not data.get(field):
                 return jsonify({'error': f'{field} is required'}), 400
 
-        # Check if asset exists and is not damaged
-        asset = db.query(Asset).filter(Asset.oracle_number == data['oracle_number']).first()
-        if not asset:
-            return jsonify({'error': 'Asset not found'}), 404
-
-        if asset.status == 'damaged':
-            return jsonify({'error': 'Cannot assign a damaged asset'}), 400
-
         # Parse dates
         assignment_date = None
         expected_return_date = None
@@ -143,53 +247,211 @@ def add_assignment():
         except:
             pass
 
-        allocation_voucher_path = ''
-        # Handle file upload
-        if 'allocation_voucher' in request.files:
-            file = request.files['allocation_voucher']
-            if file and file.filename != '':
-                filename = secure_filename(file.filename)
-                timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                if filename.lower().endswith('.pdf'):
-                    upload_folder = os.path.join('uploads', 'pdfs')
-                else:
-                    upload_folder = 'uploads/vouchers'
-                os.makedirs(upload_folder, exist_ok=True)
-                unique_filename = f"{timestamp}_{filename}"
-                file_path = os.path.join(upload_folder, unique_filename)
-                file.save(file_path)
-                # Save relative path for database
-                if upload_folder.endswith('pdfs'):
-                    allocation_voucher_path = os.path.join('uploads', 'pdfs', unique_filename)
-                else:
-                    allocation_voucher_path = file_path
-
-        assignment = Assignment(
-            oracle_number=data['oracle_number'],
-            employee_name=data['employee_name'],
-            designation=data['designation'],
-            department=data['department'],
-            assignment_date=assignment_date,
-            expected_return_date=expected_return_date,
-            actual_return_date=actual_return_date,
-            status='assigned',
-            notes=data.get('notes', ''),
-            allocation_voucher_path=allocation_voucher_path,
-            timestamp=datetime.utcnow()
-        )
+        allocation_voucher_path = _save_allocation_voucher(request.files.get('allocation_voucher'))
 
-        db.add(assignment)
-        db.commit()
-
-        # Update asset status and assigned_to field
-        asset.status = 'assigned'
-        asset.assigned_to = data['employee_name']
-        asset.assignment_date = assignment_date
-        asset.expected_return_date = expected_return_date
-        asset.updated_at = datetime.utcnow()
-        db.commit()
+        # Assignment row and asset state in one version-checked transaction
+        assignment = transitions.assign(db, data['oracle_number'], {
+            'employee_name': data['employee_name'],
+            'designation': data['designation'],
+            'department': data['department'],
+            'assignment_date': assignment_date,
+            'expected_return_date': expected_return_date,
+            'actual_return_date': actual_return_date,
+            'notes': data.get('notes', ''),
+            'allocation_voucher_path': allocation_voucher_path
+        }, version=data.get('version'))
 
         return jsonify({'id': assignment.id}), 201
+    except TransitionError as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        close_db_session(db)
+
+# Bulk assignment limits
+BULK_MAX_ROWS = 5000
+BULK_BATCH_SIZE = 1000
+BULK_REQUIRED = ['oracle_number', 'employee_name', 'designation', 'department', 'assignment_date', 'expected_return_date']
+
+def _read_bulk_assignments():
+    """Rows and strict flag from a JSON body or a multipart form.
+
+    Multipart requests carry the rows as a JSON 'assignments' field or a
+    CSV 'file', next to an optional shared 'allocation_voucher' file.
+    """
+    if request.mimetype == 'multipart/form-data':
+        strict = request.form.get('strict')
+        if 'file' in request.files:
+            text = request.files['file'].read().decode('utf-8-sig')
+            rows = list(csv.DictReader(io.StringIO(text)))
+        else:
+            rows = json.loads(request.form.get('assignments') or 'null')
+    else:
+        data = request.get_json(silent=True)
+        strict = None
+        if isinstance(data, dict):
+            strict = data.get('strict')
+            data = data.get('assignments')
+        rows = data
+    if not isinstance(rows, list):
+        raise ValueError('Expected a list of assignments (JSON array, assignments field or CSV file)')
+    strict = request.args.get('strict', strict)
+    return rows, str(strict).lower() in ('1', 'true')
+
+def _parse_bulk_date(value, field):
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        raise ValueError(f'{field} must be an ISO date')
+
+@assignments_bp.route('/assignments/bulk', methods=['POST'])
+def add_assignments_bulk():
+    """Issue many assets in one transaction with per-row error reporting.
+
+    Rows failing validation are reported and skipped; with strict=true any
+    failure rejects the whole batch and nothing is written.
+    """
+    try:
+        rows, strict = _read_bulk_assignments()
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': str(e)}), 400
+    if not rows:
+        return jsonify({'error': 'No assignments provided'}), 400
+    if len(rows) > BULK_MAX_ROWS:
+        return jsonify({'error': f'At most {BULK_MAX_ROWS} assignments can be created at once'}), 400
+
+    errors = []
+    candidates = []
+    seen = set()
+    for index, data in enumerate(rows, start=1):
+        if not isinstance(data, dict):
+            errors.append({'row': index, 'error': 'Row must be an object'})
+            continue
+        # CSV cells arrive as strings with stray whitespace
+        data = {(k or '').strip(): v.strip() if isinstance(v, str) else v for k, v in data.items()}
+        if not data.get('employee_name'):
+            data['employee_name'] = data.get('employee')
+        oracle_number = str(data.get('oracle_number') or '')
+        missing = [field for field in BULK_REQUIRED if not data.get(field)]
+        if missing:
+            errors.append({'row': index, 'oracle_number': oracle_number, 'error': f'{missing[0]} is required'})
+            continue
+        # Compared the way the assets collation does ('OR-1' == 'or-1 ')
+        if number_key(oracle_number) in seen:
+            errors.append({'row': index, 'oracle_number': oracle_number, 'error': 'Duplicate Oracle Number in upload'})
+            continue
+        try:
+            values = {
+                'oracle_number': oracle_number,
+                'employee_name': str(data['employee_name']),
+                'designation': str(data['designation']),
+                'department': str(data['department']),
+                'assignment_date': _parse_bulk_date(data['assignment_date'], 'assignment_date'),
+                'expected_return_date': _parse_bulk_date(data['expected_return_date'], 'expected_return_date'),
+                'actual_return_date': _parse_bulk_date(data['actual_return_date'], 'actual_return_date')
+                if data.get('actual_return_date') else None,
+                'status': 'assigned',
+                'notes': str(data.get('notes') or '')
+            }
+        except ValueError as e:
+            errors.append({'row': index, 'oracle_number': oracle_number, 'error': str(e)})
+            continue
+        seen.add(number_key(oracle_number))
+        candidates.append((index, values))
+
+    db = get_db_session()
+    try:
+        # Set-based validation of every asset in the batch, one IN list per batch
+        numbers = [values['oracle_number'] for index, values in candidates]
+        assets = {}
+        for start in range(0, len(numbers), BULK_BATCH_SIZE):
+            assets.update((number_key(row.oracle_number), row) for row in db.query(*ASSET_ROW.columns(Asset)).filter(
+                Asset.oracle_number.in_(numbers[start:start + BULK_BATCH_SIZE])))
+
+        valid = []
+        for index, values in candidates:
+            asset = assets.get(number_key(values['oracle_number']))
+            if asset is None:
+                error = 'Asset not found'
+            elif asset.assigned_to:
+                error = f'Asset is already assigned to {asset.assigned_to}'
+            elif (asset.status or 'new') not in ALLOWED_FROM['assign'][1]:
+                error = f"Cannot assign an asset that is {asset.status}"
+            else:
+                # Stored as the asset spells it, so joins match on any collation
+                values['oracle_number'] = asset.oracle_number
+                valid.append(values)
+                continue
+            errors.append({'row': index, 'oracle_number': values['oracle_number'], 'error': error})
+        errors.sort(key=lambda error: error['row'])
+
+        if not valid or (strict and errors):
+            db.rollback()
+            return jsonify({'inserted': 0, 'failed': len(errors), 'errors': errors, 'strict': strict}), 400
+
+        now = datetime.utcnow()
+        # The file itself is only written once the rows are committed
+        voucher_file = request.files.get('allocation_voucher')
+        voucher_file_path, voucher_path = _allocation_voucher_paths(voucher_file)
+        for values in valid:
+            values['allocation_voucher_path'] = voucher_path
+            values['timestamp'] = now
+
+        # Multi-row inserts that hand back each row's id; Core statements
+        # bypass the unit of work, so the rows are reported to the commit hooks
+        connection = db.connection()
+        columns = dict.fromkeys(attr.key for attr in inspect(Assignment).column_attrs)
+        ids = []
+        for start in range(0, len(valid), BULK_BATCH_SIZE):
+            batch = valid[start:start + BULK_BATCH_SIZE]
+            batch_ids = insert_returning_ids(connection, Assignment.__table__, batch)
+            record_changes(db, [Change('assignments', 'insert', {**columns, **values, 'id': assignment_id}, {})
+                                for values, assignment_id in zip(batch, batch_ids)])
+            ids.extend(batch_ids)
+
+        asset_updates = [{
+            'b_id': assets[number_key(values['oracle_number'])].id,
+            'b_version': assets[number_key(values['oracle_number'])].version,
+            'status': 'assigned',
+            'assigned_to': values['employee_name'],
+            'assignment_date': values['assignment_date'],
+            'expected_return_date': values['expected_return_date'],
+            'updated_at': now
+        } for values in valid]
+        asset_table = Asset.__table__
+        # Same version guard as single transitions: an asset changed since the
+        # validation read matches no row and the whole batch is rejected
+        statement = update(asset_table).where(
+            asset_table.c.id == bindparam('b_id'), asset_table.c.version == bindparam('b_version')
+        ).values(version=asset_table.c.version + 1)
+        for start in range(0, len(asset_updates), BULK_BATCH_SIZE):
+            batch = asset_updates[start:start + BULK_BATCH_SIZE]
+            result = db.execute(statement, batch)
+            if db.get_bind().dialect.supports_sane_multi_rowcount and result.rowcount != len(batch):
+                db.rollback()
+                return jsonify({'error': 'Some assets were changed by a concurrent request, reload and try again'}), 409
+
+        changes = []
+        for asset_update, values in zip(asset_updates, valid):
+            asset = assets[number_key(values['oracle_number'])]
+            new_values = {key: value for key, value in asset_update.items() if not key.startswith('b_')}
+            new_values['version'] = asset.version + 1
+            changes.append(Change('assets', 'update', {**asset._mapping, **new_values},
+                                  {key: getattr(asset, key) for key in new_values}))
+        record_changes(db, changes)
+
+        db.commit()
+        _write_allocation_voucher(voucher_file, voucher_file_path)
+        return jsonify({
+            'inserted': len(valid),
+            'failed': len(errors),
+            'errors': errors,
+            'ids': ids,
+            'allocation_voucher_path': voucher_path
+        }), 201
     except Exception as e:
         db.rollback()
         return jsonify({'error': str(e)}), 500
@@ -1,16 +1,36 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 import sys
 import os
 
 # Add utils directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from utils.database import get_db_session, get_models, handle_db_error, close_db_session
+from utils.streaming import wants_stream, stream_rows, keyset_chunks
+from utils.pagination import keyset_page, keyset_order
+from utils.cache import conditional
+from utils import transitions
+from utils.transitions import TransitionError
 from datetime import datetime
-from models import RepairRequestForm, Assignment
+from models import RepairRequestForm
 
 auction_bp = Blueprint('auction', __name__)
 
+def _auction_data(auction):
+    """Serialize an auction row"""
+    return {
+        'id': auction.id,
+        'oracle_number': auction.oracle_number,
+        'asset_type': auction.asset_type,
+        'brand_name': auction.brand_name,
+        'model_name': auction.model_name,
+        'serial_number': auction.serial_number,
+        'price': auction.price,
+        'auction_date': auction.auction_date.isoformat() if auction.auction_date else '',
+        'created_at': auction.created_at.isoformat() if auction.created_at else ''
+    }
+
 @auction_bp.route('/auctions', methods=['GET'])
+@conditional('auctions', 'repair_request_form')
 def get_auctions():
     db = get_db_session()
     try:
@@ -18,27 +38,27 @@ def get_auctions():
         Auction = models.get('Auction')
         RepairRequestForm = models.get('RepairRequestForm')
 
-        auctions = db.query(Auction).order_by(Auction.created_at.desc()).all()
-
-        # Get oracle numbers under repair
-        under_repair_oracle_numbers = [r.oracle_number for r in db.query(RepairRequestForm).all()]
-
-        auction_list = []
-        for auction in auctions:
-            # Skip auctions for assets currently under repair
-            if auction.oracle_number in under_repair_oracle_numbers:
-                continue
-            auction_list.append({
-                'id': auction.id,
-                'oracle_number': auction.oracle_number,
-                'asset_type': auction.asset_type,
-                'brand_name': auction.brand_name,
-                'model_name': auction.model_name,
-                'serial_number': auction.serial_number,
-                'price': auction.price,
-                'auction_date': auction.auction_date.isoformat() if auction.auction_date else '',
-                'created_at': auction.created_at.isoformat() if auction.created_at else ''
-            })
+        # Skip auctions for assets currently under repair
+        under_repair_oracle_numbers = db.query(RepairRequestForm.oracle_number).filter(
+            RepairRequestForm.oracle_number.isnot(None)
+        )
+        query = db.query(Auction).filter(
+            ~Auction.oracle_number.in_(under_repair_oracle_numbers)
+        )
+
+        if wants_stream():
+            response = stream_rows(
+                keyset_chunks(lambda cursor_values, limit: keyset_page(
+                    query, Auction.created_at, Auction.id, True, cursor_values, limit,
+                    key=lambda auction: (auction.created_at, auction.id)
+                )),
+                _auction_data,
+                [db]
+            )
+            db = None
+            return response
+
+        auction_list = [_auction_data(auction) for auction in query.order_by(*keyset_order(Auction.created_at, Auction.id, True)).all()]
 
         return jsonify(auction_list), 200
     except Exception as e:
@@ -65,59 +85,14 @@ def add_auction():
 
     db = get_db_session()
     try:
-        models = current_app.config['Base'].registry._class_registry
-        Auction = models.get('Auction')
-        Asset = models.get('Asset')
-
-        # Fetch asset details by oracle_number
-        asset = db.query(Asset).filter(Asset.oracle_number == oracle_number).first()
-        if not asset:
-            return jsonify({'error': 'Asset not found for the given Oracle Number'}), 404
-
-        # Check if asset is currently under repair
-        under_repair = db.query(RepairRequestForm).filter(
-            RepairRequestForm.oracle_number == oracle_number
-        ).first()
-        if under_repair:
-            return jsonify({'error': 'This asset is currently under repair and cannot be sent for auction.'}), 400
-
-        # Check if asset has already been auctioned
-        if asset.status == 'auctioned':
-            return jsonify({'error': 'This asset has already been auctioned and cannot be processed again.'}), 400
-
-        auction = Auction(
-            oracle_number=oracle_number,
-            asset_type=asset.device_type,
-            brand_name=asset.brand_name,
-            model_name=asset.model_name,
-            serial_number=asset.serial_number,
-            price=price,
-            auction_date=auction_date,
-            created_at=datetime.utcnow()
-        )
-        db.add(auction)
-
-        # Update asset status to 'auctioned'
-        asset.status = 'auctioned'
-        asset.updated_at = datetime.utcnow()
-
-        # Clear assignment fields to remove from Assigned Card
-        asset.assigned_to = None
-        asset.assignment_date = None
-        asset.expected_return_date = None
-
-        # Delete any repair requests for this asset to remove from Under Repair
-        db.query(RepairRequestForm).filter(RepairRequestForm.oracle_number == oracle_number).delete()
-
-        # Update assignment record status if exists
-        assignment = db.query(Assignment).filter(Assignment.oracle_number == oracle_number, Assignment.status == 'assigned').first()
-        if assignment:
-            assignment.status = 'auctioned'
-            assignment.actual_return_date = datetime.utcnow()
-
-        db.commit()
+        # Auction row, asset state, open assignment and stale repair requests
+        # in one version-checked transaction
+        transitions.auction(db, oracle_number, price, auction_date, version=data.get('version'))
 
         return jsonify({'message': 'Auction details saved successfully'}), 201
+    except TransitionError as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         db.rollback()
         return jsonify({'error': str(e)}), 500
@@ -125,6 +100,7 @@ def add_auction():
         close_db_session(db)
 
 @auction_bp.route('/auctions/<oracle_number>', methods=['GET'])
+@conditional('auctions')
 def get_auctions_by_oracle_number(oracle_number):
     """Get auction details for a specific asset by oracle number"""
     db = get_db_session()
@@ -136,19 +112,7 @@ def get_auctions_by_oracle_number(oracle_number):
             Auction.oracle_number == oracle_number
         ).order_by(Auction.auction_date.desc()).all()
 
-        auction_list = []
-        for auction in auctions:
-            auction_list.append({
-                'id': auction.id,
-                'oracle_number': auction.oracle_number,
-                'asset_type': auction.asset_type,
-                'brand_name': auction.brand_name,
-                'model_name': auction.model_name,
-                'serial_number': auction.serial_number,
-                'price': auction.price,
-                'auction_date': auction.auction_date.isoformat() if auction.auction_date else '',
-                'created_at': auction.created_at.isoformat() if auction.created_at else ''
-            })
+        auction_list = [_auction_data(auction) for auction in auctions]
 
         return jsonify(auction_list), 200
     except Exception as e:
@@ -157,6 +121,7 @@ def get_auctions_by_oracle_number(oracle_number):
         close_db_session(db)
 
 @auction_bp.route('/auctions/auctioned/oracle-numbers', methods=['GET'])
+@conditional('assets')
 def get_auctioned_oracle_numbers():
     """Get Oracle numbers of assets that have been auctioned"""
     db = get_db_session()
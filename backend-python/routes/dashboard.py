@@ -1,146 +1,186 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context
 import sys
 import os
 
 # Add utils directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from utils.database import get_db_session, get_models, handle_db_error, close_db_session
-from utils.serializers import activity_serializer
+from utils.serializers import activity_serializer, json_response, ACTIVITY_ROW
+from utils.activity_writer import activity_writer
+from utils.counters import dashboard_counters, reconcile_counters
+from utils.queries import department_breakdown
+from utils.scheduler import job_status
+from utils.live_updates import live_updates
+from utils.pagination import PaginationError, parse_limit, keyset_page, encode_cursor, decode_cursor
+from utils.cache import bump, cached, conditional
+from utils.events import on_commit, track_old_values
 from sqlalchemy import and_, or_, func
 import requests
 import logging
 import traceback
-from models import Asset, ReturnRecord, RepairRequestForm, ActivityLog, Assignment
+from datetime import datetime
+from models import Asset, ReturnRecord, RepairRequestForm, ActivityLog, ActivityLogArchive, Assignment
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
-@dashboard_bp.route("/dashboard", methods=["GET"])
-def dashboard_stats():
+def _load_dashboard_snapshot():
     db = get_db_session()
     try:
+        return dashboard_counters(db)
+    finally:
+        close_db_session(db)
 
-        # 1. Total Assets: all assets
-        total_assets = db.query(Asset).count()
-        # 2. Assigned: assigned_to is not empty/null and status is not damaged
-        assigned = db.query(Asset).filter(
-            and_(Asset.assigned_to.isnot(None), Asset.assigned_to != '', Asset.status != 'damaged')
-        ).count()
-        # 3. Unassigned: total - assigned (this includes under repair and damaged assets)
-        unassigned = total_assets - assigned
-        # 4. Under Repair: status is 'under repair'
-        # Update to count assets with status 'under repair' or assets in under_repair table
-        under_repair_asset_count = db.query(Asset).filter(Asset.status == 'under repair').count()
-        under_repair_table_count = db.query(RepairRequestForm).count()
-        under_repair = max(under_repair_asset_count, under_repair_table_count)
-        # 5. Damaged: return records with return_type 'damaged' and asset status 'damaged'
-        damaged = db.query(ReturnRecord).join(Asset, ReturnRecord.oracle_number == Asset.oracle_number).filter(
-            and_(ReturnRecord.return_type == 'damaged', Asset.status == 'damaged')
-        ).count()
-
-        # 6. Auctioned: status is 'auctioned'
-        auctioned = db.query(Asset).filter(Asset.status == 'auctioned').count()
-
-        # 7. Available assets: not assigned, not under repair, not damaged, not auctioned, not buyback
-        available = db.query(Asset).filter(
-            and_(or_(Asset.assigned_to.is_(None), Asset.assigned_to == ''),
-                 Asset.status.notin_(['under repair', 'damaged', 'auctioned', 'buyback']))
-        ).count()
-
-        # 7. Under Repair (not assigned): assets with status 'under repair' and not assigned
-        under_repair_not_assigned = db.query(Asset).filter(
-            and_(Asset.status == 'under repair',
-                 or_(Asset.assigned_to.is_(None), Asset.assigned_to == ''))
-        ).count()
-
-        # 8. Stock count: available + under repair (not assigned)
-        stock_count = available + under_repair_not_assigned
-
-        # Optional: group by department (using assignments since assets don't have department)
-        # For now, return empty list as department stats require assignment data
-        department_stats = []
-
-        # Buyback count from returns
-        buyback_count = db.query(ReturnRecord).filter(ReturnRecord.return_type == 'buyback').count()
+def _invalidate_dashboard(changes):
+    for change in changes:
+        if change.table != 'assets' or change.action != 'update' or \
+                'status' in change.old or 'assigned_to' in change.old:
+            bump('dashboard')
+            return
 
-        db.commit()
-        return jsonify({
-            "total_assets": total_assets,
-            "assigned": assigned,
-            "unassigned": unassigned,  # All unassigned assets (including under repair and damaged)
-            "under_repair": under_repair,
-            "damaged": damaged,
-            "auctioned": auctioned,
-            "available": available,
-            "under_repair_not_assigned": under_repair_not_assigned,
-            "stock_count": stock_count,
-            "buyback_count": buyback_count,
-            "departments": department_stats
-        })
+on_commit(_invalidate_dashboard, tables=['assets', 'repair_request_form', 'returns'])
+
+def _load_department_breakdown():
+    db = get_db_session()
+    try:
+        return department_breakdown(db, get_models(), datetime.utcnow())
+    finally:
+        close_db_session(db)
+
+def _invalidate_departments(changes):
+    for change in changes:
+        if change.table != 'assets' or change.action != 'update' or 'unit_price' in change.old:
+            bump('departments')
+            return
+
+on_commit(_invalidate_departments, tables=['assignments', 'assets', 'repair_request_form', 'completion_repair'])
+track_old_values(Asset.status, Asset.assigned_to, Asset.unit_price)
+
+@dashboard_bp.route("/dashboard", methods=["GET"])
+def dashboard_stats():
+    try:
+        # Snapshot shared by every poller; rebuilt after an asset state
+        # change or once DASHBOARD_CACHE_TTL seconds have passed
+        stats = dict(cached('dashboard', _load_dashboard_snapshot,
+                            ttl=current_app.config.get('DASHBOARD_CACHE_TTL', 30)))
+
+        # Grouped over active assignments; overdue counts age with time,
+        # so this snapshot always expires with the TTL as well
+        stats["departments"] = cached('departments', _load_department_breakdown,
+                                      ttl=current_app.config.get('DASHBOARD_CACHE_TTL', 30))
+        return jsonify(stats)
     except Exception as e:
         logging.error(f"Error in dashboard_stats: {str(e)}")
         logging.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
-    finally:
-        close_db_session(db)
 
-@dashboard_bp.route("/assets", methods=["GET"])
-def get_assets():
+# Endpoint for recent activity logs
+@dashboard_bp.route("/activity-logs", methods=["GET"])
+@conditional('activity_logs')
+def get_activity_logs():
     db = get_db_session()
     try:
-        stock = request.args.get("stock")
-        status = request.args.get("status")
-
-        query = db.query(Asset)
-
-        if stock and stock.lower() == "true":
-            query = query.filter(Asset.status.in_(["new", "used"]))
-
-        if status:
-            query = query.filter(Asset.status == status)
-        assets = query.all()
-        asset_list = []
-        for asset in assets:
-            asset_list.append({
-                'id': asset.id,
-                'oracle_number': asset.oracle_number,
-                'device_type': asset.device_type,
-                'brand_name': asset.brand_name,
-                'model_name': asset.model_name,
-                'serial_number': asset.serial_number,
-                'unit_price': asset.unit_price,
-                'purchase_date': asset.purchase_date.isoformat() if asset.purchase_date else '',
-                'warranty_expiry': asset.warranty_expiry.isoformat() if asset.warranty_expiry else '',
-                'vendor_name': asset.vendor_name,
-                'tender_no': asset.tender_no,
-                'notes': asset.notes,
-                'created_at': asset.created_at.isoformat() if asset.created_at else '',
-                'updated_at': asset.updated_at.isoformat() if asset.updated_at else '',
-                'status': asset.status,
-                'assigned_to': asset.assigned_to,
-                'assignment_date': asset.assignment_date.isoformat() if asset.assignment_date else '',
-                'expected_return_date': asset.expected_return_date.isoformat() if asset.expected_return_date else ''
-            })
+        logs = db.query(*ACTIVITY_ROW.columns(ActivityLog)).order_by(ActivityLog.timestamp.desc()).limit(10).all()
         db.commit()
-        return jsonify(asset_list)
+        return json_response(ACTIVITY_ROW.many(logs))
     except Exception as e:
-        logging.error(f"Error in get_assets: {str(e)}")
+        logging.error(f"Error in get_activity_logs: {str(e)}")
         logging.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
     finally:
         close_db_session(db)
 
+FEED_SORT = 'feed'
 
-# Endpoint for recent activity logs
-@dashboard_bp.route("/activity-logs", methods=["GET"])
-def get_activity_logs():
+def _feed_order(item):
+    row, archived = item
+    # Newest first with NULL timestamps last, like each table's keyset page;
+    # at the same instant hot rows come before archived ones
+    return (row.timestamp is not None, row.timestamp or datetime.min, not archived, row.id)
+
+# Audit feed across hot and archived activity logs, newest first
+@dashboard_bp.route("/activity-logs/feed", methods=["GET"])
+def get_activity_feed():
     db = get_db_session()
     try:
-        logs = db.query(ActivityLog).order_by(ActivityLog.timestamp.desc()).limit(10).all()
-        db.commit()
-        return jsonify([activity_serializer(a) for a in logs]), 200
+        limit = parse_limit(request.args.get('limit'))
+        before = request.args.get('before')
+        # Ids of the two tables overlap, so the cursor keeps a (timestamp, id)
+        # position per table; a None id means nothing was read from it yet
+        positions = decode_cursor(before, FEED_SORT) if before else [None] * 4
+        if len(positions) != 4:
+            raise PaginationError('Invalid cursor')
+        positions = {False: positions[:2], True: positions[2:]}
+
+        rows = []
+        has_more = False
+        for archived, model in ((False, ActivityLog), (True, ActivityLogArchive)):
+            position = positions[archived]
+            query = db.query(*ACTIVITY_ROW.columns(model))
+            table_rows, last_key = keyset_page(query, model.timestamp, model.id, True,
+                                               position if position[1] is not None else None, limit,
+                                               key=lambda row: [row.timestamp, row.id])
+            rows += [(row, archived) for row in table_rows]
+            has_more = has_more or last_key is not None
+
+        rows.sort(key=_feed_order, reverse=True)
+        has_more = has_more or len(rows) > limit
+        rows = rows[:limit]
+        for row, archived in rows:
+            positions[archived] = [row.timestamp, row.id]
+        items = ACTIVITY_ROW.many([row for row, _ in rows])
+        for item, (_, archived) in zip(items, rows):
+            item['archived'] = archived
+
+        next_cursor = None
+        if has_more and rows:
+            next_cursor = encode_cursor(FEED_SORT, positions[False] + positions[True])
+        return json_response({'items': items, 'next_cursor': next_cursor})
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error in get_activity_feed: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        close_db_session(db)
+
+# Queue depth and flush latency of the background activity log writer
+@dashboard_bp.route("/activity-logs/writer-metrics", methods=["GET"])
+def get_activity_writer_metrics():
+    return jsonify(activity_writer.metrics()), 200
+
+# Maintained inventory counters
+@dashboard_bp.route("/counters", methods=["GET"])
+def get_counters():
+    db = get_db_session()
+    try:
+        models = get_models()
+        Counter = models.get('Counter')
+        counters = {key: seq for key, seq in db.query(Counter.id, Counter.seq).order_by(Counter.id)}
+        return jsonify({'counters': counters, 'jobs': job_status()}), 200
     except Exception as e:
-        logging.error(f"Error in get_activity_logs: {str(e)}")
-        logging.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
     finally:
         close_db_session(db)
+
+# Recount every counter and fix any drift
+@dashboard_bp.route("/counters/reconcile", methods=["POST"])
+def reconcile_counters_now():
+    db = get_db_session()
+    try:
+        drift = reconcile_counters(db)
+        return jsonify({'repaired': len(drift), 'drift': drift}), 200
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Error in reconcile_counters: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        close_db_session(db)
+
+# Server-Sent Events: dashboard deltas and new activity entries as they commit
+@dashboard_bp.route("/live", methods=["GET"])
+def live_stream():
+    client = live_updates.subscribe()
+    return Response(stream_with_context(live_updates.stream(client)), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -0,0 +1,52 @@
+from flask import Blueprint, request, jsonify
+import sys
+import os
+
+# Add utils directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.database import get_db_session, get_models, close_db_session
+from utils.employee_index import employee_index
+from utils.queries import enriched_assignment_query, serialize_enriched_assignments
+from utils.serializers import json_response
+from models import Assignment
+
+employees_bp = Blueprint('employees', __name__)
+
+MAX_SUGGESTIONS = 50
+
+@employees_bp.route('/employees/autocomplete', methods=['GET'])
+def autocomplete_employees():
+    """Employee names matching ?q= by word prefix, with their usual department and designation"""
+    if not employee_index.ready:
+        return jsonify({'error': 'Employee index is not ready'}), 503
+    try:
+        limit = min(int(request.args.get('limit', 10)), MAX_SUGGESTIONS)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    return json_response(employee_index.suggest(request.args.get('q', ''), limit))
+
+@employees_bp.route('/employees/holdings', methods=['GET'])
+def get_employee_holdings():
+    """Assets currently assigned to ?name=, read through the (employee_name, status) index"""
+    name = (request.args.get('name') or '').strip()
+    if not name:
+        return jsonify({'error': 'name is required'}), 400
+    db = get_db_session()
+    try:
+        # Rows may spell the name differently (case, spacing)
+        names = set(employee_index.spellings(name)) | {name}
+        rows = enriched_assignment_query(db, get_models()).filter(
+            Assignment.employee_name.in_(names),
+            Assignment.status == 'assigned'
+        ).order_by(Assignment.assignment_date, Assignment.id).all()
+        holdings = serialize_enriched_assignments(rows)
+        db.commit()
+        return json_response({
+            'employee': employee_index.employee(name) or {'name': name},
+            'holdings': holdings,
+            'count': len(holdings)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        close_db_session(db)
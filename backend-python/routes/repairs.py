@@ -1,24 +1,37 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
 import sys
 import os
 
 # Add utils directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from utils.database import get_db_session, get_models, handle_db_error, close_db_session
+from utils.streaming import wants_stream, stream_rows, keyset_chunks
+from utils.serializers import json_response
+from utils.queries import repair_listing_query, serialize_repair, serialize_repairs, REPAIR_SOURCES
+from utils.pagination import (
+    PaginationError, parse_sort, parse_limit, parse_date_arg, keyset_page, keyset_order, encode_cursor, decode_cursor
+)
+from utils.cache import conditional
+from utils.counters import read_counters
+from utils import transitions
+from utils.transitions import TransitionError
 from datetime import datetime
 from werkzeug.utils import secure_filename
-from models import RepairRequestForm, CompletionRepair, Asset
+from models import RepairRequestForm, CompletionRepair
 
 repairs_bp = Blueprint('repairs', __name__)
 
+REPAIR_STATUSES = [status for status, _, _ in REPAIR_SOURCES]
+
 @repairs_bp.route("/repairs/stats", methods=["GET"])
 def repair_stats():
     """Get repair statistics"""
     db = get_db_session()
     try:
-        # Count repairs by table
-        under_repair_count = db.query(RepairRequestForm).count()
-        completed_count = db.query(CompletionRepair).count()
+        # Maintained counters instead of counting both tables
+        counts = read_counters(db, ['repairs:open', 'repairs:completed'])
+        under_repair_count = counts['repairs:open']
+        completed_count = counts['repairs:completed']
 
         return jsonify({
             "under_repair": under_repair_count,
@@ -32,62 +45,69 @@ def repair_stats():
         close_db_session(db)
 
 @repairs_bp.route("/repairs", methods=["GET"])
+@conditional('repair_request_form', 'completion_repair')
 def get_repairs():
-    """Get repairs with optional status filter"""
+    """Open and completed repairs, newest start_date first.
+
+    Filters: status (in-progress/completed), vendor, department, start/end
+    on start_date. With a limit or cursor the response is a keyset page
+    {items, next_cursor}, read from one UNION ALL query.
+    """
     db = get_db_session()
     try:
         status = request.args.get("status")
+        if status and status not in REPAIR_STATUSES:
+            raise PaginationError(f"status must be one of: {', '.join(REPAIR_STATUSES)}")
+        filters = {
+            'status': status,
+            'vendor': request.args.get("vendor"),
+            'department': request.args.get("department"),
+            'start': parse_date_arg(request.args.get("start"), 'start'),
+            'end': parse_date_arg(request.args.get("end"), 'end', end_of_day=True)
+        }
+        sort_name, _, descending = parse_sort(request.args.get("sort"), {'start_date': 'start_date'}, '-start_date')
+
+        if 'limit' in request.args or 'cursor' in request.args:
+            cursor = request.args.get("cursor")
+            cursor_values = decode_cursor(cursor, sort_name) if cursor else None
+            limit = parse_limit(request.args.get("limit"))
+            query, start_date, sort_key = repair_listing_query(
+                db, get_models(), cursor=cursor_values, limit=limit, descending=descending, **filters
+            )
+            rows, last_key = keyset_page(
+                query, start_date, sort_key, descending, cursor_values, limit,
+                key=lambda row: (row.start_date, row.sort_key)
+            )
+            page = {
+                'items': serialize_repairs(rows),
+                'next_cursor': encode_cursor(sort_name, last_key) if last_key else None
+            }
+            db.commit()
+            return json_response(page)
 
-        repair_list = []
+        if wants_stream():
+            # The response owns the session once db is cleared below
+            stream_db, models = db, get_models()
 
-        # Get under repair records
-        if not status or status == "in-progress":
-            under_repairs = db.query(RepairRequestForm).order_by(RepairRequestForm.start_date.desc()).all()
-            for repair in under_repairs:
-                repair_data = {
-                    "completion_date": None,
-                    "repair_cost": repair.cost,
-                    "return_date": None,
-                    "status": "in-progress",
-                    "oracle_number": repair.oracle_number,
-                    "asset_type": repair.asset_type,
-                    "asset_model": repair.asset_model,
-                    "employee_name": repair.employee_name,
-                    "designation": repair.designation,
-                    "department": repair.department,
-                    "repair_description": repair.repair_description,
-                    "start_date": repair.start_date.isoformat() if repair.start_date else None,
-                    "vendor_name": repair.vendor_name,
-                    "is_fixed": False
-                }
-                repair_list.append(repair_data)
-
-        # Get completed repair records
-        if not status or status == "completed":
-            completed_repairs = db.query(CompletionRepair).order_by(CompletionRepair.start_date.desc()).all()
-            for repair in completed_repairs:
-                repair_data = {
-                    "completion_date": repair.completion_date.isoformat() if repair.completion_date else None,
-                    "repair_cost": repair.cost,
-                    "return_date": repair.return_date.isoformat() if repair.return_date else None,
-                    "status": "completed",
-                    "oracle_number": repair.oracle_number,
-                    "asset_type": repair.asset_type,
-                    "asset_model": repair.asset_model,
-                    "employee_name": repair.employee_name,
-                    "designation": repair.designation,
-                    "department": repair.department,
-                    "repair_description": repair.repair_description,
-                    "start_date": repair.start_date.isoformat() if repair.start_date else None,
-                    "vendor_name": repair.vendor_name,
-                    "is_fixed": repair.is_fixed
-                }
-                repair_list.append(repair_data)
+            def fetch_page(cursor_values, limit):
+                query, start_date, sort_key = repair_listing_query(
+                    stream_db, models, cursor=cursor_values, limit=limit, descending=descending, **filters
+                )
+                return keyset_page(query, start_date, sort_key, descending, cursor_values, limit,
+                                   key=lambda row: (row.start_date, row.sort_key))
 
-        # Sort combined list by start_date descending
-        repair_list.sort(key=lambda x: x.get("start_date") or "", reverse=True)
+            response = stream_rows(keyset_chunks(fetch_page), serialize_repair, [db])
+            db = None
+            return response
 
-        return jsonify(repair_list)
+        query, start_date, sort_key = repair_listing_query(db, get_models(), descending=descending, **filters)
+        query = query.order_by(*keyset_order(start_date, sort_key, descending))
+
+        repair_list = serialize_repairs(query.all())
+        db.commit()
+        return json_response(repair_list)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -109,51 +129,24 @@ def create_repair_request():
             if not data.get(field):
                 return jsonify({"error": f"{field} is required"}), 400
 
-        oracle_number = data["oracle_number"]
-
-        # Check if asset is already under repair
-        existing_repair = db.query(RepairRequestForm).filter(
-            RepairRequestForm.oracle_number == oracle_number
-        ).first()
-        if existing_repair:
-            return jsonify({"error": "This asset is already under repair and cannot be requested or sent to auction."}), 400
-
-        # Get asset details to include in repair record
-        asset = db.query(Asset).filter(Asset.oracle_number == oracle_number).first()
-        if not asset:
-            return jsonify({"error": "Asset not found with the provided Oracle number"}), 404
-
-        # Check if asset has already been auctioned
-        if asset.status == 'auctioned':
-            return jsonify({"error": "This asset is currently auctioned and cannot be repaired"}), 400
-
-        # Create repair record in repair_request_form table
-        repair = RepairRequestForm(
-            oracle_number=oracle_number,
-            asset_type=asset.device_type,
-            asset_model=asset.model_name,
-            repair_description=data["repair_description"],
-            start_date=datetime.utcnow(),
-            employee_name=data.get("employee_name", ""),
-            department=data.get("department", ""),
-            designation=data.get("designation", ""),
-            technician=data.get("technician", ""),
-            cost=data.get("cost"),
-            notes=data.get("notes", "")
-        )
-
-        db.add(repair)
-
-        # Update asset status to "under repair"
-        asset.status = "under repair"
-        asset.updated_at = datetime.utcnow()
-
-        db.commit()
+        # Repair row and asset state in one version-checked transaction
+        repair = transitions.request_repair(db, data["oracle_number"], {
+            "repair_description": data["repair_description"],
+            "employee_name": data.get("employee_name", ""),
+            "department": data.get("department", ""),
+            "designation": data.get("designation", ""),
+            "technician": data.get("technician", ""),
+            "cost": data.get("cost"),
+            "notes": data.get("notes", "")
+        }, version=data.get("version"))
 
         return jsonify({
             "message": "Repair request created successfully and asset status updated to 'Under Repair'",
             "id": repair.id
         }), 201
+    except TransitionError as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         db.rollback()
         return jsonify({'error': str(e)}), 500
@@ -174,13 +167,6 @@ def complete_repair():
             if not data.get(field):
                 return jsonify({"error": f"{field} is required"}), 400
 
-        # Get the repair record from repair_request_form table
-        repair = db.query(RepairRequestForm).filter(
-            RepairRequestForm.oracle_number == data["oracle_number"]
-        ).first()
-        if not repair:
-            return jsonify({"error": "Repair not found or already completed"}), 404
-
         # Parse dates if provided
         completion_date = None
         return_date = None
@@ -221,47 +207,26 @@ def complete_repair():
         # Use is_fixed string value directly
         is_fixed_value = data.get("is_fixed", "not_fixed")
 
-        # Create completed repair record in completion_repair table
-        completed_repair = CompletionRepair(
-            oracle_number=repair.oracle_number,
-            asset_type=repair.asset_type,
-            asset_model=repair.asset_model,
-            repair_description=data["repair_description"],
-            start_date=repair.start_date,
-            completion_date=completion_date or datetime.utcnow(),
-            technician=data.get("technician") or repair.technician,
-            cost=data.get("repair_cost") or repair.cost,
-            notes=data.get("notes", "") or repair.notes,
-            is_fixed=is_fixed_value,
-            vendor_name=data.get("vendor_name", "") or repair.vendor_name,
-            employee_name=repair.employee_name,
-            department=repair.department,
-            designation=repair.designation,
-            return_date=return_date,
-            voucher_file=voucher_file_path
-        )
-
-        db.add(completed_repair)
-
-        # Remove the record from under_repair table
-        db.delete(repair)
-
-        # Get the asset
-        asset = db.query(Asset).filter(Asset.oracle_number == data["oracle_number"]).first()
-        if not asset:
-            return jsonify({"error": "Asset not found"}), 404
-
-        # Restore asset status to its previous status (or 'assigned' as fallback)
-        previous_status = getattr(repair, 'previous_status', None)
-        restored_status = previous_status if previous_status else "assigned"
-        asset.status = restored_status
-        asset.updated_at = datetime.utcnow()
-
-        db.commit()
+        # Completion row, open repair and asset state in one version-checked
+        # transaction; blank fields fall back to the repair request's values
+        completed_repair, restored_status = transitions.complete_repair(db, data["oracle_number"], {
+            "repair_description": data["repair_description"],
+            "completion_date": completion_date or datetime.utcnow(),
+            "technician": data.get("technician"),
+            "cost": data.get("repair_cost"),
+            "notes": data.get("notes", ""),
+            "is_fixed": is_fixed_value,
+            "vendor_name": data.get("vendor_name", ""),
+            "return_date": return_date,
+            "voucher_file": voucher_file_path
+        }, version=data.get("version"))
 
         return jsonify({
             "message": f"Repair completed successfully and asset status restored to '{restored_status.capitalize()}'"
         }), 200
+    except TransitionError as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         db.rollback()
         return jsonify({'error': str(e)}), 500
@@ -269,6 +234,7 @@ def complete_repair():
         close_db_session(db)
 
 @repairs_bp.route("/repairs/under-repair/oracle-numbers", methods=["GET"])
+@conditional('repair_request_form')
 def get_under_repair_oracle_numbers():
     """Get Oracle numbers of assets currently under repair"""
     db = get_db_session()
@@ -290,6 +256,7 @@ def get_under_repair_oracle_numbers():
         close_db_session(db)
 
 @repairs_bp.route("/repairs/<oracle_number>", methods=["GET"])
+@conditional('repair_request_form', 'completion_repair')
 def get_repairs_by_oracle_number(oracle_number):
     """Get repair history for a specific asset by oracle number"""
     db = get_db_session()
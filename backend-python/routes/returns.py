@@ -1,11 +1,20 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 import sys
 import os
 
 # Add utils directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from utils.database import get_db_session, get_models, handle_db_error, close_db_session
-from utils.serializers import return_serializer
+from utils.serializers import json_response
+from utils.queries import serialize_returns, iter_serialized_returns
+from utils.pagination import (
+    PaginationError, parse_sort, parse_limit, parse_date_arg, keyset_page, keyset_order, encode_cursor, decode_cursor
+)
+from utils.streaming import wants_stream, stream_rows, keyset_chunks
+from utils.cache import conditional
+from utils.counters import read_counters
+from utils import transitions
+from utils.transitions import TransitionError
 from werkzeug.utils import secure_filename
 from sqlalchemy import and_, or_
 from datetime import datetime
@@ -18,18 +27,10 @@ returns_bp = Blueprint('returns', __name__)
 def get_return_stats():
     db = get_db_session()
     try:
-        models = get_models()
-        ReturnRecord = models.get('ReturnRecord')
-
-        # Count buyback returns
-        buyback_count = db.query(ReturnRecord).filter(ReturnRecord.return_type == 'buyback').count()
-
-        # Count damaged returns
-        damaged_count = db.query(ReturnRecord).filter(ReturnRecord.return_type == 'damaged').count()
-
+        counts = read_counters(db, ['returns:type:buyback', 'returns:type:damaged'])
         return jsonify({
-            'buyback_count': buyback_count,
-            'damaged_count': damaged_count
+            'buyback_count': counts['returns:type:buyback'],
+            'damaged_count': counts['returns:type:damaged']
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -41,11 +42,8 @@ def get_return_stats():
 def get_total_return_count():
     db = get_db_session()
     try:
-        models = get_models()
-        ReturnRecord = models.get('ReturnRecord')
-
         # Count all return records
-        total_count = db.query(ReturnRecord).count()
+        total_count = read_counters(db, ['returns:total'])['returns:total']
 
         return jsonify({
             'total_return_count': total_count
@@ -57,54 +55,75 @@ def get_total_return_count():
 
 # Get all returns
 @returns_bp.route('/returns', methods=['GET'])
+@conditional('returns', 'assets', 'assignments')
 def get_returns():
+    """Returns with asset and employee details, newest first.
+
+    Filters: return_type (comma separated), start/end on return_date.
+    With a limit or cursor the response is a keyset page {items, next_cursor}.
+    """
     db = get_db_session()
     try:
         models = get_models()
         ReturnRecord = models.get('ReturnRecord')
-        Asset = models.get('Asset')
-        Assignment = models.get('Assignment')
-
-        returns = db.query(ReturnRecord).order_by(ReturnRecord.return_date.desc()).all()
-        enriched_returns = []
 
-        for return_record in returns:
-            oracle_number = return_record.oracle_number
-            asset = db.query(Asset).filter(Asset.oracle_number == oracle_number).first() if oracle_number else None
-            assignment = db.query(Assignment).filter(
-                Assignment.oracle_number == oracle_number,
-                Assignment.status == 'returned'
-            ).first() if oracle_number else None
-
-            return_data = return_serializer(return_record)
-
-            if asset:
-                return_data['asset_type'] = asset.device_type or ''
-                return_data['asset_model'] = asset.model_name or ''
-                return_data['serial_number'] = asset.serial_number or ''
-                return_data['asset_status'] = asset.status or ''
-            else:
-                return_data['asset_type'] = ''
-                return_data['asset_model'] = ''
-                return_data['serial_number'] = ''
-                return_data['asset_status'] = ''
-
-            if assignment:
-                return_data['employee_name'] = assignment.employee_name or ''
-                return_data['employee_department'] = assignment.department or ''
-                return_data['employee_designation'] = assignment.designation or ''
-                return_data['allocation_date'] = assignment.assignment_date.isoformat() if assignment.assignment_date else ''
-                return_data['expected_return_date'] = assignment.expected_return_date.isoformat() if assignment.expected_return_date else ''
-            else:
-                return_data['employee_name'] = ''
-                return_data['employee_department'] = ''
-                return_data['employee_designation'] = ''
-                return_data['allocation_date'] = ''
-                return_data['expected_return_date'] = ''
+        # Plain column rows, the serializer reads them like records
+        query = db.query(ReturnRecord.__table__)
+        return_types = [t.strip() for t in request.args.get('return_type', '').split(',') if t.strip()]
+        if return_types:
+            query = query.filter(ReturnRecord.return_type.in_(return_types))
+        start = parse_date_arg(request.args.get('start'), 'start')
+        end = parse_date_arg(request.args.get('end'), 'end', end_of_day=True)
+        if start:
+            query = query.filter(ReturnRecord.return_date >= start)
+        if end:
+            query = query.filter(ReturnRecord.return_date <= end)
+
+        sort_name, sort_column, descending = parse_sort(
+            request.args.get('sort'), {'return_date': ReturnRecord.return_date}, '-return_date'
+        )
 
-            enriched_returns.append(return_data)
+        row_key = lambda row: (row.return_date, row.id)
+
+        if wants_stream():
+            # Each chunk is read before its lookups run, so one session serves both
+            response = stream_rows(
+                iter_serialized_returns(db, models, keyset_chunks(lambda cursor_values, limit: keyset_page(
+                    query, sort_column, ReturnRecord.id, descending, cursor_values, limit, key=row_key
+                ))),
+                lambda return_data: return_data,
+                [db]
+            )
+            db = None
+            return response
+
+        if 'limit' in request.args or 'cursor' in request.args:
+            total = None
+            if request.args.get('include_total') == 'true':
+                total = query.order_by(None).count()
+            cursor = request.args.get('cursor')
+            rows, last_key = keyset_page(
+                query, sort_column, ReturnRecord.id, descending,
+                decode_cursor(cursor, sort_name) if cursor else None,
+                parse_limit(request.args.get('limit')),
+                key=row_key
+            )
+            page = {
+                'items': serialize_returns(db, models, rows),
+                'next_cursor': encode_cursor(sort_name, last_key) if last_key else None
+            }
+            if total is not None:
+                page['total'] = total
+            db.commit()
+            return json_response(page)
 
-        return jsonify(enriched_returns), 200
+        # Same order as the keyset pages
+        query = query.order_by(*keyset_order(sort_column, ReturnRecord.id, descending))
+        enriched_returns = list(iter_serialized_returns(db, models, query.all()))
+        db.commit()
+        return json_response(enriched_returns)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -115,11 +134,6 @@ def get_returns():
 def add_return():
     db = get_db_session()
     try:
-        models = get_models()
-        ReturnRecord = models.get('ReturnRecord')
-        Asset = models.get('Asset')
-        Assignment = models.get('Assignment')
-
         # Handle file upload
         if 'voucher' in request.files:
             voucher_file = request.files['voucher']
@@ -147,14 +161,6 @@ def add_return():
             if not data.get(field):
                 return jsonify({'error': f'{field} is required'}), 400
 
-        # Check if asset is currently under repair
-        RepairRequestForm = models.get('RepairRequestForm')
-        under_repair = db.query(RepairRequestForm).filter(
-            RepairRequestForm.oracle_number == data['oracle_number']
-        ).first()
-        if under_repair:
-            return jsonify({'error': 'This asset is currently under repair and cannot be processed here.'}), 400
-
         # Set return_type exactly to chosen radio value, normalized
         return_type_raw = str(data['return_option']).strip().lower()
         # Map frontend values to backend statuses
@@ -175,54 +181,19 @@ def add_return():
         except:
             pass
 
-        return_record = ReturnRecord(
-            oracle_number=data['oracle_number'],
-            return_type=return_type,
-            return_date=return_date,
+        # Return record, asset state and assignment in one version-checked transaction
+        return_record = transitions.return_asset(
+            db, data['oracle_number'], return_type, return_date,
+            version=data.get('version'),
             reason=reason,
             notes=notes,
-            timestamp=datetime.utcnow(),
             voucher_filename=voucher_filename
         )
 
-        db.add(return_record)
-        db.commit()
-
-        # Update asset status based on return type
-        asset = db.query(Asset).filter(Asset.oracle_number == data['oracle_number']).first()
-        if asset:
-            if return_type == 'returned_to_inventory':
-                # When asset is returned, set status to 'used'
-                asset.status = 'used'
-                asset.assigned_to = ''
-                asset.assignment_date = None
-                asset.expected_return_date = None
-            elif return_type == 'damaged':
-                # For damaged, set status to damaged
-                asset.status = 'damaged'
-                asset.assigned_to = ''
-                asset.assignment_date = None
-                asset.expected_return_date = None
-            elif return_type == 'buyback':
-                # For employee buyback, set status to buyback
-                asset.status = 'buyback'
-                asset.assigned_to = ''
-                asset.assignment_date = None
-                asset.expected_return_date = None
-            asset.updated_at = datetime.utcnow()
-            db.commit()
-
-        # Update assignment status if exists
-        assignment = db.query(Assignment).filter(
-            Assignment.oracle_number == data['oracle_number'],
-            Assignment.status == 'assigned'
-        ).first()
-        if assignment:
-            assignment.status = 'returned'
-            assignment.actual_return_date = return_date
-            db.commit()
-
         return jsonify({'id': return_record.id}), 201
+    except TransitionError as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         db.rollback()
         return jsonify({'error': str(e)}), 500
@@ -271,57 +242,22 @@ def update_return_voucher(return_id):
         close_db_session(db)
 
 @returns_bp.route('/returns/<oracle_number>', methods=['GET'])
+@conditional('returns', 'assets', 'assignments')
 def get_returns_by_oracle_number(oracle_number):
     """Get return details for a specific asset by oracle number"""
     db = get_db_session()
     try:
         models = get_models()
         ReturnRecord = models.get('ReturnRecord')
-        Asset = models.get('Asset')
-        Assignment = models.get('Assignment')
 
-        returns = db.query(ReturnRecord).filter(
+        returns = db.query(ReturnRecord.__table__).filter(
             ReturnRecord.oracle_number == oracle_number
         ).order_by(ReturnRecord.return_date.desc()).all()
 
-        enriched_returns = []
-
-        for return_record in returns:
-            asset = db.query(Asset).filter(Asset.oracle_number == oracle_number).first()
-            assignment = db.query(Assignment).filter(
-                Assignment.oracle_number == oracle_number,
-                Assignment.status == 'returned'
-            ).first()
-
-            return_data = return_serializer(return_record)
-
-            if asset:
-                return_data['asset_type'] = asset.device_type or ''
-                return_data['asset_model'] = asset.model_name or ''
-                return_data['serial_number'] = asset.serial_number or ''
-                return_data['asset_status'] = asset.status or ''
-            else:
-                return_data['asset_type'] = ''
-                return_data['asset_model'] = ''
-                return_data['serial_number'] = ''
-                return_data['asset_status'] = ''
-
-            if assignment:
-                return_data['employee_name'] = assignment.employee_name or ''
-                return_data['employee_department'] = assignment.department or ''
-                return_data['employee_designation'] = assignment.designation or ''
-                return_data['allocation_date'] = assignment.assignment_date.isoformat() if assignment.assignment_date else ''
-                return_data['expected_return_date'] = assignment.expected_return_date.isoformat() if assignment.expected_return_date else ''
-            else:
-                return_data['employee_name'] = ''
-                return_data['employee_department'] = ''
-                return_data['employee_designation'] = ''
-                return_data['allocation_date'] = ''
-                return_data['expected_return_date'] = ''
-
-            enriched_returns.append(return_data)
-
-        return jsonify(enriched_returns), 200
+        # The asset and employee are looked up once, not per return
+        enriched_returns = serialize_returns(db, models, returns)
+        db.commit()
+        return json_response(enriched_returns)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
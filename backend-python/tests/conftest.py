@@ -0,0 +1,110 @@
+"""
+Fixtures for the query tests: the app on a scratch SQLite database,
+reseeded with the benchmark data, a counter of the statements a request
+executes (and how that count moves with the data size) and the query
+plans of its SELECTs.
+"""
+import os
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+# app.py builds the default app at import time, so point it at a scratch
+# database and keep the periodic jobs off before importing it
+_scratch = tempfile.mkdtemp(prefix='inventory-tests-')
+os.environ['MYSQL_URI'] = f"sqlite:///{os.path.join(_scratch, 'test.db')}"
+for _interval in ('COUNTER_RECONCILE_INTERVAL', 'ACTIVITY_ARCHIVE_INTERVAL', 'OVERDUE_SCAN_INTERVAL'):
+    os.environ[_interval] = '0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+import benchmark  # noqa: E402
+
+@pytest.fixture(scope='session')
+def app():
+    return app_module.app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def session(app):
+    db = app.config['SessionLocal']()
+    yield db
+    db.close()
+
+@pytest.fixture
+def seed(app):
+    """seed(size): recreate the tables holding the benchmark data for `size` assets"""
+    def reseed(size):
+        benchmark.seed(app.config['engine'], size, departments=5, employees=20)
+    return reseed
+
+@pytest.fixture
+def count_statements(app):
+    """with count_statements() as counter: ... counts the statements run meanwhile in this thread.
+
+    Only the calling thread is counted; the activity writer and live update
+    producer share the engine.
+    """
+    engine = app.config['engine']
+
+    @contextmanager
+    def counting():
+        counter = benchmark.QueryCounter(engine, thread=threading.get_ident())
+        try:
+            yield counter
+        finally:
+            counter.close()
+    return counting
+
+@pytest.fixture
+def statement_counts(client, seed, count_statements):
+    """statement_counts(path, sizes, prepare=None): statements GET `path` runs for each size.
+
+    Each size reseeds the tables, then calls prepare(size) if given, so a
+    test can compare the counts to check they don't grow with the data.
+    """
+    def measure(path, sizes=(60, 600), prepare=None):
+        counts = []
+        for size in sizes:
+            seed(size)
+            if prepare:
+                prepare(size)
+            with count_statements() as counter:
+                response = client.get(path)
+            assert response.status_code == 200
+            counts.append(counter.count)
+        return counts
+    return measure
+
+@pytest.fixture
+def query_plans(app):
+    """with query_plans() as plans: ... collects the SQLite plan steps of each SELECT run meanwhile in this thread"""
+    engine = app.config['engine']
+
+    @contextmanager
+    def planning():
+        thread = threading.get_ident()
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if threading.get_ident() == thread and statement.lstrip().upper().startswith('SELECT'):
+                statements.append((statement, parameters))
+
+        plans = []
+        event.listen(engine, 'before_cursor_execute', capture)
+        try:
+            yield plans
+        finally:
+            event.remove(engine, 'before_cursor_execute', capture)
+        with engine.connect() as connection:
+            for statement, parameters in statements:
+                rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+                plans.append([row[-1] for row in rows])
+    return planning
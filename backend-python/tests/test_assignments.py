@@ -0,0 +1,80 @@
+"""
+The assignment listings run a fixed number of statements whatever the
+number of assignments, and return each active assignment with its asset.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert
+
+from models import Asset, Assignment, RepairRequestForm
+
+JAN_5 = datetime(2026, 1, 5, 9, 0)
+FEB_2 = datetime(2026, 2, 2, 14, 30)
+JUL_5 = datetime(2026, 7, 5, 9, 0)
+
+@pytest.mark.parametrize('path', ['/api/assignments', '/api/assignments/all',
+                                  '/api/assignments?limit=50', '/api/assignments/all?limit=50'])
+def test_listing_statement_count_does_not_grow(statement_counts, path):
+    counts = statement_counts(path)
+    assert counts[0] == counts[1]
+
+@pytest.fixture
+def assignments(session, seed):
+    seed(0)
+    session.execute(insert(Asset), [
+        {'oracle_number': 'OR-1', 'device_type': 'Laptop', 'brand_name': 'Dell', 'model_name': 'Latitude 5440',
+         'serial_number': 'SN-1', 'status': 'assigned', 'assigned_to': 'Amina Yusuf'},
+        {'oracle_number': 'OR-2', 'device_type': 'Monitor', 'brand_name': 'LG', 'model_name': None,
+         'serial_number': 'SN-2', 'status': 'assigned', 'assigned_to': 'Chen Wei'}
+    ])
+    session.execute(insert(RepairRequestForm), [
+        {'oracle_number': 'OR-2', 'asset_type': 'Monitor', 'start_date': FEB_2}
+    ])
+    session.execute(insert(Assignment), [
+        {'id': 1, 'oracle_number': 'OR-1', 'employee_name': 'Amina Yusuf', 'designation': 'Analyst',
+         'department': 'Finance', 'assignment_date': JAN_5, 'expected_return_date': JUL_5, 'status': 'assigned',
+         'notes': 'Spare charger', 'allocation_voucher_path': 'allocation_vouchers/or-1.pdf', 'timestamp': JAN_5},
+        {'id': 2, 'oracle_number': 'OR-2', 'employee_name': 'Chen Wei', 'department': 'IT',
+         'assignment_date': FEB_2, 'status': 'assigned', 'timestamp': FEB_2},
+        # No asset row for this one
+        {'id': 3, 'oracle_number': 'OR-9', 'employee_name': 'Dana Park', 'designation': 'Clerk',
+         'department': 'Stores', 'assignment_date': FEB_2, 'status': 'assigned', 'timestamp': FEB_2},
+        {'id': 4, 'oracle_number': 'OR-1', 'employee_name': 'Former Holder', 'assignment_date': JAN_5,
+         'actual_return_date': JAN_5, 'status': 'returned', 'timestamp': JAN_5}
+    ])
+    session.commit()
+
+EXPECTED = [
+    {
+        'id': 1, 'oracle_number': 'OR-1', 'employee_name': 'Amina Yusuf', 'designation': 'Analyst',
+        'department': 'Finance', 'assignment_date': '2026-01-05T09:00:00', 'expected_return_date': '2026-07-05T09:00:00',
+        'actual_return_date': '', 'status': 'assigned', 'notes': 'Spare charger',
+        'allocation_voucher_path': 'allocation_vouchers/or-1.pdf', 'has_allocation_voucher': True,
+        'timestamp': '2026-01-05T09:00:00', 'device_name': 'Latitude 5440', 'asset_type': 'Laptop',
+        'model': 'Latitude 5440', 'brand': 'Dell', 'serial_number': 'SN-1'
+    },
+    {
+        # The open repair overrides the asset status; no model, so the device type names it
+        'id': 2, 'oracle_number': 'OR-2', 'employee_name': 'Chen Wei', 'designation': '',
+        'department': 'IT', 'assignment_date': '2026-02-02T14:30:00', 'expected_return_date': '',
+        'actual_return_date': '', 'status': 'under repair', 'notes': '',
+        'allocation_voucher_path': '', 'has_allocation_voucher': False,
+        'timestamp': '2026-02-02T14:30:00', 'device_name': 'Monitor', 'asset_type': 'Monitor',
+        'model': None, 'brand': 'LG', 'serial_number': 'SN-2'
+    },
+    {
+        'id': 3, 'oracle_number': 'OR-9', 'employee_name': 'Dana Park', 'designation': 'Clerk',
+        'department': 'Stores', 'assignment_date': '2026-02-02T14:30:00', 'expected_return_date': '',
+        'actual_return_date': '', 'status': 'assigned', 'notes': '',
+        'allocation_voucher_path': '', 'has_allocation_voucher': False,
+        'timestamp': '2026-02-02T14:30:00', 'device_name': '', 'asset_type': '',
+        'model': '', 'brand': '', 'serial_number': ''
+    }
+]
+
+@pytest.mark.parametrize('path', ['/api/assignments', '/api/assignments/all'])
+def test_listing_payload(client, assignments, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    assert sorted(response.get_json(), key=lambda item: item['id']) == EXPECTED
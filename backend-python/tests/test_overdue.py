@@ -0,0 +1,82 @@
+"""
+The reminder scanner claims and stamps rows before it sends, so each
+assignment is reported once, and a failed delivery hands the rows back.
+"""
+import smtplib
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+
+from models import Assignment
+from utils.cache import table_generations
+from utils.overdue import scan_overdue
+
+CONFIG = {
+    'OVERDUE_NOTIFY_RECIPIENTS': 'it@example.org',
+    'MAIL_USERNAME': 'scanner@example.org',
+    'MAIL_PASSWORD': 'secret',
+    'MAIL_DEFAULT_SENDER': 'scanner@example.org',
+    'OVERDUE_REMINDER_DAYS': 3
+}
+
+class StandInMail:
+    """Flask-Mail's connect()/send() over a list instead of an SMTP server"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    @contextmanager
+    def connect(self):
+        yield self
+
+    def send(self, message):
+        if self.fail:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        self.sent.append(message)
+
+@pytest.fixture
+def scan(app, seed):
+    seed(60)
+    now = datetime.utcnow()
+
+    def run(mail):
+        with app.app_context():
+            return scan_overdue(app.config['SessionLocal'], mail, CONFIG, now=now, batch_size=4)
+    return run
+
+def _reported(session, kind):
+    column = Assignment.overdue_reminded_at if kind == 'overdue' else Assignment.due_soon_reminded_at
+    return {oracle_number for (oracle_number,) in session.query(Assignment.oracle_number).filter(column.isnot(None))}
+
+def test_reminders_are_sent_once(scan, session):
+    mail = StandInMail()
+    generation, = table_generations(session, ['assignments'])
+    result = scan(mail)
+    assert not result['dry_run']
+    assert result['overdue']['assignments'] and result['due_soon']['assignments']
+    assert len(mail.sent) == result['overdue']['digests'] + result['due_soon']['digests']
+
+    # Every stamped row is in a digest, and the stamps went through change tracking
+    body = '\n'.join(message.body for message in mail.sent)
+    for kind in ('overdue', 'due_soon'):
+        reported = _reported(session, kind)
+        assert len(reported) == result[kind]['assignments']
+        assert all(f'- {oracle_number}:' in body for oracle_number in reported)
+    assert table_generations(session, ['assignments'])[0] > generation
+
+    again = StandInMail()
+    result = scan(again)
+    assert again.sent == []
+    assert result['overdue']['assignments'] == result['due_soon']['assignments'] == 0
+
+def test_failed_delivery_is_sent_next_run(scan, session):
+    with pytest.raises(smtplib.SMTPException):
+        scan(StandInMail(fail=True))
+    assert _reported(session, 'overdue') == set()
+
+    mail = StandInMail()
+    result = scan(mail)
+    assert result['overdue']['assignments'] == len(_reported(session, 'overdue')) > 0
+    assert mail.sent
@@ -0,0 +1,77 @@
+"""
+Keyset pages of GET /api/assets seek an index whatever the sort, and
+together return the rows of the unpaged listing in the same order. A
+cursor of the wrong shape is a 400, not a failed unpack.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import Asset
+from utils.pagination import encode_cursor, keyset_page
+
+SIZE = 300
+SORTS = ['id', '-id', 'oracle_number', 'device_type', '-device_type', 'created_at', '-updated_at']
+
+def _paged_ids(client, path):
+    ids, cursor = [], None
+    while True:
+        page = client.get(path + (f'&cursor={cursor}' if cursor else '')).get_json()
+        ids.extend(item['id'] for item in page['items'])
+        cursor = page['next_cursor']
+        if not cursor:
+            return ids
+
+@pytest.mark.parametrize('sort', SORTS)
+def test_pages_return_the_listing(client, seed, sort):
+    seed(SIZE)
+    expected = [item['id'] for item in client.get(f'/api/assets?sort={sort}').get_json()]
+    assert len(set(expected)) == SIZE
+    assert _paged_ids(client, f'/api/assets?sort={sort}&limit=37') == expected
+
+@pytest.mark.parametrize('sort', SORTS)
+def test_pages_are_read_in_index_order(client, seed, query_plans, sort):
+    seed(SIZE)
+    first = client.get(f'/api/assets?sort={sort}&limit=50').get_json()
+    with query_plans() as plans:
+        response = client.get(f"/api/assets?sort={sort}&limit=50&cursor={first['next_cursor']}")
+    assert response.status_code == 200
+    assert plans
+    assert not [step for plan in plans for step in plan if 'TEMP B-TREE FOR ORDER BY' in step]
+
+@pytest.mark.parametrize('descending', [False, True])
+def test_nullable_sort_values_come_last(session, seed, descending):
+    seed(60)
+    now = datetime.utcnow()
+    assets = session.query(Asset).order_by(Asset.id).all()
+    for asset in assets:
+        # Every third asset has no purchase date, the others share a few
+        asset.purchase_date = None if asset.id % 3 == 0 else now - timedelta(days=asset.id % 4)
+    session.commit()
+
+    query = session.query(Asset.id, Asset.purchase_date)
+    key = lambda row: (row.purchase_date, row.id)
+    rows, cursor = [], None
+    while True:
+        page, cursor = keyset_page(query, Asset.purchase_date, Asset.id, descending, cursor, 7, key=key)
+        rows.extend(page)
+        if cursor is None:
+            break
+
+    dated = sorted((row for row in rows if row.purchase_date), key=key, reverse=descending)
+    undated = sorted((row for row in rows if row.purchase_date is None), key=lambda row: row.id, reverse=descending)
+    assert len(rows) == len(assets)
+    assert rows == dated + undated
+
+@pytest.mark.parametrize('path, sort_name, values', [
+    ('/api/assets?sort=-id', '-id', [1, 2, 3]),
+    ('/api/assets?sort=-id', '-id', [[1], 2]),
+    ('/api/assets/OR-0000001/timeline?limit=5', 'timeline', [None, 1]),
+    ('/api/assets/OR-0000001/timeline?limit=5', 'timeline', ['2024-01-01', 0, 1]),
+    ('/api/assets/OR-0000001/timeline?limit=5', 'timeline', [None, 99, 1])
+])
+def test_malformed_cursor_is_rejected(client, seed, path, sort_name, values):
+    seed(10)
+    response = client.get(f'{path}&cursor={encode_cursor(sort_name, values)}')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid cursor'}
@@ -0,0 +1,111 @@
+"""
+The returns listings look assets and employees up in batches, so they run
+a fixed number of statements however many returns there are, and each
+return carries its asset and the employee who returned it.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from models import Asset, Assignment, ReturnRecord
+
+ORACLE_NUMBER = 'OR-0000000'
+
+@pytest.mark.parametrize('path', ['/api/returns', '/api/returns?limit=50',
+                                  '/api/returns?limit=50&include_total=true'])
+def test_listing_statement_count_does_not_grow(statement_counts, path):
+    counts = statement_counts(path)
+    assert counts[0] == counts[1]
+
+def test_asset_returns_statement_count_does_not_grow(client, session, statement_counts):
+    def add_returns(returns):
+        now = datetime.utcnow()
+        # Returned to several employees over time
+        session.execute(insert(ReturnRecord), [{
+            'oracle_number': ORACLE_NUMBER, 'return_type': 'returned_to_inventory',
+            'return_date': now - timedelta(days=i), 'timestamp': now
+        } for i in range(returns)])
+        session.execute(insert(Assignment), [{
+            'oracle_number': ORACLE_NUMBER, 'employee_name': f'Employee {i}', 'status': 'returned',
+            'assignment_date': now - timedelta(days=i + 30), 'actual_return_date': now - timedelta(days=i),
+            'timestamp': now
+        } for i in range(returns)])
+        session.commit()
+
+    path = f'/api/returns/{ORACLE_NUMBER}'
+    counts = statement_counts(path, sizes=(1, 40), prepare=add_returns)
+    assert counts[0] == counts[1]
+    assert len(client.get(path).get_json()) >= 40
+
+@pytest.fixture
+def returns(session, seed):
+    seed(0)
+    session.execute(insert(Asset), [
+        {'oracle_number': 'OR-1', 'device_type': 'Laptop', 'brand_name': 'Dell', 'model_name': 'Latitude 5440',
+         'serial_number': 'SN-1', 'status': 'new'}
+    ])
+    session.execute(insert(Assignment), [
+        # The first returned assignment names the employee
+        {'oracle_number': 'OR-1', 'employee_name': 'Amina Yusuf', 'designation': 'Analyst', 'department': 'Finance',
+         'assignment_date': datetime(2025, 6, 1, 9, 0), 'expected_return_date': datetime(2026, 6, 1, 9, 0),
+         'actual_return_date': datetime(2026, 2, 1, 11, 0), 'status': 'returned'},
+        {'oracle_number': 'OR-1', 'employee_name': 'Later Holder', 'assignment_date': datetime(2026, 2, 10, 9, 0),
+         'actual_return_date': datetime(2026, 3, 1, 10, 0), 'status': 'returned'},
+        {'oracle_number': 'OR-1', 'employee_name': 'Current Holder', 'assignment_date': datetime(2026, 3, 5, 9, 0),
+         'status': 'assigned'}
+    ])
+    session.execute(insert(ReturnRecord), [
+        {'id': 1, 'oracle_number': 'OR-1', 'return_type': 'returned_to_inventory',
+         'return_date': datetime(2026, 3, 1, 10, 0), 'reason': 'Upgrade', 'notes': 'Box included',
+         'timestamp': datetime(2026, 3, 1, 10, 5), 'voucher_filename': 'return_1.pdf'},
+        # Neither an asset nor an assignment
+        {'id': 2, 'oracle_number': 'OR-2', 'return_type': 'buyback',
+         'return_date': datetime(2026, 4, 1, 16, 0), 'timestamp': datetime(2026, 4, 1, 16, 0)},
+        {'id': 3, 'oracle_number': 'OR-1', 'return_type': 'damaged',
+         'return_date': datetime(2026, 2, 1, 11, 0), 'reason': 'Cracked screen',
+         'timestamp': datetime(2026, 2, 1, 11, 0)}
+    ])
+    session.commit()
+
+NO_EMPLOYEE = {
+    'employee_name': '', 'employee_department': '', 'employee_designation': '',
+    'allocation_date': '', 'expected_return_date': ''
+}
+RETURNED_BY = {
+    'employee_name': 'Amina Yusuf', 'employee_department': 'Finance', 'employee_designation': 'Analyst',
+    'allocation_date': '2025-06-01T09:00:00', 'expected_return_date': '2026-06-01T09:00:00'
+}
+LAPTOP = {'asset_type': 'Laptop', 'asset_model': 'Latitude 5440', 'serial_number': 'SN-1', 'asset_status': 'new'}
+
+# Newest first
+EXPECTED = [
+    {
+        'id': 2, 'oracle_number': 'OR-2', 'return_type': 'buyback', 'return_date': '2026-04-01T16:00:00',
+        'reason': '', 'condition': '', 'notes': '', 'timestamp': '2026-04-01T16:00:00', 'voucher_filename': '',
+        'asset_type': '', 'asset_model': '', 'serial_number': '', 'asset_status': '', **NO_EMPLOYEE
+    },
+    {
+        'id': 1, 'oracle_number': 'OR-1', 'return_type': 'returned_to_inventory', 'return_date': '2026-03-01T10:00:00',
+        'reason': 'Upgrade', 'condition': 'Upgrade', 'notes': 'Box included', 'timestamp': '2026-03-01T10:05:00',
+        'voucher_filename': 'return_1.pdf', **LAPTOP, **RETURNED_BY
+    },
+    {
+        'id': 3, 'oracle_number': 'OR-1', 'return_type': 'damaged', 'return_date': '2026-02-01T11:00:00',
+        'reason': 'Cracked screen', 'condition': 'Cracked screen', 'notes': '', 'timestamp': '2026-02-01T11:00:00',
+        'voucher_filename': '', **LAPTOP, **RETURNED_BY
+    }
+]
+
+def test_listing_payload(client, returns):
+    response = client.get('/api/returns')
+    assert response.status_code == 200
+    assert response.get_json() == EXPECTED
+
+def test_listing_page_payload(client, returns):
+    response = client.get('/api/returns?limit=2')
+    assert response.status_code == 200
+    page = response.get_json()
+    assert page['items'] == EXPECTED[:2]
+    response = client.get(f"/api/returns?limit=2&cursor={page['next_cursor']}")
+    assert response.get_json()['items'] == EXPECTED[2:]
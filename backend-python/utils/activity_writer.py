@@ -0,0 +1,321 @@
+"""
+Background writer for activity log rows.
+
+Requests enqueue activity events and return; a worker thread inserts them
+in batches once `batch_size` events are waiting or `flush_interval` seconds
+have passed since the first one. An event records the employee's
+department as it is when the event is logged, not when it is written. The
+queue is bounded: when it is full a request waits up to `enqueue_timeout`
+seconds for room and then appends its event to the spill file, so a slow
+database never holds a request in the retry loop and no event is dropped.
+Pending events are drained at interpreter exit.
+
+A batch the database rejects is retried `retries` times with exponential
+backoff, then appended to the `spill_path` JSON-lines file. The worker
+writes spilled events back once a batch succeeds again, and at startup, so
+events outlive an outage or a restart. Lines that no longer parse as an
+event are moved to `<spill_path>.bad` instead of blocking the replay. The
+file belongs to one process; give each worker process its own path.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import and_
+
+_STOP = object()
+
+# Keys of a queued (and spilled) event
+EVENT_FIELDS = frozenset(('activity_type', 'asset_type', 'brand_name', 'asset_name', 'employee_name',
+                          'department_name', 'timestamp', 'remarks'))
+
+class ActivityWriter:
+    """Bounded queue of activity events flushed in batches by a worker thread"""
+
+    def __init__(self, max_queue=10000, batch_size=200, flush_interval=1.0, enqueue_timeout=0.5,
+                 retries=3, retry_backoff=0.5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.spill_path = None
+        self._spill_lock = threading.Lock()
+        self._spill_pending = False
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._session_factory = None
+        self._ActivityLog = None
+        self._Assignment = None
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'retries': 0,
+            'spilled': 0,
+            'replayed': 0,
+            'failed': 0,
+            'quarantined': 0,
+            'inline_writes': 0,
+            'batches': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0
+        }
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, session_factory, ActivityLog, Assignment, spill_path=None):
+        """Start the worker thread; safe to call more than once"""
+        self._session_factory = session_factory
+        self._ActivityLog = ActivityLog
+        self._Assignment = Assignment
+        self.spill_path = spill_path
+        # Events a previous run could not write
+        self._spill_pending = bool(spill_path)
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name='activity-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout=10):
+        """Flush everything still queued and stop the worker"""
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def log(self, activity_type, asset_type='', brand_name='', asset_name='',
+            employee_name='', department_name=None, remarks=''):
+        """Queue one activity; department_name=None looks it up from the active assignment now"""
+        if department_name is None:
+            department_name = self._department_of(employee_name) if employee_name else ''
+        event = {
+            'activity_type': activity_type,
+            'asset_type': asset_type,
+            'brand_name': brand_name,
+            'asset_name': asset_name,
+            'employee_name': employee_name or '',
+            'department_name': department_name,
+            'timestamp': datetime.utcnow(),
+            'remarks': remarks
+        }
+        self._count('enqueued')
+        if self.running:
+            try:
+                self._queue.put(event, timeout=self.enqueue_timeout)
+                return
+            except queue.Full:
+                if self.spill_path:
+                    # Replayed by the worker once it catches up
+                    self._spill([event], 'queue full')
+                    return
+        # Worker not running (or nowhere to spill): write it ourselves
+        self._count('inline_writes')
+        self._write([event])
+
+    def _department_of(self, employee_name):
+        """Department of the employee's active assignment ('' if none or unknown)"""
+        if self._session_factory is None:
+            return ''
+        db = None
+        try:
+            db = self._session_factory()
+            Assignment = self._Assignment
+            row = db.query(Assignment.department).filter(
+                and_(Assignment.employee_name == employee_name, Assignment.status == 'assigned')
+            ).order_by(Assignment.id).first()
+            return (row.department if row else None) or ''
+        except Exception as e:
+            # Logging never fails the request
+            print(f"Error looking up the department of {employee_name!r}: {e}")
+            return ''
+        finally:
+            if db is not None:
+                db.close()
+
+    def drain(self):
+        """Block until every queued event has been written"""
+        if self.running:
+            self._queue.join()
+
+    def metrics(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        total_flush_ms = stats.pop('total_flush_ms')
+        stats['avg_flush_ms'] = round(total_flush_ms / stats['batches'], 2) if stats['batches'] else 0.0
+        stats['queue_depth'] = self._queue.qsize()
+        stats['queue_capacity'] = self._queue.maxsize
+        stats['running'] = self.running
+        return stats
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _run(self):
+        if self._spill_pending:
+            self._replay_spill_safely()
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                return
+            batch = [first]
+            stopping = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if event is _STOP:
+                    stopping = True
+                    break
+                batch.append(event)
+            if self._write(batch) and self._spill_pending:
+                # The database takes writes again
+                self._replay_spill_safely()
+            for _ in range(len(batch) + stopping):
+                self._queue.task_done()
+            if stopping:
+                # Whatever raced in behind the stop marker still gets written
+                leftover = []
+                while True:
+                    try:
+                        leftover.append(self._queue.get_nowait())
+                        self._queue.task_done()
+                    except queue.Empty:
+                        break
+                if leftover:
+                    self._write(leftover)
+                return
+
+    def _write(self, events):
+        """Insert `events`, retrying with backoff and spilling them to disk if that fails; True once written"""
+        if self._session_factory is None:
+            self._count('failed', len(events))
+            print("Error writing activity logs: writer was never started")
+            return False
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count('retries')
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            try:
+                self._insert(events)
+                return True
+            except Exception as e:
+                error = e
+        self._spill(events, error)
+        return False
+
+    def _insert(self, events):
+        started = time.perf_counter()
+        db = self._session_factory()
+        try:
+            # ORM inserts, so the commit hooks (live updates) see each row with its id
+            db.add_all([self._ActivityLog(**event) for event in events])
+            db.commit()
+            self._count('written', len(events))
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._stats_lock:
+                self._stats['batches'] += 1
+                self._stats['last_flush_ms'] = round(elapsed_ms, 2)
+                self._stats['max_flush_ms'] = round(max(self._stats['max_flush_ms'], elapsed_ms), 2)
+                self._stats['total_flush_ms'] += elapsed_ms
+
+    def _append_spill(self, events):
+        with self._spill_lock:
+            with open(self.spill_path, 'a', encoding='utf-8') as spill:
+                for event in events:
+                    spill.write(json.dumps({**event, 'timestamp': event['timestamp'].isoformat()}) + '\n')
+            self._spill_pending = True
+
+    def _spill(self, events, error):
+        if not self.spill_path:
+            self._count('failed', len(events))
+            print(f"Error writing activity logs, {len(events)} dropped: {error}")
+            return
+        try:
+            self._append_spill(events)
+        except OSError as e:
+            self._count('failed', len(events))
+            print(f"Error writing activity logs, {len(events)} dropped: {error}; spill failed: {e}")
+            return
+        self._count('spilled', len(events))
+        print(f"Error writing activity logs, {len(events)} kept in {self.spill_path}: {error}")
+
+    def _replay_spill_safely(self):
+        """_replay_spill(), without letting an unreadable spill file stop the worker"""
+        try:
+            self._replay_spill()
+        except Exception as e:
+            print(f"Error replaying spilled activity logs, retried after the next batch: {e}")
+            with self._spill_lock:
+                self._spill_pending = True
+
+    def _parse_spilled(self, raw):
+        event = json.loads(raw.decode('utf-8'))
+        if not isinstance(event, dict) or set(event) != EVENT_FIELDS:
+            raise ValueError('not an activity event')
+        event['timestamp'] = datetime.fromisoformat(event['timestamp'])
+        return event
+
+    def _quarantine(self, lines):
+        with open(self.spill_path + '.bad', 'ab') as bad:
+            for line in lines:
+                bad.write(line if line.endswith(b'\n') else line + b'\n')
+        self._count('quarantined', len(lines))
+        print(f"Moved {len(lines)} unreadable spilled activity logs to {self.spill_path}.bad")
+
+    def _replay_spill(self):
+        """Write spilled events back, oldest first; whatever still fails stays spilled"""
+        replay_path = self.spill_path + '.replay'
+        with self._spill_lock:
+            self._spill_pending = False
+            # A replay file left by a crash goes first, new spills wait their turn
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spill_path):
+                    return
+                os.replace(self.spill_path, replay_path)
+        events, unreadable = [], []
+        with open(replay_path, 'rb') as replay:
+            for line in replay:
+                if not line.strip():
+                    continue
+                try:
+                    events.append(self._parse_spilled(line))
+                except (ValueError, TypeError):
+                    unreadable.append(line)
+        if unreadable:
+            self._quarantine(unreadable)
+        for start in range(0, len(events), self.batch_size):
+            batch = events[start:start + self.batch_size]
+            try:
+                self._insert(batch)
+            except Exception as e:
+                self._append_spill(events[start:])
+                print(f"Error replaying spilled activity logs, {len(events) - start} kept: {e}")
+                break
+            self._count('replayed', len(batch))
+        os.remove(replay_path)
+        with self._spill_lock:
+            # Replay again soon if events were spilled meanwhile
+            self._spill_pending = os.path.exists(self.spill_path)
+
+activity_writer = ActivityWriter()
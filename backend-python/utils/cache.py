@@ -0,0 +1,135 @@
+"""
+In-process caches versioned by write generations, plus ETag validation.
+
+Each cached resource has a generation counter that commit hooks (or routes)
+bump when the underlying data changes. Cached values remember the
+generation they were built at, and can also be tied to a version read from
+the database so they follow writes made by other processes.
+
+Endpoint validators come from the database: once a transaction that wrote
+a table commits, its `table:<name>` row in the counters table is
+incremented in a short transaction of its own. Writers never hold those
+rows, so they can't queue or deadlock on them. The @conditional decorator
+reads the rows (one primary-key lookup) and derives the ETag from them, so
+every process and every restart hands out the same ETag for the same data.
+"""
+import threading
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+from functools import wraps
+from flask import Response, g, make_response, request
+from sqlalchemy import event, select
+
+from models import Counter
+from utils.database import get_db_session, close_db_session, upsert_increment
+from utils.events import on_change
+
+_TOUCHED_KEY = 'touched_tables'
+_lock = threading.Lock()
+_generations = defaultdict(int)
+# Per resource, least recently used key first
+_entries = defaultdict(OrderedDict)
+
+def generation(name):
+    """Current write generation of a cached resource"""
+    return _generations[name]
+
+def bump(*names):
+    """Invalidate every cached value of the given resources in this process"""
+    with _lock:
+        for name in names:
+            _generations[name] += 1
+            _entries.pop(name, None)
+
+def cached(name, loader, key=None, ttl=None, version=None, max_keys=None):
+    """Return loader()'s value, reusing it until `name` is bumped, `ttl` seconds pass or `version` changes.
+
+    With `max_keys`, at most that many keys of `name` stay cached; the least
+    recently used one is dropped first.
+    """
+    current = (_generations[name], version)
+    now = time.monotonic()
+    with _lock:
+        entry = _entries[name].get(key)
+        if entry is not None:
+            built_generation, built_at, value = entry
+            if built_generation == current and (ttl is None or now - built_at < ttl):
+                _entries[name].move_to_end(key)
+                return value
+    value = loader()
+    with _lock:
+        entries = _entries[name]
+        entries[key] = (current, now, value)
+        entries.move_to_end(key)
+        while max_keys is not None and len(entries) > max_keys:
+            entries.popitem(last=False)
+    return value
+
+def touch_tables(session, *tables):
+    """Move the database generations of `tables` once `session` commits"""
+    session.info.setdefault(_TOUCHED_KEY, set()).update(tables)
+
+def _count_table_writes(session, changes):
+    touch_tables(session, *{change.table for change in changes})
+
+on_change(_count_table_writes)
+
+def _bump_touched_tables(session):
+    tables = session.info.pop(_TOUCHED_KEY, None)
+    if not tables:
+        return
+    # Until this commits, readers see the new rows under the old ETag: the
+    # next request after it revalidates
+    try:
+        with session.get_bind().begin() as connection:
+            upsert_increment(connection, Counter.__table__,
+                             [{'id': f'table:{table}', 'seq': 1} for table in sorted(tables)], ('seq',))
+    except Exception as e:
+        print(f"Error bumping table generations: {e}")
+
+def init_generation_hooks(session_factory):
+    """Bump the generations of the tables a session wrote after each of its commits"""
+    event.listen(session_factory, 'after_commit', _bump_touched_tables)
+    event.listen(session_factory, 'after_soft_rollback',
+                 lambda session, previous_transaction: session.info.pop(_TOUCHED_KEY, None))
+
+def table_generations(db, tables):
+    """Database generations of `tables`, in order; never-written tables read 0"""
+    keys = [f'table:{table}' for table in tables]
+    stored = dict(db.execute(select(Counter.id, Counter.seq).where(Counter.id.in_(keys))).all())
+    return tuple(stored.get(key) or 0 for key in keys)
+
+def conditional(*tables):
+    """Validate a GET endpoint with an ETag derived from the database generations of `tables`.
+
+    While none of `tables` has been written since the client's copy, the
+    view isn't called at all and a 304 goes back instead. The generations
+    are read before the view runs, so a write racing the query can only
+    make the next request miss, never serve stale data. They are left in
+    g.table_generations for views that cache their body in-process.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            db = get_db_session()
+            try:
+                generations = table_generations(db, tables)
+            finally:
+                close_db_session(db)
+            g.table_generations = generations
+
+            # Query string and Accept pick the representation (filters, streaming)
+            variant = zlib.crc32(f"{request.full_path}|{request.headers.get('Accept', '')}".encode())
+            etag = f"{'.'.join(str(generation) for generation in generations)}-{variant:08x}"
+            if etag in request.if_none_match:
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,305 @@
+"""
+Inventory counters kept in the `counters` table.
+
+Every flush that writes an asset, assignment, repair or return queues its
+counter adjustments on the session; just before the transaction commits
+they are netted and applied at once, in key order, so stats endpoints read
+a handful of rows instead of counting whole tables while writers hold the
+counter rows only for their commit and always lock them in the same order.
+A row's contribution is
+described by a key function; an update moves the row from the keys of its
+old values to the keys of its new ones. reconcile_counters() recounts
+everything with grouped queries through the same key functions and repairs
+any drift (e.g. from writes made outside SQLAlchemy).
+"""
+import hashlib
+import time
+from collections import defaultdict
+from sqlalchemy import and_, event, func, inspect, select, update
+
+from models import Asset, Assignment, CompletionRepair, Counter, RepairRequestForm, ReturnRecord
+from utils.database import begin_snapshot, upsert_increment
+from utils.events import on_change, track_old_values
+
+# Damaged returns whose asset is also marked damaged (the dashboard card).
+# It spans two tables, so it is recounted per oracle number around each flush.
+DAMAGED_KEY = 'returns:damaged_assets'
+_DAMAGED_BEFORE = 'damaged_counter_before'
+_PENDING_DELTAS = 'pending_counter_deltas'
+# counters.id is VARCHAR(50)
+KEY_LENGTH = 50
+
+def _key(*parts):
+    key = ':'.join(str(part) if part is not None else '' for part in parts)
+    if len(key) <= KEY_LENGTH:
+        return key
+    # Truncating would merge values sharing a prefix; keep a readable prefix
+    # and tell long values apart by a digest of the whole key
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+    return f'{key[:KEY_LENGTH - len(digest) - 1]}#{digest}'
+
+def _is_assigned(values):
+    return bool(values.get('assigned_to'))
+
+def _asset_keys(values):
+    status = values.get('status')
+    keys = ['assets:total', _key('assets:status', status), _key('assets:device_type', values.get('device_type'))]
+    if _is_assigned(values) and status != 'damaged':
+        keys.append('assets:assigned')
+    if not _is_assigned(values):
+        if status not in ('under repair', 'damaged', 'auctioned', 'buyback'):
+            keys.append('assets:available')
+        elif status == 'under repair':
+            keys.append('assets:under_repair_not_assigned')
+    return keys
+
+def _assignment_keys(values):
+    return [_key('assignments:status', values.get('status'))]
+
+def _repair_keys(values):
+    return ['repairs:open']
+
+def _completed_repair_keys(values):
+    return ['repairs:completed']
+
+def _return_keys(values):
+    return ['returns:total', _key('returns:type', values.get('return_type'))]
+
+# table -> (model, columns the key function reads, key function)
+TRACKED_TABLES = {
+    'assets': (Asset, ('status', 'device_type', 'assigned_to'), _asset_keys),
+    'assignments': (Assignment, ('status',), _assignment_keys),
+    'repair_request_form': (RepairRequestForm, (), _repair_keys),
+    'completion_repair': (CompletionRepair, (), _completed_repair_keys),
+    'returns': (ReturnRecord, ('return_type',), _return_keys)
+}
+
+def counter_deltas(changes):
+    """Net counter adjustments for a list of Change tuples"""
+    deltas = defaultdict(int)
+    for change in changes:
+        key_function = TRACKED_TABLES[change.table][2]
+        if change.action == 'insert':
+            new_keys, old_keys = key_function(change.values), ()
+        elif change.action == 'delete':
+            new_keys, old_keys = (), key_function(change.values)
+        else:
+            new_keys, old_keys = key_function(change.values), key_function({**change.values, **change.old})
+        for key in new_keys:
+            deltas[key] += 1
+        for key in old_keys:
+            deltas[key] -= 1
+    return {key: delta for key, delta in deltas.items() if delta}
+
+def apply_deltas(connection, deltas):
+    """Add `deltas` to the counter rows, creating missing ones"""
+    # Sorted so concurrent transactions lock counter rows in the same order
+    upsert_increment(connection, Counter.__table__,
+                     [{'id': key, 'seq': delta} for key, delta in sorted(deltas.items())], ('seq',))
+
+def _queue_deltas(session, deltas):
+    pending = session.info.setdefault(_PENDING_DELTAS, defaultdict(int))
+    for key, delta in deltas.items():
+        pending[key] += delta
+
+def _track_changes(session, changes):
+    _queue_deltas(session, counter_deltas(changes))
+
+on_change(_track_changes, tables=TRACKED_TABLES.keys())
+
+def _damaged_pairs(connection, oracle_numbers):
+    return connection.execute(
+        select(func.count()).select_from(ReturnRecord).join(
+            Asset, ReturnRecord.oracle_number == Asset.oracle_number
+        ).where(and_(
+            ReturnRecord.return_type == 'damaged',
+            Asset.status == 'damaged',
+            ReturnRecord.oracle_number.in_(oracle_numbers)
+        ))
+    ).scalar() or 0
+
+def _damaged_oracle_numbers(session):
+    """Oracle numbers whose damaged pairing this flush may change"""
+    oracle_numbers = set()
+    dirty = set(session.dirty)
+    for obj in list(session.new) + list(dirty) + list(session.deleted):
+        if isinstance(obj, Asset):
+            watched = ('status', 'oracle_number')
+        elif isinstance(obj, ReturnRecord):
+            watched = ('return_type', 'oracle_number')
+        else:
+            continue
+        state = inspect(obj)
+        if obj in dirty and not any(state.attrs[attr].history.has_changes() for attr in watched):
+            continue
+        oracle_numbers.add(obj.oracle_number)
+        oracle_numbers.update(state.attrs.oracle_number.history.deleted)
+    oracle_numbers.discard(None)
+    return oracle_numbers
+
+def _before_flush(session, flush_context, instances):
+    oracle_numbers = _damaged_oracle_numbers(session)
+    if oracle_numbers:
+        session.info[_DAMAGED_BEFORE] = (oracle_numbers, _damaged_pairs(session.connection(), oracle_numbers))
+
+def _after_flush(session, flush_context):
+    before = session.info.pop(_DAMAGED_BEFORE, None)
+    if before is None:
+        return
+    oracle_numbers, count_before = before
+    delta = _damaged_pairs(session.connection(), oracle_numbers) - count_before
+    if delta:
+        _queue_deltas(session, {DAMAGED_KEY: delta})
+
+def _before_commit(session):
+    # The commit's own flush runs after this hook, so flush first to queue its deltas too
+    session.flush()
+    deltas = {key: delta for key, delta in session.info.pop(_PENDING_DELTAS, {}).items() if delta}
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+def init_counters(session_factory):
+    """Attach the cross-table counter listeners to a sessionmaker"""
+    for model, columns, key_function in TRACKED_TABLES.values():
+        track_old_values(*(getattr(model, column) for column in columns))
+    track_old_values(Asset.oracle_number, ReturnRecord.oracle_number)
+    event.listen(session_factory, 'before_flush', _before_flush)
+    event.listen(session_factory, 'after_flush', _after_flush)
+    event.listen(session_factory, 'before_commit', _before_commit)
+    event.listen(session_factory, 'after_soft_rollback',
+                 lambda session, previous_transaction: session.info.pop(_PENDING_DELTAS, None))
+
+def read_counters(db, keys):
+    """Current values of `keys`; counters that were never written read as 0"""
+    rows = db.query(Counter.id, Counter.seq).filter(Counter.id.in_(list(keys))).all()
+    values = dict.fromkeys(keys, 0)
+    values.update({key: seq or 0 for key, seq in rows})
+    return values
+
+def actual_counts(db):
+    """Every counter recounted from the source tables"""
+    counts = defaultdict(int)
+    for model, columns, key_function in TRACKED_TABLES.values():
+        group_columns = [getattr(model, column) for column in columns]
+        rows = db.query(*group_columns, func.count()).select_from(model).group_by(*group_columns).all()
+        for row in rows:
+            values = dict(zip(columns, row[:-1]))
+            for key in key_function(values):
+                counts[key] += row[-1]
+    counts[DAMAGED_KEY] = db.query(func.count(ReturnRecord.id)).join(
+        Asset, ReturnRecord.oracle_number == Asset.oracle_number
+    ).filter(
+        and_(ReturnRecord.return_type == 'damaged', Asset.status == 'damaged')
+    ).scalar() or 0
+    return counts
+
+def reconcile_counters(db):
+    """Compare every counter with a recount, fix drifted rows and commit.
+
+    The counters and the recount are read in one snapshot without locking,
+    so writers are not held up while the tables are counted. Each drifted
+    counter is then set with a compare-and-set on the value read: one that a
+    writer moved since the snapshot no longer matches and is left for the
+    next run rather than having that write overwritten.
+
+    Returns {key: {'stored': n, 'actual': m}} for each counter it corrected.
+    """
+    begin_snapshot(db)
+    stored = {key: seq or 0 for key, seq in db.query(Counter.id, Counter.seq).all()}
+    actual = actual_counts(db)
+    db.rollback()
+
+    prefixes = tuple(f'{table_prefix}:' for table_prefix in ('assets', 'assignments', 'repairs', 'returns'))
+    drift = {}
+    for key in set(stored) | set(actual):
+        if not key.startswith(prefixes):
+            continue
+        if stored.get(key, 0) != actual.get(key, 0):
+            drift[key] = {'stored': stored.get(key), 'actual': actual.get(key, 0)}
+    if not drift:
+        return drift
+
+    table = Counter.__table__
+    connection = db.connection()
+    # Missing counters are created at 0 and compared as 0
+    apply_deltas(connection, {key: 0 for key, values in drift.items() if values['stored'] is None})
+    corrected = {}
+    for key, values in sorted(drift.items()):
+        result = connection.execute(update(table).where(
+            table.c.id == key, func.coalesce(table.c.seq, 0) == (values['stored'] or 0)
+        ).values(seq=values['actual']))
+        if result.rowcount:
+            corrected[key] = values
+    db.commit()
+    return corrected
+
+def dashboard_counters(db):
+    """The dashboard card numbers, read from the counters table"""
+    values = read_counters(db, [
+        'assets:total', 'assets:assigned', 'assets:available', 'assets:under_repair_not_assigned',
+        'assets:status:under repair', 'assets:status:auctioned', 'repairs:open',
+        'returns:type:buyback', DAMAGED_KEY
+    ])
+    total_assets = values['assets:total']
+    assigned = values['assets:assigned']
+    available = values['assets:available']
+    under_repair_not_assigned = values['assets:under_repair_not_assigned']
+    return {
+        'total_assets': total_assets,
+        'assigned': assigned,
+        # All unassigned assets (including under repair and damaged)
+        'unassigned': total_assets - assigned,
+        # Assets marked under repair or open repair forms, whichever is higher
+        'under_repair': max(values['assets:status:under repair'], values['repairs:open']),
+        'damaged': values[DAMAGED_KEY],
+        'auctioned': values['assets:status:auctioned'],
+        'available': available,
+        'under_repair_not_assigned': under_repair_not_assigned,
+        'stock_count': available + under_repair_not_assigned,
+        'buyback_count': values['returns:type:buyback']
+    }
+
+def acquire_lease(session_factory, name, seconds):
+    """Claim the lease `name` for `seconds`; its token, or None while someone else holds it.
+
+    A lease is a counters row holding the epoch second it was taken (0 when
+    free). Claiming is one conditional UPDATE, so of several processes only
+    one gets it, and a holder that died frees it after `seconds`.
+    """
+    table = Counter.__table__
+    now = int(time.time())
+    db = session_factory()
+    try:
+        upsert_increment(db.connection(), table, [{'id': name, 'seq': 0}], ('seq',))
+        claimed = db.execute(
+            update(table).where(table.c.id == name, table.c.seq <= now - seconds).values(seq=now)
+        ).rowcount
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return now if claimed else None
+
+def renew_lease(connection, name, token):
+    """Extend a held lease within the caller's transaction; the new token, or None if it was lost"""
+    table = Counter.__table__
+    now = int(time.time())
+    held = connection.execute(
+        update(table).where(table.c.id == name, table.c.seq == token).values(seq=now)
+    ).rowcount
+    return now if held else None
+
+def release_lease(session_factory, name, token):
+    """Free a lease, unless it already expired and was taken over"""
+    table = Counter.__table__
+    db = session_factory()
+    try:
+        db.execute(update(table).where(table.c.id == name, table.c.seq == token).values(seq=0))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -2,6 +2,8 @@
 Database utility functions to eliminate duplicate code across routes
 """
 from flask import current_app
+from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
 
 def get_db_session():
     """Get SQLAlchemy database session"""
@@ -19,4 +21,81 @@ def handle_db_error(db, error):
 def close_db_session(db):
     """Safely close database session"""
     if db:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def upsert_increment(connection, table, rows, amount_columns):
+    """Insert `rows`, or add their `amount_columns` to the row already holding that primary key.
+
+    One atomic statement per dialect (ON DUPLICATE KEY UPDATE on MySQL, ON
+    CONFLICT DO UPDATE on SQLite/PostgreSQL), so two transactions creating
+    the same key both succeed instead of one failing on the unique key.
+    Other dialects update row by row and insert the keys no row held yet;
+    an insert that loses a race for its key falls back to the update.
+    """
+    if not rows:
+        return
+    dialect = connection.dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table)
+        statement = statement.on_duplicate_key_update(
+            {column: table.c[column] + statement.inserted[column] for column in amount_columns}
+        )
+    elif dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(table.primary_key.columns),
+            set_={column: table.c[column] + statement.excluded[column] for column in amount_columns}
+        )
+    else:
+        key_columns = list(table.primary_key.columns)
+        for row in rows:
+            increment = table.update().where(
+                and_(*(column == row[column.name] for column in key_columns))
+            ).values({column: table.c[column] + row[column] for column in amount_columns})
+            if connection.execute(increment).rowcount:
+                continue
+            try:
+                with connection.begin_nested():
+                    connection.execute(table.insert(), row)
+            except IntegrityError:
+                connection.execute(increment)
+        return
+    connection.execute(statement, rows)
+
+def begin_snapshot(db):
+    """Open `db`'s transaction so every read in it sees the same snapshot of the database.
+
+    InnoDB gives a REPEATABLE READ transaction one consistent snapshot from
+    its first read. pysqlite only opens a transaction before a write, so on
+    SQLite an explicit BEGIN keeps the following SELECTs in one read
+    transaction. Writers are not blocked either way (InnoDB, SQLite WAL).
+    """
+    if db.get_bind().dialect.name == 'sqlite':
+        connection = db.connection()
+        connection.exec_driver_sql('BEGIN')
+    else:
+        connection = db.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+    return connection
+
+def insert_returning_ids(connection, table, rows):
+    """Insert `rows` into `table` in one round trip per call; the new primary keys, in row order.
+
+    Dialects that can return the keys of a batch in parameter order (SQLite,
+    PostgreSQL, MariaDB) use INSERT ... RETURNING. MySQL has no RETURNING,
+    so the rows go out as a single multi-row INSERT: InnoDB hands a
+    statement of known row count consecutive AUTO_INCREMENT values, starting
+    at the LAST_INSERT_ID() it reports (auto_increment_increment = 1).
+    """
+    if not rows:
+        return []
+    key = list(table.primary_key.columns)[0]
+    if connection.dialect.insert_executemany_returning_sort_by_parameter_order:
+        result = connection.execute(table.insert().returning(key, sort_by_parameter_order=True), rows)
+        return list(result.scalars())
+    first_id = connection.execute(table.insert().values(rows)).lastrowid
+    return list(range(first_id, first_id + len(rows)))
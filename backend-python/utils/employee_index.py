@@ -0,0 +1,195 @@
+"""
+In-process employee directory with prefix autocomplete.
+
+Employees only exist as free-text names copied into assignments and repair
+forms. This index gathers them per normalized name, with their most used
+department and designation and the number of assets they currently hold,
+and keeps a prefix trie over every word start of the name so "ali" finds
+"Muhammad Ali Khan". Warmed at startup and kept current through commit
+hooks; like the asset search index it only sees this process's writes,
+which is fine for suggestions. Holdings themselves are read from the
+database through the (employee_name, status) index.
+"""
+import heapq
+import threading
+from collections import Counter
+
+from utils.events import on_commit
+
+# Trie depth; longer prefixes are matched by filtering the deepest node
+MAX_PREFIX = 20
+
+SOURCE_TABLES = ('assignments', 'repair_request_form', 'completion_repair')
+
+def normalize_name(value):
+    return ' '.join((value or '').lower().split())
+
+def _word_suffixes(key):
+    """The key from each of its word starts: 'a b c' -> 'a b c', 'b c', 'c'"""
+    words = key.split(' ')
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+class _Employee:
+    __slots__ = ('names', 'departments', 'designations', 'rows', 'active')
+
+    def __init__(self):
+        self.names = Counter()
+        self.departments = Counter()
+        self.designations = Counter()
+        self.rows = 0
+        self.active = 0
+
+    def summary(self):
+        return {
+            'name': self.names.most_common(1)[0][0],
+            'department': self.departments.most_common(1)[0][0] if self.departments else '',
+            'designation': self.designations.most_common(1)[0][0] if self.designations else '',
+            'active_holdings': self.active
+        }
+
+def _adjust(counter, value, delta):
+    if not value:
+        return
+    counter[value] += delta
+    if counter[value] <= 0:
+        del counter[value]
+
+class EmployeeIndex:
+    """Employees seen on assignments and repairs, searchable by name prefix"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}         # (table, row id) -> (key, name, department, designation, active)
+        self._employees = {}    # normalized name -> _Employee
+        self._trie = {}         # char -> [children, keys under this prefix]
+        self.ready = False
+
+    def warm(self, session_factory, *models):
+        """Load the employee columns of the given source models"""
+        db = session_factory()
+        try:
+            with self._lock:
+                self._rows.clear()
+                self._employees.clear()
+                self._trie.clear()
+                for model in models:
+                    columns = [model.id, model.employee_name, model.department, model.designation]
+                    if model.__tablename__ == 'assignments':
+                        columns.append(model.status)
+                    for row in db.query(*columns).yield_per(5000):
+                        values = dict(zip(('employee_name', 'department', 'designation', 'status'), row[1:]))
+                        self._add(model.__tablename__, row[0], values)
+                self.ready = True
+        finally:
+            db.close()
+
+    def _trie_paths(self, key):
+        return {suffix[:MAX_PREFIX] for suffix in _word_suffixes(key)}
+
+    def _trie_add(self, key):
+        for path in self._trie_paths(key):
+            level = self._trie
+            for char in path:
+                node = level.setdefault(char, [{}, set()])
+                node[1].add(key)
+                level = node[0]
+
+    def _trie_remove(self, key):
+        for path in self._trie_paths(key):
+            level = self._trie
+            for char in path:
+                node = level.get(char)
+                if node is None:
+                    break
+                node[1].discard(key)
+                if not node[1]:
+                    # Nothing else below this prefix
+                    del level[char]
+                    break
+                level = node[0]
+
+    def _add(self, table, row_id, values):
+        key = normalize_name(values.get('employee_name'))
+        if not key:
+            return
+        name = values['employee_name'].strip()
+        active = table == 'assignments' and values.get('status') == 'assigned'
+        record = (key, name, values.get('department'), values.get('designation'), active)
+        self._rows[(table, row_id)] = record
+
+        employee = self._employees.get(key)
+        if employee is None:
+            employee = self._employees[key] = _Employee()
+            self._trie_add(key)
+        self._apply(employee, record, 1)
+
+    def _remove(self, table, row_id):
+        record = self._rows.pop((table, row_id), None)
+        if record is None:
+            return
+        employee = self._employees[record[0]]
+        self._apply(employee, record, -1)
+        if employee.rows <= 0:
+            del self._employees[record[0]]
+            self._trie_remove(record[0])
+
+    def _apply(self, employee, record, delta):
+        key, name, department, designation, active = record
+        employee.rows += delta
+        employee.active += delta if active else 0
+        _adjust(employee.names, name, delta)
+        _adjust(employee.departments, department, delta)
+        _adjust(employee.designations, designation, delta)
+
+    def upsert(self, table, values):
+        with self._lock:
+            self._remove(table, values['id'])
+            self._add(table, values['id'], values)
+
+    def remove(self, table, row_id):
+        with self._lock:
+            self._remove(table, row_id)
+
+    def suggest(self, prefix, limit=10):
+        """Employees with a name word starting with `prefix`, best match first"""
+        prefix = normalize_name(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            level, keys = self._trie, None
+            for char in prefix[:MAX_PREFIX]:
+                node = level.get(char)
+                if node is None:
+                    return []
+                level, keys = node[0], node[1]
+            if len(prefix) > MAX_PREFIX:
+                keys = [key for key in keys if any(suffix.startswith(prefix) for suffix in _word_suffixes(key))]
+            # Whole-name prefix matches first, then by assets held, then alphabetically
+            ranked = heapq.nsmallest(limit, keys, key=lambda key: (
+                not key.startswith(prefix), -self._employees[key].active, key))
+            return [self._employees[key].summary() for key in ranked]
+
+    def employee(self, name):
+        """Summary of one employee, or None if the name was never seen"""
+        with self._lock:
+            employee = self._employees.get(normalize_name(name))
+            return employee.summary() if employee else None
+
+    def spellings(self, name):
+        """Every spelling of `name` seen on a row, e.g. differing in case"""
+        with self._lock:
+            employee = self._employees.get(normalize_name(name))
+            return sorted(employee.names) if employee else []
+
+employee_index = EmployeeIndex()
+
+def _sync_employee_index(changes):
+    if not employee_index.ready:
+        return
+    for change in changes:
+        if change.action == 'delete':
+            employee_index.remove(change.table, change.values['id'])
+        else:
+            employee_index.upsert(change.table, change.values)
+
+on_commit(_sync_employee_index, tables=SOURCE_TABLES)
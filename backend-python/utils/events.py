@@ -0,0 +1,111 @@
+"""
+Commit hooks so in-process indexes and caches follow database writes
+"""
+from collections import namedtuple
+from sqlalchemy import event, inspect
+
+# table: table name, action: 'insert' | 'update' | 'delete',
+# values: column values of the row, old: previous values of changed columns
+Change = namedtuple('Change', ['table', 'action', 'values', 'old'])
+
+_PENDING_KEY = 'pending_changes'
+_listeners = []
+_change_listeners = []
+
+def on_commit(callback, tables=None):
+    """Call callback(changes) after every commit that wrote to one of `tables`.
+
+    `tables` is an iterable of table names; None subscribes to every table.
+    Callbacks run after the transaction is durable, so a rolled back write
+    never reaches them.
+    """
+    _listeners.append((set(tables) if tables else None, callback))
+    return callback
+
+def on_change(callback, tables=None):
+    """Call callback(session, changes) as writes to `tables` are flushed.
+
+    Unlike on_commit callbacks these run inside the writing transaction, so
+    they may write to the database themselves and are rolled back with it.
+    Exceptions propagate and abort the flush.
+    """
+    _change_listeners.append((set(tables) if tables else None, callback))
+    return callback
+
+def _notify_change(session, changes):
+    for tables, callback in _change_listeners:
+        relevant = [c for c in changes if tables is None or c.table in tables]
+        if relevant:
+            callback(session, relevant)
+
+def record_change(session, table, action, values, old=None):
+    """Queue a change made outside the unit of work (bulk insert/update)"""
+    record_changes(session, [Change(table, action, values, old or {})])
+
+def record_changes(session, changes):
+    """Queue several Change tuples made outside the unit of work at once"""
+    session.info.setdefault(_PENDING_KEY, []).extend(changes)
+    _notify_change(session, changes)
+
+def _noop_set(target, value, oldvalue, initiator):
+    return value
+
+def track_old_values(*attributes):
+    """Make Change.old carry the previous value of these mapped attributes.
+
+    Attributes expired by an earlier commit don't remember their old value
+    when assigned; an active-history listener loads it first.
+    """
+    for attribute in attributes:
+        if not event.contains(attribute, 'set', _noop_set):
+            event.listen(attribute, 'set', _noop_set, active_history=True, retval=True)
+
+def _row_values(obj, deleted=False):
+    mapper = inspect(obj).mapper
+    if deleted:
+        # Deleted rows can't be refreshed, use whatever was loaded
+        state_dict = inspect(obj).dict
+        return {attr.key: state_dict.get(attr.key) for attr in mapper.column_attrs}
+    return {attr.key: getattr(obj, attr.key) for attr in mapper.column_attrs}
+
+def _old_values(obj):
+    old = {}
+    for attr in inspect(obj).attrs:
+        history = attr.history
+        if history.has_changes() and history.deleted:
+            old[attr.key] = history.deleted[0]
+    return old
+
+def _after_flush(session, flush_context):
+    pending = []
+    for obj in session.new:
+        pending.append(Change(obj.__table__.name, 'insert', _row_values(obj), {}))
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            pending.append(Change(obj.__table__.name, 'update', _row_values(obj), _old_values(obj)))
+    for obj in session.deleted:
+        pending.append(Change(obj.__table__.name, 'delete', _row_values(obj, deleted=True), {}))
+    session.info.setdefault(_PENDING_KEY, []).extend(pending)
+    _notify_change(session, pending)
+
+def _after_commit(session):
+    changes = session.info.pop(_PENDING_KEY, [])
+    if not changes:
+        return
+    for tables, callback in _listeners:
+        relevant = [c for c in changes if tables is None or c.table in tables]
+        if not relevant:
+            continue
+        try:
+            callback(relevant)
+        except Exception as e:
+            print(f"Error in commit hook {callback.__name__}: {e}")
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+def init_commit_hooks(session_factory):
+    """Attach the change tracking listeners to a sessionmaker"""
+    event.listen(session_factory, 'after_flush', _after_flush)
+    event.listen(session_factory, 'after_commit', _after_commit)
+    event.listen(session_factory, 'after_soft_rollback', lambda session, previous_transaction: _after_rollback(session))
@@ -0,0 +1,94 @@
+"""
+In-process existence index for oracle and serial numbers.
+
+The form validators hit these checks on every keystroke. A miss in the index
+is answered straight away; a hit is confirmed against the database, so a
+stale entry can never report a duplicate that isn't there. Warmed at startup
+and kept current through commit hooks.
+
+Numbers are keyed the way the columns' MySQL collation compares them, case
+insensitive and ignoring trailing spaces, so 'or-1 ' misses only if 'OR-1'
+does too. Misses are only authoritative in a single application process:
+the hooks see this process's commits, not those of other workers or writes
+made outside SQLAlchemy, which appear at the next warm(). The checks are
+advisory anyway; POST /assets still tests uniqueness in the database.
+"""
+import threading
+from collections import Counter
+
+from utils.events import on_commit
+
+def number_key(value):
+    """`value` as the assets columns' collation compares it"""
+    return value.rstrip(' ').casefold() if value else value
+
+class ExistenceIndex:
+    """Multisets of the oracle and serial numbers currently in the assets table"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}                  # asset id -> (oracle_number, serial_number)
+        self._oracle_numbers = Counter()
+        self._serial_numbers = Counter()
+        self.ready = False
+
+    def warm(self, session_factory, Asset):
+        """Load every oracle and serial number from the assets table"""
+        db = session_factory()
+        try:
+            with self._lock:
+                self._rows.clear()
+                self._oracle_numbers.clear()
+                self._serial_numbers.clear()
+                for asset_id, oracle_number, serial_number in db.query(
+                        Asset.id, Asset.oracle_number, Asset.serial_number).yield_per(5000):
+                    self._add(asset_id, oracle_number, serial_number)
+                self.ready = True
+        finally:
+            db.close()
+
+    def _add(self, asset_id, oracle_number, serial_number):
+        oracle_number, serial_number = number_key(oracle_number), number_key(serial_number)
+        self._rows[asset_id] = (oracle_number, serial_number)
+        if oracle_number:
+            self._oracle_numbers[oracle_number] += 1
+        if serial_number:
+            self._serial_numbers[serial_number] += 1
+
+    def _remove(self, asset_id):
+        oracle_number, serial_number = self._rows.pop(asset_id, (None, None))
+        for counter, value in ((self._oracle_numbers, oracle_number), (self._serial_numbers, serial_number)):
+            if value:
+                counter[value] -= 1
+                if counter[value] <= 0:
+                    del counter[value]
+
+    def upsert(self, values):
+        with self._lock:
+            self._remove(values['id'])
+            self._add(values['id'], values.get('oracle_number'), values.get('serial_number'))
+
+    def remove(self, asset_id):
+        with self._lock:
+            self._remove(asset_id)
+
+    def may_have_oracle_number(self, oracle_number):
+        """False means absent (as far as this process has seen); True needs confirming in the database"""
+        return not self.ready or number_key(oracle_number) in self._oracle_numbers
+
+    def may_have_serial_number(self, serial_number):
+        """False means absent (as far as this process has seen); True needs confirming in the database"""
+        return not self.ready or number_key(serial_number) in self._serial_numbers
+
+existence_index = ExistenceIndex()
+
+def _sync_existence_index(changes):
+    if not existence_index.ready:
+        return
+    for change in changes:
+        if change.action == 'delete':
+            existence_index.remove(change.values['id'])
+        else:
+            existence_index.upsert(change.values)
+
+on_commit(_sync_existence_index, tables=['assets'])
@@ -0,0 +1,149 @@
+"""
+Server-Sent Events fan-out for dashboard numbers and new activity entries.
+
+Commit hooks only flag that something changed. One producer thread then
+reads the dashboard counters once per burst of writes, diffs them against
+the last snapshot and broadcasts the changed cards, together with any new
+activity log rows, to every subscriber. Database work therefore doesn't
+grow with the number of open screens. Each subscriber has a bounded
+buffer; a client that falls behind has its backlog replaced by a single
+`resync` event telling it to refetch.
+"""
+import queue
+import threading
+import time
+
+from utils.counters import dashboard_counters
+from utils.events import on_commit
+from utils.serializers import ACTIVITY_ROW, dumps
+
+class LiveUpdates:
+    """Single producer broadcasting dashboard deltas and activity to SSE clients"""
+
+    def __init__(self, client_buffer=100, heartbeat=15.0, debounce=0.5):
+        self.client_buffer = client_buffer
+        self.heartbeat = heartbeat
+        self.debounce = debounce
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._wake = threading.Event()
+        self._dashboard_dirty = False
+        self._activities = []
+        self._snapshot = None
+        self._session_factory = None
+        self._thread = None
+
+    def start(self, session_factory):
+        self._session_factory = session_factory
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='live-updates', daemon=True)
+            self._thread.start()
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        client = queue.Queue(maxsize=self.client_buffer)
+        with self._lock:
+            if not self._subscribers:
+                # Nothing kept the snapshot current while nobody watched
+                self._snapshot = None
+            self._subscribers.add(client)
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._subscribers.discard(client)
+
+    def notify_dashboard(self):
+        """Called from commit hooks; the producer recomputes once per burst"""
+        if self._subscribers:
+            self._dashboard_dirty = True
+            self._wake.set()
+
+    def add_activities(self, activities):
+        if self._subscribers:
+            with self._lock:
+                self._activities.extend(activities)
+            self._wake.set()
+
+    def snapshot(self):
+        """Latest dashboard numbers, read from the counters if not known yet"""
+        if self._snapshot is None:
+            self._snapshot = self._read_dashboard()
+        return self._snapshot
+
+    def _read_dashboard(self):
+        db = self._session_factory()
+        try:
+            return dashboard_counters(db)
+        finally:
+            db.close()
+
+    def _broadcast(self, event, data):
+        message = f"event: {event}\ndata: {dumps(data)}\n\n"
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for client in subscribers:
+            try:
+                client.put_nowait(message)
+            except queue.Full:
+                # Too far behind to catch up event by event
+                while True:
+                    try:
+                        client.get_nowait()
+                    except queue.Empty:
+                        break
+                client.put_nowait("event: resync\ndata: {}\n\n")
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            # Let a burst of commits settle into one update
+            time.sleep(self.debounce)
+            self._wake.clear()
+
+            with self._lock:
+                activities, self._activities = self._activities, []
+            if activities:
+                self._broadcast('activity', activities)
+
+            if self._dashboard_dirty:
+                self._dashboard_dirty = False
+                try:
+                    current = self._read_dashboard()
+                except Exception as e:
+                    print(f"Error reading dashboard for live updates: {e}")
+                    continue
+                previous = self._snapshot or {}
+                delta = {key: value for key, value in current.items() if previous.get(key) != value}
+                self._snapshot = current
+                if delta:
+                    self._broadcast('dashboard', delta)
+
+    def stream(self, client):
+        """SSE text for one subscriber: full snapshot first, then deltas and heartbeats"""
+        try:
+            yield f"event: dashboard\ndata: {dumps(self.snapshot())}\n\n"
+            while True:
+                try:
+                    yield client.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+        finally:
+            self.unsubscribe(client)
+
+live_updates = LiveUpdates()
+
+def _dashboard_changed(changes):
+    live_updates.notify_dashboard()
+
+def _activities_logged(changes):
+    live_updates.add_activities([
+        ACTIVITY_ROW.one(tuple(change.values.get(column) for column in ACTIVITY_ROW.column_names))
+        for change in changes if change.action == 'insert'
+    ])
+
+on_commit(_dashboard_changed, tables=['assets', 'assignments', 'repair_request_form', 'returns'])
+on_commit(_activities_logged, tables=['activity_logs'])
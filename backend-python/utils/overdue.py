@@ -0,0 +1,139 @@
+"""
+Overdue and soon-due assignment reminders.
+
+Each assignment records when it was reminded (overdue_reminded_at,
+due_soon_reminded_at), so every active assignment past or near its expected
+return date is reported exactly once, whenever it was created or however
+far back its date lies. A run claims the not-yet-reminded rows in batches:
+it locks them (concurrent scans skip locked rows), stamps them through the
+ORM so the commit hooks see the write, and commits before sending one
+digest per department over a single SMTP connection. No row lock is held
+while the mail server is slow, and a committed claim is never sent twice.
+A failed delivery clears the stamps again, leaving the rows for the next run.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask_mail import Message
+
+from models import Assignment
+
+SCAN_BATCH_SIZE = 500
+
+# kind -> column stamped once the assignment was reported
+REMINDED_COLUMNS = {
+    'overdue': Assignment.overdue_reminded_at,
+    'due_soon': Assignment.due_soon_reminded_at
+}
+
+def active_due_query(db, until, after=None):
+    """Assigned rows with an expected return date in (after, until], soonest first"""
+    query = db.query(Assignment).filter(
+        Assignment.status == 'assigned',
+        Assignment.expected_return_date.isnot(None),
+        Assignment.expected_return_date <= until
+    )
+    if after is not None:
+        query = query.filter(Assignment.expected_return_date > after)
+    return query.order_by(Assignment.expected_return_date, Assignment.id)
+
+def mail_configured(config):
+    """False while the MAIL_* settings still hold the .env.example placeholders"""
+    return bool(
+        config.get('MAIL_USERNAME') and config['MAIL_USERNAME'] != 'your-email@gmail.com' and
+        config.get('MAIL_PASSWORD') and config['MAIL_PASSWORD'] != 'your-app-password-here'
+    )
+
+def build_digests(kind, rows, now, sender, recipients):
+    """One reminder Message per department for these assignment rows"""
+    by_department = defaultdict(list)
+    for row in rows:
+        by_department[row.department or 'Unspecified'].append(row)
+
+    title = 'Overdue asset returns' if kind == 'overdue' else 'Asset returns due soon'
+    messages = []
+    for department, items in sorted(by_department.items()):
+        lines = [f"{title} - {department} ({len(items)})", '']
+        for row in items:
+            days = (now - row.expected_return_date).days
+            when = f"{days} days overdue" if kind == 'overdue' else f"due {row.expected_return_date.date().isoformat()}"
+            lines.append(f"- {row.oracle_number}: {row.employee_name} ({row.designation or '-'}), {when}")
+        lines += ['', 'This is an automated email from NEPRA IT Asset Management System.']
+        messages.append(Message(
+            subject=f"{title}: {department} - NEPRA IT Asset Management",
+            recipients=recipients,
+            sender=sender,
+            body='\n'.join(lines)
+        ))
+    return messages
+
+def _deliver(mail, messages, dry_run):
+    if dry_run:
+        # Development mode - log to console instead of sending email
+        for msg in messages:
+            print(f"\n[overdue digest] {msg.subject}\n{msg.body}\n")
+        return
+    # One SMTP connection (login, TLS) for the whole batch
+    with mail.connect() as connection:
+        for msg in messages:
+            connection.send(msg)
+
+def _release(session_factory, reminded, ids, stamp):
+    """Clear the stamps a failed delivery left, unless something else changed them since"""
+    db = session_factory()
+    try:
+        for row in db.query(Assignment).filter(Assignment.id.in_(ids), reminded == stamp):
+            setattr(row, reminded.key, None)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def scan_overdue(session_factory, mail, config, now=None, batch_size=SCAN_BATCH_SIZE):
+    """Send digests for assignments that are overdue or due soon and were not reported yet.
+
+    Needs an app context for Flask-Mail. Returns the rows and digests per kind.
+    """
+    now = now or datetime.utcnow()
+    recipients = [r.strip() for r in config.get('OVERDUE_NOTIFY_RECIPIENTS', '').split(',') if r.strip()]
+    dry_run = not recipients or not mail_configured(config)
+    sender = config.get('MAIL_DEFAULT_SENDER')
+    due_soon_until = now + timedelta(days=config.get('OVERDUE_REMINDER_DAYS', 3))
+    # Whole seconds, so a stamp reads back equal from a DATETIME column
+    stamp = now.replace(microsecond=0)
+
+    # Due-soon only covers dates still ahead; older rows are already overdue
+    result = {}
+    for kind, until, after in (('overdue', now, None), ('due_soon', due_soon_until, now)):
+        reminded = REMINDED_COLUMNS[kind]
+        result[kind] = {'assignments': 0, 'digests': 0}
+        while True:
+            db = session_factory()
+            try:
+                rows = active_due_query(db, until, after).filter(
+                    reminded.is_(None)
+                ).limit(batch_size).with_for_update(skip_locked=True).all()
+                if not rows:
+                    db.commit()
+                    break
+                # Built before the commit expires the rows
+                messages = build_digests(kind, rows, now, sender, recipients)
+                ids = [row.id for row in rows]
+                for row in rows:
+                    setattr(row, reminded.key, stamp)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+            try:
+                _deliver(mail, messages, dry_run)
+            except Exception:
+                _release(session_factory, reminded, ids, stamp)
+                raise
+            result[kind]['assignments'] += len(ids)
+            result[kind]['digests'] += len(messages)
+    result['dry_run'] = dry_run
+    return result
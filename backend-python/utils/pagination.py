@@ -0,0 +1,126 @@
+"""
+Keyset (cursor) pagination helpers shared by list endpoints
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+class PaginationError(ValueError):
+    """Raised for malformed limit, sort or cursor arguments (maps to HTTP 400)"""
+
+def encode_cursor(sort_name, values):
+    """Encode the sort name and last-row key values as an opaque token"""
+    payload = [sort_name, [
+        {'dt': v.isoformat()} if isinstance(v, datetime) else v
+        for v in values
+    ]]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token, sort_name):
+    """Decode a token produced by encode_cursor for the same sort"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor_sort, values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        values = [
+            datetime.fromisoformat(v['dt']) if isinstance(v, dict) else v
+            for v in values
+        ]
+    except Exception:
+        raise PaginationError('Invalid cursor')
+    if cursor_sort != sort_name:
+        raise PaginationError('Cursor does not match the requested sort')
+    return values
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE):
+    """Parse a limit query argument, capped at MAX_PAGE_SIZE"""
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE)
+
+def parse_sort(value, allowed, default):
+    """Resolve a sort argument like 'oracle_number' or '-updated_at'.
+
+    `allowed` maps sort names to columns. Returns (sort_name, column, descending).
+    """
+    sort_name = value or default
+    field = sort_name.lstrip('-')
+    if field not in allowed:
+        raise PaginationError(f"sort must be one of: {', '.join(sorted(allowed))}")
+    return sort_name, allowed[field], sort_name.startswith('-')
+
+def parse_date_arg(value, name, end_of_day=False):
+    """ISO date/datetime filter argument; a bare end date covers that whole day"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        raise PaginationError(f'{name} must be an ISO date')
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1) - timedelta(microseconds=1)
+    return parsed
+
+def cursor_fields(cursor_values, count):
+    """The `count` key values of a decoded cursor, or PaginationError for any other shape"""
+    if not isinstance(cursor_values, (list, tuple)) or len(cursor_values) != count or \
+            any(isinstance(value, (list, dict)) for value in cursor_values):
+        raise PaginationError('Invalid cursor')
+    return cursor_values
+
+def _nullable(column):
+    """False when the schema guarantees a value (NOT NULL columns and their labels)"""
+    return getattr(getattr(column, 'expression', column), 'nullable', True)
+
+def keyset_order(column, tiebreak, descending):
+    """ORDER BY clauses of a keyset listing: (column, tiebreak), NULL column values last.
+
+    The NULL ordering is spelled as a leading `column IS NULL` (MySQL has no
+    NULLS LAST), which no index can serve, so it is only added for nullable
+    columns. Listings that page over a nullable value should sort on a
+    NOT NULL indexed key instead.
+    """
+    order = (column.desc(), tiebreak.desc()) if descending else (column.asc(), tiebreak.asc())
+    if _nullable(column):
+        return (column.is_(None),) + order
+    return order
+
+def keyset_after(column, tiebreak, descending, cursor_values):
+    """Filter for the rows that follow `cursor_values` in keyset_order()"""
+    value, last_id = cursor_fields(cursor_values, 2)
+    after_id = tiebreak < last_id if descending else tiebreak > last_id
+    if value is None:
+        # Already in the trailing NULLs, only the tiebreak moves on
+        return and_(column.is_(None), after_id)
+    after_value = column < value if descending else column > value
+    if _nullable(column):
+        return or_(after_value, and_(column == value, after_id), column.is_(None))
+    # One index range on the column; the tiebreak only filters its first value
+    not_before = column <= value if descending else column >= value
+    return and_(not_before, or_(after_value, after_id))
+
+def keyset_page(query, column, tiebreak, descending, cursor_values, limit, key):
+    """Fetch one page of `query` ordered by keyset_order(column, tiebreak) after the cursor.
+
+    `key(row)` must return the (column, tiebreak) values of a result row.
+    Returns (rows, last_key) where last_key is None on the final page.
+    """
+    query = query.order_by(*keyset_order(column, tiebreak, descending))
+    if cursor_values:
+        query = query.filter(keyset_after(column, tiebreak, descending, cursor_values))
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, key(rows[-1])
+    return rows, None
@@ -0,0 +1,338 @@
+"""
+Shared set-based query builders so list endpoints don't run one query per row
+"""
+from sqlalchemy import and_, func, case, select, union_all, literal, null, cast, DateTime, String
+from utils.pagination import keyset_after, keyset_order
+from utils.serializers import ASSET_ROW, ASSIGNMENT_ROW, RowSerializer, return_serializer, RAW, DATE
+
+def enriched_asset_query(db, models):
+    """Asset query joined with current holder, buyback flag and under-repair flag.
+
+    Every asset row comes back together with its enrichment in a single
+    statement, so the number of queries stays fixed whatever the row count.
+    Filters and ordering can be applied to the returned query as usual.
+    """
+    Asset = models.get('Asset')
+    Assignment = models.get('Assignment')
+    ReturnRecord = models.get('ReturnRecord')
+    RepairRequestForm = models.get('RepairRequestForm')
+
+    # First active assignment per oracle number (matches the old .first() lookup)
+    active_assignment = db.query(
+        Assignment.oracle_number.label('oracle_number'),
+        func.min(Assignment.id).label('assignment_id')
+    ).filter(Assignment.status == 'assigned').group_by(Assignment.oracle_number).subquery()
+
+    buyback = db.query(ReturnRecord.oracle_number.label('oracle_number')).filter(
+        ReturnRecord.return_type == 'buyback'
+    ).distinct().subquery()
+
+    under_repair = db.query(RepairRequestForm.oracle_number.label('oracle_number')).distinct().subquery()
+
+    # Plain column rows (ASSET_ROW layout first), no ORM object hydration
+    return db.query(
+        *ASSET_ROW.columns(Asset),
+        Assignment.employee_name.label('holder_name'),
+        Assignment.assignment_date.label('holder_assignment_date'),
+        Assignment.actual_return_date.label('holder_return_date'),
+        buyback.c.oracle_number.label('buyback_oracle_number'),
+        under_repair.c.oracle_number.label('repair_oracle_number')
+    ).outerjoin(
+        active_assignment, active_assignment.c.oracle_number == Asset.oracle_number
+    ).outerjoin(
+        Assignment, Assignment.id == active_assignment.c.assignment_id
+    ).outerjoin(
+        buyback, buyback.c.oracle_number == Asset.oracle_number
+    ).outerjoin(
+        under_repair, under_repair.c.oracle_number == Asset.oracle_number
+    )
+
+def serialize_enriched_asset(row):
+    """Serialize one enriched_asset_query row"""
+    return apply_asset_enrichment(ASSET_ROW.one(row), row)
+
+def serialize_enriched_assets(rows):
+    """Serialize a batch of enriched_asset_query rows"""
+    return [apply_asset_enrichment(asset_data, row) for asset_data, row in zip(ASSET_ROW.many(rows), rows)]
+
+def apply_asset_enrichment(asset_data, row):
+    """Copy the joined enrichment columns of an enriched_asset_query row onto asset_data"""
+    if row.holder_name is not None:
+        asset_data['current_holder'] = row.holder_name
+        asset_data['assignment_date'] = row.holder_assignment_date.isoformat() if row.holder_assignment_date else ''
+        asset_data['return_date'] = row.holder_return_date.isoformat() if row.holder_return_date else ''
+    else:
+        asset_data['current_holder'] = 'Not Assigned'
+        asset_data['assignment_date'] = ''
+        asset_data['return_date'] = ''
+
+    if row.buyback_oracle_number is not None:
+        asset_data['return_type'] = 'buyback'
+
+    if row.repair_oracle_number is not None:
+        asset_data['status'] = 'under repair'
+
+    return asset_data
+
+def enriched_assignment_query(db, models):
+    """Assignment query joined with its asset details and under-repair flag.
+
+    Replaces the asset and repair-form lookups the listings used to run for
+    every assignment, so a page costs one statement whatever its size.
+    """
+    Asset = models.get('Asset')
+    Assignment = models.get('Assignment')
+    RepairRequestForm = models.get('RepairRequestForm')
+
+    under_repair = db.query(RepairRequestForm.oracle_number.label('oracle_number')).distinct().subquery()
+
+    # oracle_number is unique on assets, so the join keeps one row per assignment
+    return db.query(
+        *ASSIGNMENT_ROW.columns(Assignment),
+        Asset.id.label('asset_id'),
+        Asset.status.label('asset_status'),
+        Asset.device_type.label('asset_device_type'),
+        Asset.model_name.label('asset_model_name'),
+        Asset.brand_name.label('asset_brand_name'),
+        Asset.serial_number.label('asset_serial_number'),
+        under_repair.c.oracle_number.label('repair_oracle_number')
+    ).outerjoin(
+        Asset, Asset.oracle_number == Assignment.oracle_number
+    ).outerjoin(
+        under_repair, under_repair.c.oracle_number == Assignment.oracle_number
+    )
+
+def serialize_enriched_assignment(row):
+    """Serialize one enriched_assignment_query row"""
+    return apply_assignment_enrichment(ASSIGNMENT_ROW.one(row), row)
+
+def serialize_enriched_assignments(rows):
+    """Serialize a batch of enriched_assignment_query rows"""
+    return [apply_assignment_enrichment(data, row) for data, row in zip(ASSIGNMENT_ROW.many(rows), rows)]
+
+def apply_assignment_enrichment(assignment_data, row):
+    """Add the status override and asset details of an enriched_assignment_query row"""
+    assignment_data['has_allocation_voucher'] = bool(row.allocation_voucher_path)
+    if row.asset_id is None:
+        assignment_data['status'] = 'assigned'
+        assignment_data['device_name'] = ''
+        assignment_data['asset_type'] = ''
+        assignment_data['model'] = ''
+        assignment_data['brand'] = ''
+        assignment_data['serial_number'] = ''
+        return assignment_data
+
+    # An open repair form overrides the asset's own status
+    assignment_data['status'] = 'under repair' if row.repair_oracle_number is not None else row.asset_status
+    assignment_data['device_name'] = row.asset_model_name or row.asset_device_type
+    assignment_data['asset_type'] = row.asset_device_type
+    assignment_data['model'] = row.asset_model_name
+    assignment_data['brand'] = row.asset_brand_name
+    assignment_data['serial_number'] = row.asset_serial_number
+    return assignment_data
+
+# Oracle numbers per lookup statement when serializing returns
+RETURN_LOOKUP_BATCH = 500
+
+def serialize_returns(db, models, return_rows):
+    """Serialize return rows with their asset and returning employee.
+
+    Two batch lookups for the whole list (assets, then the first returned
+    assignment per oracle number) instead of two queries per return. The
+    rows only need the returns columns, ORM objects are not required.
+    """
+    Asset = models.get('Asset')
+    Assignment = models.get('Assignment')
+
+    oracle_numbers = list({row.oracle_number for row in return_rows if row.oracle_number})
+    assets, assignments = {}, {}
+    for start in range(0, len(oracle_numbers), RETURN_LOOKUP_BATCH):
+        batch = oracle_numbers[start:start + RETURN_LOOKUP_BATCH]
+        assets.update((row.oracle_number, row) for row in db.query(
+            Asset.oracle_number, Asset.device_type, Asset.model_name, Asset.serial_number, Asset.status
+        ).filter(Asset.oracle_number.in_(batch)))
+        # Lowest id per oracle number, matching the old .first() lookup
+        first_returned = select(func.min(Assignment.id)).where(
+            Assignment.oracle_number.in_(batch), Assignment.status == 'returned'
+        ).group_by(Assignment.oracle_number)
+        assignments.update((row.oracle_number, row) for row in db.query(
+            Assignment.oracle_number, Assignment.employee_name, Assignment.department, Assignment.designation,
+            Assignment.assignment_date, Assignment.expected_return_date
+        ).filter(Assignment.id.in_(first_returned)))
+
+    result = []
+    for return_record in return_rows:
+        return_data = return_serializer(return_record)
+        asset = assets.get(return_record.oracle_number)
+        return_data['asset_type'] = (asset.device_type or '') if asset else ''
+        return_data['asset_model'] = (asset.model_name or '') if asset else ''
+        return_data['serial_number'] = (asset.serial_number or '') if asset else ''
+        return_data['asset_status'] = (asset.status or '') if asset else ''
+
+        assignment = assignments.get(return_record.oracle_number)
+        if assignment:
+            return_data['employee_name'] = assignment.employee_name or ''
+            return_data['employee_department'] = assignment.department or ''
+            return_data['employee_designation'] = assignment.designation or ''
+            return_data['allocation_date'] = assignment.assignment_date.isoformat() if assignment.assignment_date else ''
+            return_data['expected_return_date'] = assignment.expected_return_date.isoformat() if assignment.expected_return_date else ''
+        else:
+            return_data['employee_name'] = ''
+            return_data['employee_department'] = ''
+            return_data['employee_designation'] = ''
+            return_data['allocation_date'] = ''
+            return_data['expected_return_date'] = ''
+        result.append(return_data)
+    return result
+
+def iter_serialized_returns(db, models, return_rows, batch_size=RETURN_LOOKUP_BATCH):
+    """serialize_returns over a lazy row iterable, one lookup batch at a time"""
+    batch = []
+    for row in return_rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield from serialize_returns(db, models, batch)
+            batch = []
+    if batch:
+        yield from serialize_returns(db, models, batch)
+
+# Listing fields of both repair tables; in-progress rows have no completion
+# columns. Dates stay None rather than '' as the repairs API always returned
+REPAIR_ROW = RowSerializer([
+    ('completion_date', 'completion_date', DATE),
+    ('repair_cost', 'repair_cost', RAW),
+    ('return_date', 'return_date', DATE),
+    ('status', 'status', RAW),
+    ('oracle_number', 'oracle_number', RAW),
+    ('asset_type', 'asset_type', RAW),
+    ('asset_model', 'asset_model', RAW),
+    ('employee_name', 'employee_name', RAW),
+    ('designation', 'designation', RAW),
+    ('department', 'department', RAW),
+    ('repair_description', 'repair_description', RAW),
+    ('start_date', 'start_date', DATE),
+    ('vendor_name', 'vendor_name', RAW),
+    ('is_fixed', 'is_fixed', RAW)
+], blank_date=None)
+
+# (status, model name, parity of its sort_key)
+REPAIR_SOURCES = (('in-progress', 'RepairRequestForm', 0), ('completed', 'CompletionRepair', 1))
+
+def repair_listing_query(db, models, status=None, vendor=None, department=None, start=None, end=None,
+                         cursor=None, limit=None, descending=True):
+    """Open and completed repairs as one UNION ALL query, ordered by (start_date, sort_key).
+
+    sort_key is id * 2 (+1 for completed repairs), unique across both tables.
+    With a limit each branch is filtered, ordered and cut to limit + 1 rows
+    on its own by walking its (start_date, id) index from the cursor, so a
+    page reads a bounded number of rows however many repairs have been
+    completed; start_date is NOT NULL for that. `cursor` is the
+    (start_date, sort_key) of the last row already returned.
+    Returns (query, start_date column, sort_key column) of the merged rows.
+    """
+    branches = []
+    for kind, model_name, parity in REPAIR_SOURCES:
+        if status and status != kind:
+            continue
+        model = models.get(model_name)
+        completed = kind == 'completed'
+        sort_key = model.id * 2 + parity
+        branch = select(
+            (model.completion_date if completed else cast(null(), DateTime)).label('completion_date'),
+            model.cost.label('repair_cost'),
+            (model.return_date if completed else cast(null(), DateTime)).label('return_date'),
+            literal(kind).label('status'),
+            model.oracle_number.label('oracle_number'),
+            model.asset_type.label('asset_type'),
+            model.asset_model.label('asset_model'),
+            model.employee_name.label('employee_name'),
+            model.designation.label('designation'),
+            model.department.label('department'),
+            model.repair_description.label('repair_description'),
+            model.start_date.label('start_date'),
+            model.vendor_name.label('vendor_name'),
+            (model.is_fixed if completed else cast(null(), String)).label('is_fixed'),
+            sort_key.label('sort_key')
+        )
+        if vendor:
+            branch = branch.where(model.vendor_name == vendor)
+        if department:
+            branch = branch.where(model.department == department)
+        if start:
+            branch = branch.where(model.start_date >= start)
+        if end:
+            branch = branch.where(model.start_date <= end)
+        if limit:
+            if cursor:
+                branch = branch.where(keyset_after(model.start_date, sort_key, descending, cursor))
+            # sort_key follows model.id within a branch, so the order is the index's
+            branch = branch.order_by(*keyset_order(model.start_date, model.id, descending))
+            # A derived table, so the per-branch ORDER BY/LIMIT is valid in the union
+            branch = branch.limit(limit + 1).subquery()
+            branch = select(*branch.c)
+        branches.append(branch)
+
+    merged = union_all(*branches).subquery('repairs')
+    return db.query(merged), merged.c.start_date, merged.c.sort_key
+
+def serialize_repair(row):
+    return serialize_repairs([row])[0]
+
+def serialize_repairs(rows):
+    """Listing dicts for repair_listing_query rows"""
+    items = REPAIR_ROW.many(rows)
+    for item in items:
+        if item['status'] == 'in-progress':
+            item['is_fixed'] = False
+    return items
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+def department_breakdown(db, models, now):
+    """Per-department held assets, their value, overdue items and repair spend.
+
+    Two grouped statements (active assignments joined to assets, and repair
+    costs from both repair tables) merged by department name.
+    """
+    Asset = models.get('Asset')
+    Assignment = models.get('Assignment')
+    RepairRequestForm = models.get('RepairRequestForm')
+    CompletionRepair = models.get('CompletionRepair')
+
+    held = db.query(
+        Assignment.department,
+        func.count(Assignment.id),
+        func.coalesce(func.sum(Asset.unit_price), 0),
+        _count_if(and_(Assignment.expected_return_date.isnot(None), Assignment.expected_return_date < now))
+    ).outerjoin(
+        Asset, Asset.oracle_number == Assignment.oracle_number
+    ).filter(Assignment.status == 'assigned').group_by(Assignment.department).all()
+
+    repair_costs = union_all(
+        select(RepairRequestForm.department.label('department'), RepairRequestForm.cost.label('cost')),
+        select(CompletionRepair.department.label('department'), CompletionRepair.cost.label('cost'))
+    ).subquery()
+    spend = db.query(
+        repair_costs.c.department,
+        func.coalesce(func.sum(repair_costs.c.cost), 0)
+    ).group_by(repair_costs.c.department).all()
+
+    departments = {}
+
+    def entry(name):
+        name = name or 'Unspecified'
+        if name not in departments:
+            departments[name] = {'department': name, 'held_assets': 0, 'asset_value': 0.0,
+                                 'overdue': 0, 'repair_spend': 0.0}
+        return departments[name]
+
+    for department, held_assets, asset_value, overdue in held:
+        item = entry(department)
+        item['held_assets'] += int(held_assets)
+        item['asset_value'] += float(asset_value)
+        item['overdue'] += int(overdue)
+    for department, repair_spend in spend:
+        entry(department)['repair_spend'] += float(repair_spend)
+
+    return sorted(departments.values(), key=lambda item: (-item['held_assets'], item['department']))
@@ -0,0 +1,148 @@
+"""
+Repair analytics over completed repairs: time to repair, spend per vendor
+and failure rate per device model.
+
+Everything is aggregated in the database. Durations are computed per row
+in SQL (seconds_between), percentiles come from a CUME_DIST window and the
+per-vendor and per-model figures are GROUP BY queries, so five statements
+return a few dozen rows whatever the size of completion_repair. The route
+caches the result until the next completed repair.
+"""
+from sqlalchemy import and_, case, func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import Float
+
+from models import Asset, CompletionRepair
+
+PERCENTILES = (50, 75, 90, 95)
+
+class seconds_between(FunctionElement):
+    """Seconds from the first datetime expression to the second"""
+    type = Float()
+    name = 'seconds_between'
+    inherit_cache = True
+
+@compiles(seconds_between)
+def _seconds_between(element, compiler, **kw):
+    start, end = (compiler.process(clause, **kw) for clause in element.clauses)
+    return f"EXTRACT(EPOCH FROM ({end} - {start}))"
+
+@compiles(seconds_between, 'mysql')
+def _seconds_between_mysql(element, compiler, **kw):
+    start, end = (compiler.process(clause, **kw) for clause in element.clauses)
+    return f"TIMESTAMPDIFF(SECOND, {start}, {end})"
+
+@compiles(seconds_between, 'sqlite')
+def _seconds_between_sqlite(element, compiler, **kw):
+    start, end = (compiler.process(clause, **kw) for clause in element.clauses)
+    return f"((julianday({end}) - julianday({start})) * 86400.0)"
+
+def _hours(seconds):
+    return round(float(seconds) / 3600, 2) if seconds is not None else None
+
+def _rate(part, whole):
+    return round(part / whole, 4) if whole else 0.0
+
+def repair_analytics(db, start=None, end=None):
+    """Repair KPIs for repairs completed between start and end (inclusive).
+
+    mttr_hours and the duration percentiles (nearest rank) only count
+    repairs with both dates; a repair counts as failed unless is_fixed is
+    'fixed'. Models are matched to the assets table by device type and
+    model name to give repairs per asset.
+    """
+    repair = CompletionRepair
+    duration = seconds_between(repair.start_date, repair.completion_date)
+    timed = and_(repair.start_date.isnot(None), repair.completion_date.isnot(None),
+                 repair.completion_date >= repair.start_date)
+    timed_duration = case((timed, duration))
+    failed = case((repair.is_fixed == 'fixed', 0), else_=1)
+
+    in_range = []
+    if start is not None:
+        in_range.append(repair.completion_date >= start)
+    if end is not None:
+        in_range.append(repair.completion_date <= end)
+
+    totals = db.query(
+        func.count(repair.id),
+        func.count(timed_duration),
+        func.avg(timed_duration),
+        func.coalesce(func.sum(repair.cost), 0),
+        func.coalesce(func.sum(failed), 0)
+    ).filter(*in_range).one()
+    repairs, timed_repairs, mean_seconds, spend, failures = totals
+
+    # Smallest duration whose cumulative share reaches each percentile
+    ranked = db.query(
+        duration.label('seconds'),
+        func.cume_dist().over(order_by=duration).label('share')
+    ).filter(timed, *in_range).subquery()
+    percentile_row = db.query(*[
+        func.min(case((ranked.c.share >= p / 100, ranked.c.seconds))) for p in PERCENTILES
+    ]).one()
+
+    vendors = db.query(
+        repair.vendor_name,
+        func.count(repair.id),
+        func.coalesce(func.sum(repair.cost), 0),
+        func.avg(repair.cost),
+        func.avg(timed_duration),
+        func.coalesce(func.sum(failed), 0)
+    ).filter(*in_range).group_by(repair.vendor_name).all()
+
+    models = db.query(
+        repair.asset_type,
+        repair.asset_model,
+        func.count(repair.id),
+        func.coalesce(func.sum(failed), 0),
+        func.avg(timed_duration)
+    ).filter(*in_range).group_by(repair.asset_type, repair.asset_model).all()
+
+    fleet = {}
+    if models:
+        fleet = {(device_type, model_name): count for device_type, model_name, count in db.query(
+            Asset.device_type, Asset.model_name, func.count(Asset.id)
+        ).filter(Asset.model_name.in_({row[1] for row in models if row[1]})).group_by(
+            Asset.device_type, Asset.model_name
+        )}
+
+    vendor_list = sorted(({
+        'vendor_name': vendor_name or 'Unspecified',
+        'repairs': int(count),
+        'spend': round(float(vendor_spend), 2),
+        'average_cost': round(float(average_cost), 2) if average_cost is not None else None,
+        'mttr_hours': _hours(vendor_seconds),
+        'failure_rate': _rate(int(vendor_failures), int(count))
+    } for vendor_name, count, vendor_spend, average_cost, vendor_seconds, vendor_failures in vendors),
+        key=lambda item: (-item['spend'], item['vendor_name']))
+
+    model_list = []
+    for asset_type, asset_model, count, model_failures, model_seconds in models:
+        assets = fleet.get((asset_type, asset_model), 0)
+        model_list.append({
+            'asset_type': asset_type or '',
+            'asset_model': asset_model or 'Unspecified',
+            'repairs': int(count),
+            'failures': int(model_failures),
+            'failure_rate': _rate(int(model_failures), int(count)),
+            'mttr_hours': _hours(model_seconds),
+            'assets': assets,
+            'repairs_per_asset': _rate(int(count), assets)
+        })
+    model_list.sort(key=lambda item: (-item['failure_rate'], -item['repairs'], item['asset_model']))
+
+    return {
+        'start': start.isoformat() if start else None,
+        'end': end.isoformat() if end else None,
+        'repairs': int(repairs),
+        'timed_repairs': int(timed_repairs),
+        'total_spend': round(float(spend), 2),
+        'failures': int(failures),
+        'failure_rate': _rate(int(failures), int(repairs)),
+        'mttr_hours': _hours(mean_seconds),
+        'duration_percentiles_hours': {f'p{p}': _hours(value) for p, value in zip(PERCENTILES, percentile_row)},
+        'vendors': vendor_list,
+        'models': model_list
+    }
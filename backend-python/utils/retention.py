@@ -0,0 +1,50 @@
+"""
+Activity log retention: rows older than the horizon move to activity_logs_archive.
+
+Rows are moved oldest first in small batches, each in its own transaction,
+so the hot table stays small without long locks. Archived rows get ids of
+their own and keep the old one in source_id, so ids reused by the hot table
+(AUTO_INCREMENT restarting after a restore or truncate) can't collide.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert
+
+from utils.cache import touch_tables
+
+ARCHIVE_BATCH_SIZE = 1000
+
+def archive_activity_logs(session_factory, ActivityLog, ActivityLogArchive, retention_days,
+                          batch_size=ARCHIVE_BATCH_SIZE):
+    """Move activity logs older than `retention_days` to the archive; returns rows moved"""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    columns = [column.name for column in ActivityLog.__table__.columns]
+    moved = 0
+    while True:
+        db = session_factory()
+        try:
+            rows = db.query(ActivityLog.__table__).filter(
+                ActivityLog.timestamp < cutoff
+            ).order_by(ActivityLog.timestamp, ActivityLog.id).limit(batch_size).all()
+            if not rows:
+                break
+            now = datetime.utcnow()
+            archived = []
+            for row in rows:
+                values = {column: getattr(row, column) for column in columns}
+                values['source_id'] = values.pop('id')
+                values['archive_month'] = row.timestamp.strftime('%Y-%m')
+                values['archived_at'] = now
+                archived.append(values)
+            db.execute(insert(ActivityLogArchive), archived)
+            db.execute(delete(ActivityLog).where(ActivityLog.id.in_([row.id for row in rows])))
+            touch_tables(db, 'activity_logs', 'activity_logs_archive')
+            db.commit()
+            moved += len(rows)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        if len(rows) < batch_size:
+            break
+    return moved
@@ -0,0 +1,197 @@
+"""
+Pre-aggregated time-series rollups for inventory analytics.
+
+Each metric counts (and optionally sums an amount over) the rows of one
+table per day, week and month bucket, split by a dimension column. Writes
+adjust the affected buckets in their own transaction through an on_change
+hook, so a range query reads a few hundred bucket rows however large the
+raw tables are. Quarters and years are folded from the month buckets.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from models import AnalyticsRollup, Assignment, Auction, CompletionRepair, ReturnRecord
+from utils.cache import touch_tables
+from utils.counters import acquire_lease, release_lease, renew_lease
+from utils.database import begin_snapshot, upsert_increment
+from utils.events import on_change, track_old_values
+
+GRANULARITIES = ('day', 'week', 'month')
+READ_GRANULARITIES = GRANULARITIES + ('quarter', 'year')
+BACKFILL_BATCH_SIZE = 5000
+BACKFILL_LEASE = 'lease:rollup_backfill'
+# Held for the whole run and renewed per metric; a crashed run frees it after this
+BACKFILL_LEASE_SECONDS = 3600
+
+# metric -> (model, date column, dimension column, amount column or None)
+METRICS = {
+    'assignments': (Assignment, 'assignment_date', 'department', None),
+    'repairs': (CompletionRepair, 'completion_date', 'vendor_name', 'cost'),
+    'returns': (ReturnRecord, 'return_date', 'return_type', None),
+    'auctions': (Auction, 'auction_date', 'asset_type', 'price')
+}
+_TABLE_METRICS = {model.__tablename__: metric for metric, (model, _, _, _) in METRICS.items()}
+
+def bucket_start(value, granularity):
+    """Start of the day/week (Monday)/month/quarter/year bucket holding `value`"""
+    day = datetime(value.year, value.month, value.day)
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'quarter':
+        return datetime(value.year, value.month - (value.month - 1) % 3, 1)
+    return datetime(value.year, 1, 1)
+
+def _contributions(metric, values):
+    """Bucket keys and amount a row with these column values adds to `metric`"""
+    _, date_column, dimension_column, amount_column = METRICS[metric]
+    when = values.get(date_column)
+    if when is None:
+        return [], 0.0
+    dimension = (values.get(dimension_column) or '')[:100]
+    amount = float(values.get(amount_column) or 0) if amount_column else 0.0
+    keys = [(metric, granularity, bucket_start(when, granularity), dimension) for granularity in GRANULARITIES]
+    return keys, amount
+
+def rollup_deltas(changes):
+    """{bucket key: [count delta, total delta]} for a list of Change tuples"""
+    deltas = defaultdict(lambda: [0, 0.0])
+    for change in changes:
+        metric = _TABLE_METRICS[change.table]
+        if change.action != 'delete':
+            keys, amount = _contributions(metric, change.values)
+            for key in keys:
+                deltas[key][0] += 1
+                deltas[key][1] += amount
+        if change.action != 'insert':
+            old_values = change.values if change.action == 'delete' else {**change.values, **change.old}
+            keys, amount = _contributions(metric, old_values)
+            for key in keys:
+                deltas[key][0] -= 1
+                deltas[key][1] -= amount
+    return {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+
+def apply_rollup_deltas(connection, deltas):
+    """Add `deltas` to the rollup rows, creating missing buckets"""
+    # Sorted so concurrent transactions lock bucket rows in the same order
+    upsert_increment(connection, AnalyticsRollup.__table__, [{
+        'metric': metric, 'granularity': granularity, 'bucket_start': start,
+        'dimension': dimension, 'count': count, 'total': total
+    } for (metric, granularity, start, dimension), (count, total) in sorted(deltas.items())], ('count', 'total'))
+
+def _track_changes(session, changes):
+    deltas = rollup_deltas(changes)
+    if deltas:
+        apply_rollup_deltas(session.connection(), deltas)
+
+on_change(_track_changes, tables=_TABLE_METRICS.keys())
+
+def init_rollups():
+    """Make sure updates report the old date/dimension/amount of a row"""
+    for model, date_column, dimension_column, amount_column in METRICS.values():
+        columns = [date_column, dimension_column] + ([amount_column] if amount_column else [])
+        track_old_values(*(getattr(model, column) for column in columns))
+
+def _recount(db, metric, batch_size):
+    """{bucket key: [count, total]} of `metric` from the raw rows, read in id batches"""
+    model, date_column, dimension_column, amount_column = METRICS[metric]
+    columns = [model.id, getattr(model, date_column), getattr(model, dimension_column)]
+    if amount_column:
+        columns.append(getattr(model, amount_column))
+    names = ['id', date_column, dimension_column] + ([amount_column] if amount_column else [])
+
+    counts = defaultdict(lambda: [0, 0.0])
+    rows_read = 0
+    last_id = 0
+    while True:
+        rows = db.query(*columns).filter(model.id > last_id).order_by(model.id).limit(batch_size).all()
+        if not rows:
+            return counts, rows_read
+        for row in rows:
+            keys, amount = _contributions(metric, dict(zip(names, row)))
+            for key in keys:
+                counts[key][0] += 1
+                counts[key][1] += amount
+        last_id = rows[-1][0]
+        rows_read += len(rows)
+
+def backfill_rollups(session_factory, metrics=None, batch_size=BACKFILL_BATCH_SIZE):
+    """Bring the buckets of `metrics` (default all) in line with the raw tables.
+
+    The raw rows and the metric's stored buckets are read in one snapshot
+    transaction, without locks, and each bucket is then corrected by the
+    difference as an increment. Writes committed after the snapshot already
+    moved the buckets through the write hook and are kept, whatever rows
+    they insert, update or delete. Only one backfill runs at a time across
+    processes (a lease row in counters); returns None if another holds it,
+    else {metric: rows aggregated}.
+    """
+    token = acquire_lease(session_factory, BACKFILL_LEASE, BACKFILL_LEASE_SECONDS)
+    if token is None:
+        return None
+    processed = {}
+    try:
+        for metric in metrics or METRICS:
+            db = session_factory()
+            try:
+                begin_snapshot(db)
+                stored = {(metric, granularity, start, dimension): (count or 0, total or 0.0)
+                          for granularity, start, dimension, count, total in db.query(
+                              AnalyticsRollup.granularity, AnalyticsRollup.bucket_start,
+                              AnalyticsRollup.dimension, AnalyticsRollup.count, AnalyticsRollup.total
+                          ).filter(AnalyticsRollup.metric == metric)}
+                counts, processed[metric] = _recount(db, metric, batch_size)
+                db.rollback()
+
+                deltas = {}
+                for key in set(stored) | set(counts):
+                    count, total = counts.get(key, (0, 0.0))
+                    stored_count, stored_total = stored.get(key, (0, 0.0))
+                    if count != stored_count or abs(total - stored_total) > 1e-6:
+                        deltas[key] = [count - stored_count, total - stored_total]
+                token = renew_lease(db.connection(), BACKFILL_LEASE, token)
+                if token is None:
+                    raise RuntimeError('Rollup backfill lease expired before the buckets were corrected')
+                apply_rollup_deltas(db.connection(), deltas)
+                touch_tables(db, 'analytics_rollups')
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+    finally:
+        if token is not None:
+            release_lease(session_factory, BACKFILL_LEASE, token)
+    return processed
+
+def query_rollups(db, metric, granularity, start=None, end=None, by_dimension=False):
+    """Bucketed series of `metric` between start and end (inclusive)"""
+    # Quarters and years are folded from month buckets
+    stored = granularity if granularity in GRANULARITIES else 'month'
+    query = db.query(
+        AnalyticsRollup.bucket_start, AnalyticsRollup.dimension, AnalyticsRollup.count, AnalyticsRollup.total
+    ).filter(AnalyticsRollup.metric == metric, AnalyticsRollup.granularity == stored)
+    if start is not None:
+        query = query.filter(AnalyticsRollup.bucket_start >= bucket_start(start, stored))
+    if end is not None:
+        query = query.filter(AnalyticsRollup.bucket_start <= end)
+
+    series = defaultdict(lambda: [0, 0.0])
+    for start_at, dimension, count, total in query:
+        key = (bucket_start(start_at, granularity), dimension if by_dimension else None)
+        series[key][0] += count or 0
+        series[key][1] += total or 0.0
+
+    points = []
+    for (start_at, dimension), (count, total) in sorted(series.items(), key=lambda item: (item[0][0], item[0][1] or '')):
+        if not count and not total:
+            continue
+        point = {'bucket': start_at.date().isoformat(), 'count': count, 'total': round(total, 2)}
+        if by_dimension:
+            point['dimension'] = dimension
+        points.append(point)
+    return points
@@ -0,0 +1,38 @@
+"""
+Periodic maintenance jobs on daemon threads.
+
+Good enough for a single-process deployment; every job must be safe to run
+concurrently from several processes since each one schedules its own copy.
+"""
+import threading
+import time
+from datetime import datetime
+
+_jobs = {}
+
+def run_periodically(name, interval, job):
+    """Call job() every `interval` seconds until the process exits; <= 0 disables it"""
+    if interval <= 0 or name in _jobs:
+        return
+    status = {'interval': interval, 'runs': 0, 'last_run': None, 'last_duration_ms': None, 'last_error': None}
+    _jobs[name] = status
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            started = time.perf_counter()
+            try:
+                job()
+                status['last_error'] = None
+            except Exception as e:
+                status['last_error'] = str(e)
+                print(f"Error in scheduled job {name}: {e}")
+            status['runs'] += 1
+            status['last_run'] = datetime.utcnow().isoformat()
+            status['last_duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+    threading.Thread(target=loop, name=f'job-{name}', daemon=True).start()
+
+def job_status():
+    """Run counts, timings and last error of every scheduled job"""
+    return {name: dict(status) for name, status in _jobs.items()}
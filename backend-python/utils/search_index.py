@@ -0,0 +1,198 @@
+"""
+In-process trigram index behind the asset `search` parameter.
+
+Distinct field values are indexed by their trigrams, and each value maps to
+the asset ids carrying it, so low-cardinality fields like device_type cost
+one entry no matter how many assets share them. The index is warmed at
+startup and kept current through commit hooks, which only see this
+process's writes. It also remembers the assets table generation it
+reflects (utils.cache): each synced commit moves it one step, like the
+generation bump that commit makes, so a database generation further ahead
+means another process wrote assets and refresh() rebuilds the index.
+Callers fall back to SQL matching while it isn't ready.
+"""
+import threading
+from collections import defaultdict
+
+from utils.cache import table_generations
+from utils.events import on_commit
+
+SEARCH_FIELDS = ('oracle_number', 'serial_number', 'model_name', 'brand_name', 'device_type')
+
+# Identifier fields rank above descriptive ones
+FIELD_WEIGHTS = {
+    'oracle_number': 5,
+    'serial_number': 5,
+    'model_name': 3,
+    'brand_name': 2,
+    'device_type': 1
+}
+
+# Score by how the term matched a value
+EXACT, PREFIX, WORD_PREFIX, PARTIAL = 8, 4, 2, 1
+
+def _normalize(value):
+    return (value or '').strip().lower()
+
+def _trigrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+def _match_kind(value, token):
+    if value == token:
+        return EXACT
+    if value.startswith(token):
+        return PREFIX
+    if f' {token}' in value or f'-{token}' in value:
+        return WORD_PREFIX
+    return PARTIAL
+
+class AssetSearchIndex:
+    """Trigram index over the searchable asset fields"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = {}                       # asset id -> normalized field values
+        self._postings = defaultdict(dict)    # value -> {field: set(asset ids)}
+        self._grams = defaultdict(set)        # trigram -> values containing it
+        self.generation = None                # assets table generation reflected
+        self.ready = False
+
+    def warm(self, session_factory, Asset):
+        """Build the index from the assets table"""
+        db = session_factory()
+        try:
+            columns = [Asset.id] + [getattr(Asset, field) for field in SEARCH_FIELDS]
+            with self._lock:
+                # Read first: a write landing meanwhile leaves the index a
+                # generation behind, so the next refresh() picks it up
+                generation, = table_generations(db, ['assets'])
+                self._docs.clear()
+                self._postings.clear()
+                self._grams.clear()
+                for row in db.query(*columns).yield_per(5000):
+                    self._add(row[0], row[1:])
+                self.generation = generation
+                self.ready = True
+        finally:
+            db.close()
+
+    def refresh(self, session_factory, Asset, generation):
+        """Rebuild the index if the assets table is past the generation it reflects"""
+        with self._lock:
+            if self.generation is None or generation <= self.generation:
+                return
+            self.warm(session_factory, Asset)
+
+    def _add(self, asset_id, raw_values):
+        values = tuple(_normalize(v) for v in raw_values)
+        self._docs[asset_id] = values
+        for field, value in zip(SEARCH_FIELDS, values):
+            if not value:
+                continue
+            if value not in self._postings:
+                for gram in _trigrams(value):
+                    self._grams[gram].add(value)
+            self._postings[value].setdefault(field, set()).add(asset_id)
+
+    def _remove(self, asset_id):
+        values = self._docs.pop(asset_id, None)
+        if values is None:
+            return
+        for field, value in zip(SEARCH_FIELDS, values):
+            fields = self._postings.get(value)
+            if not fields or field not in fields:
+                continue
+            fields[field].discard(asset_id)
+            if not fields[field]:
+                del fields[field]
+            if not fields:
+                del self._postings[value]
+                for gram in _trigrams(value):
+                    self._grams[gram].discard(value)
+                    if not self._grams[gram]:
+                        del self._grams[gram]
+
+    def upsert(self, values):
+        """Index (or re-index) one asset from a dict of its column values"""
+        with self._lock:
+            self._remove(values['id'])
+            self._add(values['id'], [values.get(field) for field in SEARCH_FIELDS])
+
+    def remove(self, asset_id):
+        with self._lock:
+            self._remove(asset_id)
+
+    def apply(self, changes):
+        """Apply the asset changes of one commit"""
+        with self._lock:
+            for change in changes:
+                if change.action == 'delete':
+                    self._remove(change.values['id'])
+                else:
+                    self.upsert(change.values)
+            # In step with the generation bump the commit makes
+            self.generation += 1
+
+    def _matching_values(self, token):
+        if len(token) < 3:
+            # Too short for trigrams; distinct values are few enough to scan
+            return [value for value in self._postings if token in value]
+        gram_sets = sorted((self._grams.get(gram, set()) for gram in _trigrams(token)), key=len)
+        candidates = set.intersection(*gram_sets) if gram_sets[0] else set()
+        return [value for value in candidates if token in value]
+
+    def _candidate_scores(self, token, candidates):
+        # Short follow-up words are cheaper to check against the few
+        # candidates left than against every distinct value
+        scores = {}
+        for asset_id in candidates:
+            best = 0
+            for field, value in zip(SEARCH_FIELDS, self._docs[asset_id]):
+                if token in value:
+                    best = max(best, _match_kind(value, token) * FIELD_WEIGHTS[field])
+            if best:
+                scores[asset_id] = best
+        return scores
+
+    def _token_scores(self, token):
+        scores = {}
+        for value in self._matching_values(token):
+            kind = _match_kind(value, token)
+            for field, asset_ids in self._postings[value].items():
+                score = kind * FIELD_WEIGHTS[field]
+                for asset_id in asset_ids:
+                    if scores.get(asset_id, 0) < score:
+                        scores[asset_id] = score
+        return scores
+
+    def search(self, term):
+        """Return asset ids matching every word of `term`, best match first"""
+        # Longest words first, they narrow the candidates fastest
+        tokens = sorted(set(_normalize(term).split()), key=len, reverse=True)
+        if not tokens:
+            return []
+        with self._lock:
+            totals = None
+            for token in tokens:
+                if totals is not None and len(token) < 3 and \
+                        len(totals) * len(SEARCH_FIELDS) < len(self._postings):
+                    scores = self._candidate_scores(token, totals)
+                else:
+                    scores = self._token_scores(token)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {asset_id: totals[asset_id] + score
+                              for asset_id, score in scores.items() if asset_id in totals}
+                if not totals:
+                    return []
+        return sorted(totals, key=lambda asset_id: (-totals[asset_id], asset_id))
+
+asset_search_index = AssetSearchIndex()
+
+def _sync_search_index(changes):
+    if not asset_search_index.ready:
+        return
+    asset_search_index.apply(changes)
+
+on_commit(_sync_search_index, tables=['assets'])
@@ -1,6 +1,13 @@
 """
 Common serializer functions to eliminate duplicate code
 """
+import json
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # optional fast encoder
+    orjson = None
 
 def activity_serializer(activity):
     """Standard activity serializer used across multiple routes"""
@@ -36,7 +43,8 @@ def asset_serializer(asset):
         'assignment_date': asset.assignment_date.isoformat() if asset.assignment_date else '',
         'expected_return_date': asset.expected_return_date.isoformat() if asset.expected_return_date else '',
         'created_at': asset.created_at.isoformat() if asset.created_at else '',
-        'updated_at': asset.updated_at.isoformat() if asset.updated_at else ''
+        'updated_at': asset.updated_at.isoformat() if asset.updated_at else '',
+        'version': asset.version
     }
 
 def assignment_serializer(assignment, asset_status='assigned'):
@@ -74,4 +82,116 @@ def return_serializer(return_record):
         'notes': return_record.notes or '',
         'timestamp': return_record.timestamp.isoformat() if return_record.timestamp else '',
         'voucher_filename': getattr(return_record, 'voucher_filename', '') or ''
-    }
\ No newline at end of file
+    }
+
+# --- Column-projection serializers ---
+# These work on plain row tuples from db.query(*columns), skipping ORM
+# object hydration and identity-map bookkeeping for read-only listings.
+
+RAW, TEXT, DATE = 'raw', 'text', 'date'
+
+class RowSerializer:
+    """Compiled serializer for a fixed list of (output key, column name, kind).
+
+    RAW values pass through, TEXT turns None into '', DATE becomes an ISO
+    string (or `blank_date`). Rows only need to start with the projected
+    columns, so extra joined columns can follow them.
+    """
+
+    def __init__(self, fields, blank_date=''):
+        self.keys = tuple(key for key, _, _ in fields)
+        self.column_names = tuple(column for _, column, _ in fields)
+        self.text_positions = tuple(i for i, (_, _, kind) in enumerate(fields) if kind == TEXT)
+        self.date_positions = tuple(i for i, (_, _, kind) in enumerate(fields) if kind == DATE)
+        self.blank_date = blank_date
+        self.width = len(fields)
+
+    def columns(self, model):
+        """Column objects to pass to db.query(...)"""
+        return [getattr(model, name) for name in self.column_names]
+
+    def one(self, row):
+        values = list(row[:self.width])
+        for i in self.text_positions:
+            if values[i] is None:
+                values[i] = ''
+        blank = self.blank_date
+        for i in self.date_positions:
+            value = values[i]
+            values[i] = value.isoformat() if value else blank
+        return dict(zip(self.keys, values))
+
+    def many(self, rows):
+        """Serialize a batch, converting each date column in one pass"""
+        if not rows:
+            return []
+        columns = [list(column) for column in zip(*(row[:self.width] for row in rows))]
+        for i in self.text_positions:
+            columns[i] = ['' if value is None else value for value in columns[i]]
+        blank = self.blank_date
+        for i in self.date_positions:
+            columns[i] = [value.isoformat() if value else blank for value in columns[i]]
+        keys = self.keys
+        return [dict(zip(keys, values)) for values in zip(*columns)]
+
+ASSET_ROW = RowSerializer([
+    ('id', 'id', RAW),
+    ('oracle_number', 'oracle_number', RAW),
+    ('device_type', 'device_type', RAW),
+    ('brand_name', 'brand_name', RAW),
+    ('model_name', 'model_name', RAW),
+    ('serial_number', 'serial_number', RAW),
+    ('unit_price', 'unit_price', RAW),
+    ('purchase_date', 'purchase_date', DATE),
+    ('warranty_expiry', 'warranty_expiry', DATE),
+    ('vendor_name', 'vendor_name', RAW),
+    ('tender_no', 'tender_no', RAW),
+    ('notes', 'notes', RAW),
+    ('status', 'status', RAW),
+    ('assigned_to', 'assigned_to', RAW),
+    ('assignment_date', 'assignment_date', DATE),
+    ('expected_return_date', 'expected_return_date', DATE),
+    ('created_at', 'created_at', DATE),
+    ('updated_at', 'updated_at', DATE),
+    ('version', 'version', RAW)
+])
+
+# Assignment columns; status and the asset details are filled in by the
+# joined listing query (utils.queries.enriched_assignment_query)
+ASSIGNMENT_ROW = RowSerializer([
+    ('id', 'id', RAW),
+    ('oracle_number', 'oracle_number', TEXT),
+    ('employee_name', 'employee_name', TEXT),
+    ('designation', 'designation', TEXT),
+    ('department', 'department', TEXT),
+    ('assignment_date', 'assignment_date', DATE),
+    ('expected_return_date', 'expected_return_date', DATE),
+    ('actual_return_date', 'actual_return_date', DATE),
+    ('notes', 'notes', TEXT),
+    ('allocation_voucher_path', 'allocation_voucher_path', TEXT),
+    ('timestamp', 'timestamp', DATE)
+])
+
+ACTIVITY_ROW = RowSerializer([
+    ('id', 'id', RAW),
+    ('activityType', 'activity_type', RAW),
+    ('assetType', 'asset_type', RAW),
+    ('brandName', 'brand_name', RAW),
+    ('assetName', 'asset_name', RAW),
+    ('employeeName', 'employee_name', RAW),
+    ('departmentName', 'department_name', RAW),
+    ('timestamp', 'timestamp', DATE),
+    ('remarks', 'remarks', RAW)
+])
+
+def dumps(payload):
+    """Encode payload as a JSON string, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(payload).decode('utf-8')
+    return json.dumps(payload, default=str)
+
+def json_response(payload, status=200):
+    """Like jsonify, but encoded with the fast encoder when available"""
+    if orjson is not None:
+        return Response(orjson.dumps(payload), status=status, mimetype='application/json')
+    return Response(json.dumps(payload, default=str), status=status, mimetype='application/json')
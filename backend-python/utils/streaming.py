@@ -0,0 +1,70 @@
+"""
+Opt-in streaming responses for the large list endpoints.
+
+`?stream=1` or `Accept: application/x-ndjson` streams one JSON object per
+line; `?stream=json` streams a regular JSON array. Rows are written as
+they are serialized and fetched by keyset_chunks(): one bounded SELECT per
+STREAM_CHUNK_SIZE rows, resuming after the last row sent, so memory stays
+flat however many rows match. A single query with yield_per would not do
+that here, as mysql-connector buffers the whole result set client-side.
+The chunks share the response's session transaction, so on InnoDB
+(REPEATABLE READ) they read one snapshot.
+"""
+from flask import Response, request, stream_with_context
+from utils.database import close_db_session
+from utils.serializers import dumps
+
+STREAM_CHUNK_SIZE = 500
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def wants_stream():
+    """True when the client asked for a streamed response"""
+    if request.args.get('stream') in ('1', 'true', 'json'):
+        return True
+    return NDJSON_MIMETYPE in request.headers.get('Accept', '')
+
+def keyset_chunks(fetch_page, chunk_size=None):
+    """Every row of a keyset-paged listing, fetched `chunk_size` (STREAM_CHUNK_SIZE) rows per statement.
+
+    `fetch_page(cursor_values, limit)` returns (rows, last_key) like keyset_page().
+    Each chunk only stays cheap while the page seeks an index in sort order.
+    """
+    chunk_size = chunk_size or STREAM_CHUNK_SIZE
+    cursor_values = None
+    while True:
+        rows, cursor_values = fetch_page(cursor_values, chunk_size)
+        yield from rows
+        if cursor_values is None:
+            return
+
+def stream_rows(rows, serialize, sessions):
+    """Stream `rows` through `serialize` and close `sessions` afterwards.
+
+    `rows` should be a lazy iterable such as keyset_chunks(...).
+    The response owns the sessions from here on, so the caller must not
+    close them. `serialize` may return None to skip a row.
+    """
+    as_array = request.args.get('stream') == 'json'
+
+    def generate():
+        try:
+            first = True
+            if as_array:
+                yield '['
+            for row in rows:
+                item = serialize(row)
+                if item is None:
+                    continue
+                if as_array:
+                    yield ('' if first else ',') + dumps(item)
+                else:
+                    yield dumps(item) + '\n'
+                first = False
+            if as_array:
+                yield ']'
+        finally:
+            for db in sessions:
+                close_db_session(db)
+
+    mimetype = 'application/json' if as_array else NDJSON_MIMETYPE
+    return Response(stream_with_context(generate()), mimetype=mimetype)
@@ -0,0 +1,133 @@
+"""
+Per-asset lifecycle timeline merged from every table that records an event.
+
+Each stream is read in (date, id) order through its (oracle_number, date)
+index, at most one page past the cursor, and the already sorted streams are
+k-way merged. Events are ordered by (date, stream rank, id), so the cursor
+position is exact even when events of different kinds share a timestamp.
+Events without a date (a completion recorded without its date) come last
+in either order, by (stream rank, id), like keyset_order() sorts NULLs.
+"""
+import heapq
+from datetime import datetime
+from sqlalchemy import and_, false, or_
+
+from utils.pagination import PaginationError, cursor_fields, keyset_order
+from utils.serializers import RowSerializer, RAW, TEXT, DATE
+
+# (event type, model name, date column, detail fields) in rank order
+TIMELINE_STREAMS = [
+    ('added', 'Asset', 'created_at', [
+        ('device_type', 'device_type', TEXT),
+        ('brand_name', 'brand_name', TEXT),
+        ('model_name', 'model_name', TEXT),
+        ('serial_number', 'serial_number', TEXT),
+        ('vendor_name', 'vendor_name', TEXT),
+        ('unit_price', 'unit_price', RAW)
+    ]),
+    ('assigned', 'Assignment', 'assignment_date', [
+        ('employee_name', 'employee_name', TEXT),
+        ('department', 'department', TEXT),
+        ('designation', 'designation', TEXT),
+        ('expected_return_date', 'expected_return_date', DATE),
+        ('actual_return_date', 'actual_return_date', DATE),
+        ('status', 'status', TEXT)
+    ]),
+    ('repair_requested', 'RepairRequestForm', 'start_date', [
+        ('repair_description', 'repair_description', TEXT),
+        ('vendor_name', 'vendor_name', TEXT),
+        ('technician', 'technician', TEXT),
+        ('cost', 'cost', RAW),
+        ('employee_name', 'employee_name', TEXT),
+        ('department', 'department', TEXT)
+    ]),
+    ('repair_completed', 'CompletionRepair', 'completion_date', [
+        ('repair_description', 'repair_description', TEXT),
+        ('vendor_name', 'vendor_name', TEXT),
+        ('technician', 'technician', TEXT),
+        ('cost', 'cost', RAW),
+        ('is_fixed', 'is_fixed', TEXT),
+        ('start_date', 'start_date', DATE)
+    ]),
+    ('returned', 'ReturnRecord', 'return_date', [
+        ('return_type', 'return_type', TEXT),
+        ('reason', 'reason', TEXT),
+        ('notes', 'notes', TEXT)
+    ]),
+    ('auctioned', 'Auction', 'auction_date', [
+        ('price', 'price', RAW)
+    ])
+]
+
+_DETAILS = {kind: RowSerializer(fields) for kind, _, _, fields in TIMELINE_STREAMS}
+
+def _parse_cursor(cursor):
+    cursor_date, cursor_rank, cursor_id = cursor_fields(cursor, 3)
+    if not (cursor_date is None or isinstance(cursor_date, datetime)) or \
+            type(cursor_rank) is not int or not 0 <= cursor_rank < len(TIMELINE_STREAMS) or \
+            type(cursor_id) is not int:
+        raise PaginationError('Invalid cursor')
+    return cursor_date, cursor_rank, cursor_id
+
+def _after(date_column, id_column, rank, cursor, descending):
+    """Rows of the stream with this rank that come after the cursor"""
+    cursor_date, cursor_rank, cursor_id = cursor
+    past_id = id_column < cursor_id if descending else id_column > cursor_id
+    # Same date: other streams sort by rank
+    rank_after = (rank > cursor_rank) != descending
+    if cursor_date is None:
+        # Already among the undated events
+        if rank == cursor_rank:
+            return and_(date_column.is_(None), past_id)
+        return date_column.is_(None) if rank_after else false()
+    later = date_column < cursor_date if descending else date_column > cursor_date
+    if rank == cursor_rank:
+        later = or_(later, and_(date_column == cursor_date, past_id))
+    elif rank_after:
+        later = or_(later, date_column == cursor_date)
+    if date_column.nullable:
+        return or_(later, date_column.is_(None))
+    return later
+
+def _merge_key(descending):
+    # Undated events last in either direction
+    if descending:
+        return lambda event: (event[0] is not None, event[0] or datetime.min) + event[1:3]
+    return lambda event: (event[0] is None, event[0] or datetime.min) + event[1:3]
+
+def asset_timeline(db, models, oracle_number, cursor=None, limit=50, descending=False):
+    """One page of timeline events for an asset.
+
+    `cursor` is the (date, rank, id) of the last event already returned;
+    PaginationError if it isn't one. Returns (events, last_key) where
+    last_key is None on the final page.
+    """
+    if cursor:
+        cursor = _parse_cursor(cursor)
+    streams = []
+    for rank, (kind, model_name, date_name, fields) in enumerate(TIMELINE_STREAMS):
+        model = models.get(model_name)
+        date_column = getattr(model, date_name)
+        query = db.query(model.id, date_column, *_DETAILS[kind].columns(model)).filter(
+            model.oracle_number == oracle_number
+        )
+        if cursor:
+            query = query.filter(_after(date_column, model.id, rank, cursor, descending))
+        query = query.order_by(*keyset_order(date_column, model.id, descending))
+        rows = query.limit(limit + 1).all()
+        # Each stream is already in (date, rank, id) order
+        streams.append([(row[1], rank, row[0], kind, row[2:]) for row in rows])
+
+    merged = heapq.merge(*streams, key=_merge_key(descending), reverse=descending)
+    page = [event for _, event in zip(range(limit + 1), merged)]
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    events = [{
+        'type': kind,
+        'id': row_id,
+        'date': date.isoformat() if date else None,
+        'details': _DETAILS[kind].one(values)
+    } for date, rank, row_id, kind, values in page]
+    last_key = list(page[-1][:3]) if has_more else None
+    return events, last_key
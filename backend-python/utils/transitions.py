@@ -0,0 +1,165 @@
+"""
+Asset lifecycle transitions.
+
+    new/used/buyback -> assigned -> used (returned to inventory) / damaged / buyback
+    any live state -> under repair -> assigned or used -> ... -> auctioned
+
+Each transition writes the asset and its assignment, return, repair or
+auction rows in one transaction. The asset state is read without locks and
+the asset UPDATE is flushed first, guarded by its version column: if a
+concurrent transition committed in between, it matches no row and the
+transition is rejected with TransitionConflict before anything else is
+written, instead of waiting on row locks or overwriting the other change.
+"""
+from datetime import datetime
+from sqlalchemy.orm.exc import StaleDataError
+
+from models import Asset, Assignment, Auction, CompletionRepair, RepairRequestForm, ReturnRecord
+
+# Asset status left behind by each return type
+RETURN_STATUSES = {
+    'returned_to_inventory': 'used',
+    'damaged': 'damaged',
+    'buyback': 'buyback'
+}
+
+_LIVE = {'new', 'used', 'assigned', 'damaged', 'buyback'}
+
+# action -> (wording for errors, statuses the asset may be in)
+ALLOWED_FROM = {
+    'assign': ('assign', {'new', 'used', 'buyback'}),
+    'return': ('return', {'assigned'}),
+    'request_repair': ('send for repair', _LIVE),
+    'complete_repair': ('complete the repair of', {'under repair'}),
+    'auction': ('auction', _LIVE)
+}
+
+class TransitionError(ValueError):
+    """A transition the asset's current state does not allow (HTTP 400)"""
+    status_code = 400
+
+class AssetNotFound(TransitionError):
+    status_code = 404
+
+class TransitionConflict(TransitionError):
+    """The asset changed since it was read (HTTP 409)"""
+    status_code = 409
+
+def _begin(db, oracle_number, action, version=None):
+    """The asset, checked against the transition and the client's version"""
+    asset = db.query(Asset).filter(Asset.oracle_number == oracle_number).first()
+    if asset is None:
+        raise AssetNotFound('Asset not found')
+    if version not in (None, '') and str(version) != str(asset.version):
+        raise TransitionConflict('Asset was changed by someone else, reload and try again')
+    verb, allowed = ALLOWED_FROM[action]
+    status = asset.status or 'new'
+    if status not in allowed:
+        raise TransitionError(f'Cannot {verb} an asset that is {status}')
+    return asset
+
+def _move(db, asset, status, **fields):
+    """Write the asset's new state first, failing fast if its version moved on"""
+    asset.status = status
+    for name, value in fields.items():
+        setattr(asset, name, value)
+    asset.updated_at = datetime.utcnow()
+    try:
+        db.flush()
+    except StaleDataError:
+        raise TransitionConflict('Asset was changed by a concurrent request, reload and try again')
+
+def _active_assignment(db, oracle_number):
+    return db.query(Assignment).filter(
+        Assignment.oracle_number == oracle_number,
+        Assignment.status == 'assigned'
+    ).first()
+
+def assign(db, oracle_number, values, version=None):
+    """Issue the asset to an employee; `values` are the Assignment columns"""
+    asset = _begin(db, oracle_number, 'assign', version)
+    _move(db, asset, 'assigned',
+          assigned_to=values['employee_name'],
+          assignment_date=values.get('assignment_date'),
+          expected_return_date=values.get('expected_return_date'))
+    assignment = Assignment(oracle_number=oracle_number, status='assigned', timestamp=datetime.utcnow(), **values)
+    db.add(assignment)
+    db.commit()
+    return assignment
+
+def return_asset(db, oracle_number, return_type, return_date, version=None, **values):
+    """Take the asset back; `values` are the remaining ReturnRecord columns"""
+    if return_type not in RETURN_STATUSES:
+        raise TransitionError(f"return type must be one of: {', '.join(sorted(RETURN_STATUSES))}")
+    asset = _begin(db, oracle_number, 'return', version)
+    _move(db, asset, RETURN_STATUSES[return_type],
+          assigned_to='', assignment_date=None, expected_return_date=None)
+    return_record = ReturnRecord(oracle_number=oracle_number, return_type=return_type,
+                                 return_date=return_date, timestamp=datetime.utcnow(), **values)
+    db.add(return_record)
+    assignment = _active_assignment(db, oracle_number)
+    if assignment:
+        assignment.status = 'returned'
+        assignment.actual_return_date = return_date
+    db.commit()
+    return return_record
+
+def request_repair(db, oracle_number, values, version=None):
+    """Send the asset for repair; `values` are the RepairRequestForm columns"""
+    asset = _begin(db, oracle_number, 'request_repair', version)
+    _move(db, asset, 'under repair')
+    repair = RepairRequestForm(oracle_number=oracle_number, asset_type=asset.device_type,
+                               asset_model=asset.model_name, start_date=datetime.utcnow(), **values)
+    db.add(repair)
+    db.commit()
+    return repair
+
+def complete_repair(db, oracle_number, values, version=None):
+    """Close the open repair; the asset goes back to its holder, or to stock.
+
+    `values` override the repair request's columns on the CompletionRepair row.
+    """
+    asset = _begin(db, oracle_number, 'complete_repair', version)
+    repair = db.query(RepairRequestForm).filter(RepairRequestForm.oracle_number == oracle_number).first()
+    if repair is None:
+        raise AssetNotFound('Repair not found or already completed')
+    restored_status = 'assigned' if asset.assigned_to else 'used'
+    _move(db, asset, restored_status)
+    completed = CompletionRepair(
+        oracle_number=repair.oracle_number,
+        asset_type=repair.asset_type,
+        asset_model=repair.asset_model,
+        start_date=repair.start_date,
+        employee_name=repair.employee_name,
+        department=repair.department,
+        designation=repair.designation,
+        **{name: value if value not in (None, '') else getattr(repair, name, None)
+           for name, value in values.items()}
+    )
+    db.add(completed)
+    db.delete(repair)
+    db.commit()
+    return completed, restored_status
+
+def auction(db, oracle_number, price, auction_date, version=None):
+    """Sell the asset off, closing its assignment and any stale repair request"""
+    asset = _begin(db, oracle_number, 'auction', version)
+    _move(db, asset, 'auctioned', assigned_to=None, assignment_date=None, expected_return_date=None)
+    db.add(Auction(
+        oracle_number=oracle_number,
+        asset_type=asset.device_type,
+        brand_name=asset.brand_name,
+        model_name=asset.model_name,
+        serial_number=asset.serial_number,
+        price=price,
+        auction_date=auction_date,
+        created_at=datetime.utcnow()
+    ))
+    # Row by row through the session so the repair counters see the deletes
+    for repair in db.query(RepairRequestForm).filter(RepairRequestForm.oracle_number == oracle_number):
+        db.delete(repair)
+    assignment = _active_assignment(db, oracle_number)
+    if assignment:
+        assignment.status = 'auctioned'
+        assignment.actual_return_date = datetime.utcnow()
+    db.commit()